@@ -1,30 +1,47 @@
-from typing import Any, Dict, List, Optional
+from functools import lru_cache
+import asyncio
+import json
+import logging
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from pydantic import BaseModel
 from fastapi import APIRouter
-from agents import Agent, Runner
-from agents.items import ToolCallItem, ToolCallOutputItem
+from starlette.background import BackgroundTask
+from starlette.responses import StreamingResponse
 
-from app.tools import merge_documents, resume_match
 from app.services.filestore import get_meta
+from app.services.compaction import compact_history
+from app.services.sessions import sessions
+from app.services.token_ledger import Ticket, session, text_tokens, token_ledger
 
 router = APIRouter()
 
 # ---- Agent definition ----
-AGENT = Agent(
-    name="Agentic Curie",
-    instructions=(
-        "You are a helpful chat assistant.\n"
-        "- For requests to merge/combine/summarize multiple uploaded documents into one, call merge_documents(file_ids, template_id?).\n"
-        "- For requests to compare resumes to a job description (JD), call resume_match(resume_file_ids, jd_file_id?, jd_text?).\n"
-        "- If you have fewer than the required files (e.g., <2 for merging, or 0 resumes for matching), ask the user to upload them.\n"
-        "- If the user provides a JD inline as text, pass it via jd_text; if they uploaded a JD file, pass its ID via jd_file_id.\n"
-        "Keep responses concise and confirm what you'll do before running heavy operations."
-    ),
-    tools=[merge_documents, resume_match],
+# The agents SDK, openai and the tools' document stack take seconds to import, so the
+# agent is built on first use (or by the startup warm-up), not when the app loads.
+INSTRUCTIONS = (
+    "You are a helpful chat assistant.\n"
+    "- For requests to merge/combine/summarize multiple uploaded documents into one, call merge_documents(file_ids, template_id?).\n"
+    "- For requests to compare resumes to a job description (JD), call resume_match(resume_file_ids, jd_file_id?, jd_text?).\n"
+    "- If you have fewer than the required files (e.g., <2 for merging, or 0 resumes for matching), ask the user to upload them.\n"
+    "- If the user provides a JD inline as text, pass it via jd_text; if they uploaded a JD file, pass its ID via jd_file_id.\n"
+    "- Both tools start a background job and return its job ID and status URL; tell the user it is running and"
+    " include the status URL. Use job_status(job_id) when the user asks about progress or results.\n"
+    "- resume_match keeps every JD's scores in a candidate pool and reports its pool_id; for questions about the"
+    " best candidates so far, or filtering them by score or skill, call pool_candidates(pool_id, ...).\n"
+    "Keep responses concise and confirm what you'll do before running heavy operations."
 )
 
-# In-memory conversation store (session_id -> input list)
-SESSION_STORE: Dict[str, List[dict]] = {}
+@lru_cache(maxsize=1)
+def get_agent():
+    from agents import Agent
+    from app.tools import merge_documents, resume_match, pool_candidates, job_status
+
+    return Agent(
+        name="Agentic Curie",
+        instructions=INSTRUCTIONS,
+        tools=[merge_documents, resume_match, pool_candidates, job_status],
+    )
 
 class ChatRequest(BaseModel):
     message: str
@@ -32,13 +49,16 @@ class ChatRequest(BaseModel):
     attachment_ids: Optional[List[str]] = None  # file IDs uploaded this turn
 
 class ChatResponse(BaseModel):
+    session_id: str
     final: str
     tool_calls: List[Dict[str, Any]]
 
-@router.post("/chat", response_model=ChatResponse)
-async def chat(body: ChatRequest):
-    session_id = body.session_id or "default"
-    prior = SESSION_STORE.get(session_id)
+def _build_input(body: ChatRequest) -> Tuple[str, List[dict]]:
+    # No ID means a new conversation; the caller gets the generated ID back
+    session_id = body.session_id or uuid.uuid4().hex
+    prior = sessions.get(session_id)
+    if prior:
+        prior = compact_history(prior)
 
     # Build a small system message enumerating uploaded files (if any)
     sys_note = ""
@@ -59,26 +79,103 @@ async def chat(body: ChatRequest):
     else:
         start = [{"role": "system", "content": sys_note}] if sys_note else []
         items = start + [{"role": "user", "content": body.message}]
+    return session_id, items
+
+def _attribute(session_id: str) -> None:
+    """Record this turn's usage under its chat session (the caller's budget is unchanged)."""
+    session.set(session_id)
+
+def _admit(items: List[dict]) -> Ticket:
+    # the prompt is sent at least once per model call; tool loops add more, charged as they happen
+    return token_ledger.admit(text_tokens(len(json.dumps(items, default=str))), "This message")
+
+def _charge_run(result: Any) -> None:
+    """Record the agent run's own model usage (tool jobs charge theirs through the gateway)."""
+    u = result.context_wrapper.usage
+    token_ledger.charge(u.input_tokens, u.output_tokens, calls=u.requests)
+
+def _trace_entry(it: Any) -> Optional[Dict[str, Any]]:
+    """UI trace row for a run item (tool call or tool output); None for anything else."""
+    from agents.items import ToolCallItem, ToolCallOutputItem
+
+    if isinstance(it, ToolCallItem):
+        call = it.raw_item
+        return {
+            "type": "call",
+            "tool": getattr(call, "name", "unknown"),
+            "arguments": getattr(call, "arguments", "{}"),
+        }
+    if isinstance(it, ToolCallOutputItem):
+        return {
+            "type": "output",
+            "output": str(getattr(it, "output", "")),
+        }
+    return None
 
-    result = await Runner.run(AGENT, input=items)
+@router.post("/chat", response_model=ChatResponse)
+async def chat(body: ChatRequest):
+    from agents import Runner
+
+    # the session, file and ledger stores are SQLite; they are read and written off the event loop
+    session_id, items = await asyncio.to_thread(_build_input, body)
+    _attribute(session_id)
+
+    with token_ledger.charging(await asyncio.to_thread(_admit, items)):
+        result = await Runner.run(get_agent(), input=items)
+        await asyncio.to_thread(_charge_run, result)
 
     # Persist conversation for next turn
-    SESSION_STORE[session_id] = result.to_input_list()
+    await asyncio.to_thread(sessions.put, session_id, result.to_input_list())
 
     # Extract tool call trace for the UI
+    trace = [e for e in (_trace_entry(it) for it in result.new_items) if e]
+
+    return ChatResponse(session_id=session_id, final=str(result.final_output), tool_calls=trace)
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def _stream_turn(session_id: str, items: List[dict], ticket: Ticket) -> AsyncIterator[str]:
+    """
+    Server-Sent Events for one agent turn:
+      delta       {"text"}                       model text as it is generated
+      tool_call   {"type","tool","arguments"}    a tool was invoked
+      tool_output {"type","output"}              a tool returned
+      done        {"session_id","final","tool_calls"}  same payload as POST /api/chat
+      error       {"detail"}
+    """
+    from agents import Runner
+    from openai.types.responses import ResponseTextDeltaEvent
+
+    _attribute(session_id)
     trace: List[Dict[str, Any]] = []
-    for it in result.new_items:
-        if isinstance(it, ToolCallItem):
-            call = it.raw_item
-            trace.append({
-                "type": "call",
-                "tool": getattr(call, "name", "unknown"),
-                "arguments": getattr(call, "arguments", "{}"),
-            })
-        elif isinstance(it, ToolCallOutputItem):
-            trace.append({
-                "type": "output",
-                "output": str(getattr(it, "output", "")),
-            })
-
-    return ChatResponse(final=str(result.final_output), tool_calls=trace)
+    # chat_stream's background task releases the ticket, whether or not the stream ran
+    with token_ledger.charging(ticket, release=False):
+        try:
+            result = Runner.run_streamed(get_agent(), input=items)
+            async for ev in result.stream_events():
+                if ev.type == "raw_response_event" and isinstance(ev.data, ResponseTextDeltaEvent):
+                    yield _sse("delta", {"text": ev.data.delta})
+                elif ev.type == "run_item_stream_event":
+                    entry = _trace_entry(ev.item)
+                    if entry:
+                        trace.append(entry)
+                        yield _sse("tool_call" if entry["type"] == "call" else "tool_output", entry)
+            await asyncio.to_thread(_charge_run, result)
+            await asyncio.to_thread(sessions.put, session_id, result.to_input_list())
+            yield _sse("done", {"session_id": session_id, "final": str(result.final_output), "tool_calls": trace})
+        except Exception as e:
+            logging.exception("Streaming chat turn failed")
+            yield _sse("error", {"detail": str(e)})
+
+@router.post("/chat/stream")
+async def chat_stream(body: ChatRequest):
+    session_id, items = await asyncio.to_thread(_build_input, body)
+    _attribute(session_id)
+    ticket = await asyncio.to_thread(_admit, items)  # a refusal is a plain 429, before the event stream starts
+    return StreamingResponse(
+        _stream_turn(session_id, items, ticket),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(token_ledger.release, ticket),  # also if the stream never started
+    )
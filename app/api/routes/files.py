@@ -1,28 +1,159 @@
-from typing import List
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from starlette.responses import FileResponse
+import asyncio
+from typing import List, Optional, Tuple
+from fastapi import APIRouter, HTTPException, Request
+from starlette.responses import FileResponse, Response
 
-from app.services.filestore import save_file, get_path, get_meta
+from app.core.config import settings
+from app.core.http_cache import etag_matches
+from app.services.filestore import BlobWriter, UploadTooLarge, discard, get_path, get_meta
+from app.services.extraction import schedule_extraction
+
+# python-multipart is FastAPI's form parser; it is used here directly so uploads stream to the filestore
+try:
+    from python_multipart.exceptions import FormParserError
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ModuleNotFoundError:  # releases before the python_multipart package name
+    from multipart.exceptions import FormParserError
+    from multipart.multipart import MultipartParser, parse_options_header
 
 router = APIRouter()
 
-@router.post("/upload")
-async def upload(files: List[UploadFile] = File(...)):
-    if not files:
+_MB = 1024 * 1024
+_FILES_FIELD = "files"
+
+class _TooLarge(Exception):
+    """The request body passed the per-request limit."""
+
+class _Receiver:
+    """
+    Streaming multipart/form-data reader: each part of the `files` field is written
+    to the filestore as its bytes arrive, so size limits apply while the body is
+    still being received and nothing is spooled or copied twice. Other fields are
+    ignored (but count toward the request size).
+    """
+
+    def __init__(self, per_file: int, per_request: int):
+        self.per_file = per_file
+        self.per_request = per_request
+        self.received = 0
+        self.saved: List[str] = []
+        self._stored = 0
+        self._writer: Optional[BlobWriter] = None
+        self._header: Tuple[bytes, bytes] = (b"", b"")
+        self._headers: dict = {}
+        self._events: list = []  # parser callbacks are sync; file I/O happens between feeds
+
+    def callbacks(self) -> dict:
+        def header_field(data: bytes, start: int, end: int) -> None:
+            self._header = (self._header[0] + data[start:end], self._header[1])
+
+        def header_value(data: bytes, start: int, end: int) -> None:
+            self._header = (self._header[0], self._header[1] + data[start:end])
+
+        def header_end() -> None:
+            self._headers[self._header[0].lower()] = self._header[1]
+            self._header = (b"", b"")
+
+        return {
+            "on_part_begin": lambda: self._headers.clear(),
+            "on_header_field": header_field,
+            "on_header_value": header_value,
+            "on_header_end": header_end,
+            "on_headers_finished": lambda: self._events.append(("part", dict(self._headers))),
+            "on_part_data": lambda data, start, end: self._events.append(("data", bytes(data[start:end]))),
+            "on_part_end": lambda: self._events.append(("end", None)),
+        }
+
+    async def _handle(self) -> None:
+        events, self._events = self._events, []
+        for kind, value in events:
+            if kind == "part":
+                _, options = parse_options_header(value.get(b"content-disposition", b""))
+                if options.get(b"name", b"").decode("utf-8", "replace") == _FILES_FIELD and b"filename" in options:
+                    filename = options[b"filename"].decode("utf-8", "replace")
+                    ctype = value.get(b"content-type", b"").decode("latin-1") or None
+                    limit = min(self.per_file, self.per_request - self._stored)
+                    self._writer = await asyncio.to_thread(BlobWriter, filename, ctype, limit)
+            elif kind == "data" and self._writer is not None:
+                await asyncio.to_thread(self._writer.write, value)
+            elif kind == "end" and self._writer is not None:
+                writer, self._writer = self._writer, None
+                self.saved.append(await asyncio.to_thread(writer.commit))
+                self._stored += writer.size
+
+    async def receive(self, request: Request) -> List[str]:
+        _, params = parse_options_header(request.headers.get("content-type", ""))
+        boundary = params.get(b"boundary")
+        if not boundary:
+            raise HTTPException(status_code=400, detail="Expected a multipart/form-data upload.")
+        parser = MultipartParser(boundary, self.callbacks())
+        try:
+            async for chunk in request.stream():
+                self.received += len(chunk)
+                if self.received > self.per_request:
+                    raise _TooLarge()
+                parser.write(chunk)
+                await self._handle()
+            parser.finalize()
+            await self._handle()
+        except BaseException:
+            if self._writer is not None:
+                self._writer.abort()
+            for fid in self.saved:
+                discard(fid)
+            raise
+        return self.saved
+
+_UPLOAD_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "required": [_FILES_FIELD],
+            "properties": {_FILES_FIELD: {"type": "array", "items": {"type": "string", "format": "binary"}}},
+        }}},
+    }
+}
+
+@router.post("/upload", openapi_extra=_UPLOAD_BODY)
+async def upload(request: Request):
+    per_file = settings.MAX_UPLOAD_MB_PER_FILE * _MB
+    per_request = settings.MAX_UPLOAD_MB_PER_REQUEST * _MB
+    limit = f"per-request size limit: the upload exceeds {settings.MAX_UPLOAD_MB_PER_REQUEST} MB"
+    try:
+        declared = int(request.headers.get("content-length") or 0)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid Content-Length.")
+    if declared > per_request:  # refuse before reading any of the body
+        raise HTTPException(status_code=413, detail=f"Upload rejected ({limit}).")
+
+    try:
+        saved = await _Receiver(per_file, per_request).receive(request)
+    except _TooLarge:
+        raise HTTPException(status_code=413, detail=f"Upload rejected ({limit}).")
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=f"Upload rejected (size limit): {e}")
+    except FormParserError as e:
+        raise HTTPException(status_code=400, detail=f"Malformed multipart body: {e}")
+    if not saved:
         raise HTTPException(status_code=400, detail="No files uploaded.")
+
     out = []
-    for f in files:
-        data = await f.read()
-        fid = save_file(data, filename=f.filename, content_type=f.content_type)
-        meta = get_meta(fid)
-        out.append({"id": fid, **meta})
+    for fid in saved:
+        schedule_extraction(fid)
+        out.append({"id": fid, **get_meta(fid)})
     return {"files": out}
 
 @router.get("/{file_id}/download")
-def download(file_id: str):
+def download(file_id: str, request: Request):
     path = get_path(file_id)
     meta = get_meta(file_id)
     if not path or not meta:
         raise HTTPException(status_code=404, detail="File not found")
-    headers = {"Content-Disposition": f'attachment; filename="{meta["filename"]}"'}
+    # The content hash is a strong validator: a file ID never changes content.
+    # FileResponse answers Range / If-Range requests (206) against this ETag.
+    cache = {"ETag": f'"{meta["sha256"]}"', "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match", ""), cache["ETag"]):
+        return Response(status_code=304, headers=cache)
+    headers = {"Content-Disposition": f'attachment; filename="{meta["filename"]}"', **cache}
     return FileResponse(path, media_type=meta.get("content_type") or "application/octet-stream", headers=headers)
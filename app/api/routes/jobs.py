@@ -0,0 +1,16 @@
+from fastapi import APIRouter, HTTPException
+
+from app.services.jobs import jobs
+
+router = APIRouter()
+
+@router.get("")
+def queue_stats():
+    return jobs.stats()
+
+@router.get("/{job_id}")
+def job_status(job_id: str):
+    job = jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
@@ -0,0 +1,33 @@
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+from app.services.candidate_pool import MAX_PAGE, SORTS, candidate_pool
+
+router = APIRouter()
+
+@router.get("/{pool_id}")
+def get_pool(pool_id: str):
+    pool = candidate_pool.get(pool_id)
+    if not pool:
+        raise HTTPException(status_code=404, detail="Pool not found")
+    return pool
+
+@router.get("/{pool_id}/candidates")
+def pool_candidates(
+    pool_id: str,
+    limit: int = Query(20, ge=1, le=MAX_PAGE),
+    offset: int = Query(0, ge=0),
+    min_score: Optional[int] = Query(None, ge=0, le=100),
+    max_score: Optional[int] = Query(None, ge=0, le=100),
+    q: Optional[str] = Query(None, description="Substring of name, summary, strengths or gaps"),
+    sort: str = Query("score", description=f"One of: {', '.join(SORTS)}"),
+):
+    if sort not in SORTS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of: {', '.join(SORTS)}")
+    if not candidate_pool.get(pool_id):
+        raise HTTPException(status_code=404, detail="Pool not found")
+    page = candidate_pool.query(
+        pool_id, limit=limit, offset=offset, min_score=min_score, max_score=max_score, text=q, sort=sort
+    )
+    return {"pool_id": pool_id, "offset": offset, "limit": limit, **page}
@@ -1,45 +1,109 @@
 
+import asyncio
+from functools import partial
 from io import BytesIO
+import json
 from typing import List, Optional
 
 from fastapi import APIRouter, UploadFile, File, HTTPException
 from starlette.responses import StreamingResponse
 
-from app.services.summarizer import (
-    extract_template_instructions,
-    summarize_many_documents_into_one,
-)
+from app.core.config import settings
+from app.services.extraction import iter_file_text
+from app.services.filestore import UploadTooLarge, discard, get_meta, save_stream
+from app.services.jobs import jobs
+from app.services.token_ledger import estimate_summary, text_chars, token_ledger
 
 router = APIRouter()
 
+_MB = 1024 * 1024
+
+async def _store_uploads(files: List[UploadFile]) -> List[str]:
+    """
+    Copy the uploads into the filestore (same size limits as /api/files/upload), so
+    the job reads files it owns: FastAPI closes the UploadFiles when the request ends.
+    """
+    per_file = settings.MAX_UPLOAD_MB_PER_FILE * _MB
+    remaining = settings.MAX_UPLOAD_MB_PER_REQUEST * _MB
+    saved: List[str] = []
+    try:
+        for f in files:
+            fid = await asyncio.to_thread(
+                save_stream, f.file, f.filename, f.content_type, min(per_file, remaining)
+            )
+            saved.append(fid)
+            remaining -= get_meta(fid)["size"]
+    except UploadTooLarge as e:
+        for fid in saved:
+            discard(fid)
+        raise HTTPException(status_code=413, detail=f"Upload rejected: {e}")
+    return saved
+
 @router.post("/summarize", response_class=StreamingResponse)
 async def summarize(
     files: List[UploadFile] = File(..., description="2+ documents: .pdf or .docx"),
     template: Optional[UploadFile] = File(
         None, description="Optional .docx template used as instructions"
     ),
+    use_cache: bool = True,
+    incremental: bool = True,
 ):
     if not files or len(files) < 2:
         raise HTTPException(status_code=400, detail="Upload at least 2 documents.")
-
-    inputs = []
-    for f in files:
-        content = await f.read()
-        inputs.append((f.filename, content))
+    # imported here so app startup does not pay for openai/python-docx
+    from app.services.summarizer import asummarize_streams_into_one, extract_template_instructions
 
     instructions = None
     if template is not None:
         tbytes = await template.read()
         instructions = extract_template_instructions(BytesIO(tbytes))
 
+    # documents are stored first, then streamed from their blobs page by page while they are summarized
+    file_ids = await _store_uploads(files)
+    metas = await asyncio.to_thread(lambda: [get_meta(fid) for fid in file_ids])
+    inputs = [(m["filename"], m["sha256"], partial(iter_file_text, fid)) for fid, m in zip(file_ids, metas)]
+
+    def cleanup() -> None:
+        for fid in file_ids:
+            discard(fid)
+
+    # Reserved against the caller's token budget (429 when it does not fit) until the job ends
     try:
-        result_bytes, token_stats = summarize_many_documents_into_one(
-            inputs, instructions=instructions
+        ticket = await asyncio.to_thread(
+            token_ledger.admit,
+            estimate_summary([text_chars(m["filename"], m["size"], m.get("text_chars")) for m in metas]),
+            "This summary",
         )
+    except Exception:
+        cleanup()
+        raise
+
+    async def work(job):
+        try:
+            with token_ledger.charging(ticket):
+                return await asummarize_streams_into_one(
+                    inputs, instructions=instructions, use_cache=use_cache, progress=job.set_progress,
+                    incremental=incremental,
+                )
+        finally:
+            cleanup()  # the extracted text stays in the text cache
+
+    # Runs on the shared job pool: bounded concurrency, 429 when saturated
+    try:
+        job = jobs.submit("summarize", work, keep_result=False)
+    except Exception:
+        token_ledger.release(ticket)
+        cleanup()
+        raise
+    try:
+        result_bytes, token_stats = await jobs.wait(job)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Summarization failed: {e}")
 
-    headers = {"Content-Disposition": 'attachment; filename="Document_Generator_Output.docx"'}
+    headers = {
+        "Content-Disposition": 'attachment; filename="Document_Generator_Output.docx"',
+        "X-Token-Stats": json.dumps(token_stats),
+    }
     return StreamingResponse(
         BytesIO(result_bytes),
         media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
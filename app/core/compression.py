@@ -0,0 +1,143 @@
+"""
+Response compression negotiated from Accept-Encoding: brotli when the optional
+`brotli` package is installed and the client accepts it, otherwise gzip.
+
+Only text-like payloads (HTML, JS, CSS, JSON, CSV, plain text) of at least
+COMPRESS_MIN_BYTES are compressed; they are compressed as they stream, so large
+downloads are never buffered whole. Server-sent events, partial (206) responses,
+requests carrying a Range header and bodies that already carry a Content-Encoding
+pass through untouched. A compressed response drops Accept-Ranges: byte ranges of
+the file would not line up with the encoded bytes a client already holds.
+"""
+
+from __future__ import annotations
+
+import zlib
+from typing import List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Optional dependency
+try:
+    import brotli
+except Exception:
+    brotli = None
+
+_COMPRESSIBLE = (
+    "text/html", "text/css", "text/plain", "text/csv", "text/markdown",
+    "application/javascript", "text/javascript", "application/json", "image/svg+xml",
+)
+
+def _accepted(accept_encoding: str) -> List[str]:
+    """Codings with a non-zero q-value, e.g. "gzip, br;q=0.8, zstd;q=0" -> ["gzip", "br"]."""
+    out = []
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if name:
+            out.append(name.strip())
+    return out
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    codings = _accepted(accept_encoding)
+    if brotli and ("br" in codings or "*" in codings):
+        return "br"
+    if "gzip" in codings or "*" in codings:
+        return "gzip"
+    return None
+
+class _Encoder:
+    def __init__(self, coding: str, level: int):
+        self.coding = coding
+        if coding == "br":
+            self._br = brotli.Compressor(quality=min(level, 11))
+        else:
+            self._z = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # gzip container
+
+    def feed(self, data: bytes) -> bytes:
+        if self.coding == "br":
+            return self._br.process(data)
+        return self._z.compress(data)
+
+    def finish(self) -> bytes:
+        if self.coding == "br":
+            return self._br.finish()
+        return self._z.flush()
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, level: int = 5):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.level = max(1, min(level, 9))
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_headers = Headers(scope=scope)
+        coding = choose_encoding(request_headers.get("accept-encoding", ""))
+        if not coding or "range" in request_headers:
+            await self.app(scope, receive, send)
+            return
+
+        # FileResponse must go through http.response.body for its bytes to be encoded
+        extensions = {k: v for k, v in scope.get("extensions", {}).items() if k != "http.response.pathsend"}
+        scope = {**scope, "extensions": extensions}
+
+        start: Optional[Message] = None
+        encoder: Optional[_Encoder] = None
+        passthrough = False
+
+        async def wrapped(message: Message) -> None:
+            nonlocal start, encoder, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                headers = Headers(raw=message["headers"])
+                ctype = headers.get("content-type", "").split(";")[0].strip().lower()
+                passthrough = (
+                    message["status"] in (204, 206, 304)
+                    or "content-encoding" in headers
+                    or ctype not in _COMPRESSIBLE
+                )
+                if passthrough:
+                    await send(message)
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+            if encoder is None:
+                headers = MutableHeaders(raw=start["headers"])
+                if not more and len(body) < self.minimum_size:
+                    headers.add_vary_header("Accept-Encoding")
+                    await send(start)
+                    await send(message)
+                    passthrough = True
+                    return
+                encoder = _Encoder(coding, self.level)
+                headers["Content-Encoding"] = coding
+                headers.add_vary_header("Accept-Encoding")
+                if "content-length" in headers:
+                    del headers["Content-Length"]
+                if "accept-ranges" in headers:
+                    del headers["Accept-Ranges"]  # ranges index the identity bytes, not these
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/"):
+                    headers["ETag"] = f"W/{etag}"  # the encoded bytes differ from the resource
+                await send(start)
+            out = encoder.feed(body)
+            if not more:
+                out += encoder.finish()
+            if out or not more:
+                await send({"type": "http.response.body", "body": out, "more_body": more})
+
+        await self.app(scope, receive, wrapped)
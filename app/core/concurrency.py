@@ -0,0 +1,71 @@
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+def run_sync(coro: Awaitable[T]) -> T:
+    """
+    Run a coroutine to completion from synchronous code.
+    If the caller is already inside a running event loop (e.g. a sync helper
+    called from an async route), the coroutine runs on a private loop in a
+    helper thread so we never nest asyncio.run().
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1) as ex:
+        return ex.submit(asyncio.run, coro).result()
+
+class LoopThread:
+    """
+    An event loop on its own daemon thread, for objects that must stay on one loop
+    (e.g. a pooled async HTTP client) but are used from many: jobs and run_sync()
+    each run their own short-lived loops. Started on first use.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=loop.run_forever, name=self.name, daemon=True)
+                self._thread.start()
+                self._loop = loop
+            return self._loop
+
+    async def run(self, make: Callable[[], Awaitable[T]]) -> T:
+        """
+        Await make() on this loop from any other loop. It runs in a copy of the
+        caller's context (request ID, ...); cancelling the caller cancels it.
+        """
+        ctx = contextvars.copy_context()
+
+        async def start() -> T:
+            return await asyncio.get_running_loop().create_task(make(), context=ctx)
+
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(start(), self._get_loop()))
+
+    def close(self, cleanup: Optional[Callable[[], Awaitable[None]]] = None, timeout: float = 10) -> None:
+        """Run `cleanup` on the loop (e.g. closing clients), then stop it."""
+        with self._lock:
+            loop, self._loop = self._loop, None
+            thread, self._thread = self._thread, None
+        if loop is None:
+            return
+        try:
+            if cleanup is not None:
+                asyncio.run_coroutine_threadsafe(cleanup(), loop).result(timeout=timeout)
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout)
+            if not thread.is_alive():
+                loop.close()
@@ -9,7 +9,95 @@ load_dotenv(override=True)
 class Settings:
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
     OPENAI_MODEL: str = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
-    CHUNK_SIZE: int = int(os.getenv("CHUNK_SIZE", "10000"))
-    CHUNK_OVERLAP: int = int(os.getenv("CHUNK_OVERLAP", "400"))
+    OPENAI_BASE_URL: str = os.getenv("OPENAI_BASE_URL", "")  # empty = api.openai.com
+    # LLM gateway: request/token rate limits for the whole deployment (0 = unlimited), split
+    # evenly across WEB_CONCURRENCY worker processes; retries, timeouts
+    LLM_RPM: int = int(os.getenv("LLM_RPM", "500"))
+    LLM_TPM: int = int(os.getenv("LLM_TPM", "200000"))
+    LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", "5"))
+    LLM_BACKOFF_BASE: float = float(os.getenv("LLM_BACKOFF_BASE", "1.0"))
+    LLM_BACKOFF_MAX: float = float(os.getenv("LLM_BACKOFF_MAX", "30"))
+    LLM_TIMEOUT_SECONDS: float = float(os.getenv("LLM_TIMEOUT_SECONDS", "120"))
+    # Keep-alive connections to the API per worker process (one pooled client per process)
+    LLM_MAX_CONNECTIONS: int = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+    # Worker processes serving the app (uvicorn --workers reads the same variable)
+    WEB_CONCURRENCY: int = int(os.getenv("WEB_CONCURRENCY", "1"))
+    # Token-based chunking: CHUNK_TOKENS=0 sizes chunks from the model's context window
+    CHUNK_TOKENS: int = int(os.getenv("CHUNK_TOKENS", "0"))
+    CHUNK_OVERLAP_TOKENS: int = int(os.getenv("CHUNK_OVERLAP_TOKENS", "100"))
+    CHUNK_CONTEXT_FRACTION: float = float(os.getenv("CHUNK_CONTEXT_FRACTION", "0.25"))
+    MODEL_CONTEXT_TOKENS: int = int(os.getenv("MODEL_CONTEXT_TOKENS", "0"))  # 0 = built-in table
+    # Tree reduce: max partials per reduce call, and token budget per reduce prompt (0 = chunk budget)
+    REDUCE_FAN_IN: int = int(os.getenv("REDUCE_FAN_IN", "8"))
+    REDUCE_TOKENS: int = int(os.getenv("REDUCE_TOKENS", "0"))
+    # Local pre-compression before map calls: share of each chunk's tokens kept by sentence
+    # ranking (0 = off, 1 = only strip PDF running headers/footers); shorter chunks are sent whole
+    PRECOMPRESS_RATIO: float = float(os.getenv("PRECOMPRESS_RATIO", "0"))
+    PRECOMPRESS_MIN_SENTENCES: int = int(os.getenv("PRECOMPRESS_MIN_SENTENCES", "8"))
+    # Max chat completions in flight per summarize/merge request
+    LLM_CONCURRENCY: int = int(os.getenv("LLM_CONCURRENCY", "8"))
+    # Parallel resume matching: scoring calls in flight / extraction threads
+    RESUME_SCORE_CONCURRENCY: int = int(os.getenv("RESUME_SCORE_CONCURRENCY", "8"))
+    RESUME_EXTRACT_WORKERS: int = int(os.getenv("RESUME_EXTRACT_WORKERS", "4"))
+    # Batched scoring: resumes per JSON-mode call (<= 1 = one call per resume) and resume tokens per call
+    RESUME_BATCH_SIZE: int = int(os.getenv("RESUME_BATCH_SIZE", "5"))
+    RESUME_BATCH_TOKENS: int = int(os.getenv("RESUME_BATCH_TOKENS", "12000"))
+    # BM25 shortlist before LLM scoring: keep top K (0 = all) with lexical score >= MIN
+    RESUME_PREFILTER_TOP_K: int = int(os.getenv("RESUME_PREFILTER_TOP_K", "0"))
+    RESUME_PREFILTER_MIN_SCORE: float = float(os.getenv("RESUME_PREFILTER_MIN_SCORE", "0"))
+    # File registry (SQLite, shared by all workers on the host)
+    FILESTORE_DB: str = os.getenv("FILESTORE_DB", "data/filestore.sqlite3")
+    # Per-JD candidate pools for resume_match (SQLite)
+    CANDIDATE_POOL_DB: str = os.getenv("CANDIDATE_POOL_DB", "data/candidate_pool.sqlite3")
+    # Token ledger and budgets per principal (API key / client address); 0 = no limit (the default).
+    # Callers without a key in API_KEYS are budgeted by the connection's address, so everyone behind
+    # one reverse proxy or NAT shares a budget: set API_KEYS before turning the budgets on there.
+    TOKEN_LEDGER_DB: str = os.getenv("TOKEN_LEDGER_DB", "data/token_ledger.sqlite3")
+    TOKEN_BUDGET_HOURLY: int = int(os.getenv("TOKEN_BUDGET_HOURLY", "0"))
+    TOKEN_BUDGET_DAILY: int = int(os.getenv("TOKEN_BUDGET_DAILY", "0"))
+    TOKEN_MAX_PER_REQUEST: int = int(os.getenv("TOKEN_MAX_PER_REQUEST", "0"))
+    # Comma-separated X-API-Key values that get a budget of their own; other callers are budgeted by address
+    API_KEYS: str = os.getenv("API_KEYS", "")
+    # Chat sessions: "memory" (per process) or "sqlite" (shared on the host)
+    SESSION_BACKEND: str = os.getenv("SESSION_BACKEND", "memory").lower()
+    SESSION_DB: str = os.getenv("SESSION_DB", "data/sessions.sqlite3")
+    SESSION_MAX_SESSIONS: int = int(os.getenv("SESSION_MAX_SESSIONS", "1000"))
+    SESSION_IDLE_TTL_SECONDS: int = int(os.getenv("SESSION_IDLE_TTL_SECONDS", str(24 * 3600)))
+    SESSION_MAX_TOTAL_MB: int = int(os.getenv("SESSION_MAX_TOTAL_MB", "256"))
+    # Per-session caps; the oldest turns are dropped first (0 = no cap)
+    SESSION_MAX_ITEMS: int = int(os.getenv("SESSION_MAX_ITEMS", "400"))
+    SESSION_MAX_SESSION_KB: int = int(os.getenv("SESSION_MAX_SESSION_KB", "1024"))
+    # Chat history compaction: token budget for prior turns (0 = no turn dropping),
+    # recent turns left untouched, and how much of an older tool output is kept
+    CHAT_HISTORY_TOKENS: int = int(os.getenv("CHAT_HISTORY_TOKENS", "8000"))
+    CHAT_KEEP_TURNS: int = int(os.getenv("CHAT_KEEP_TURNS", "2"))
+    CHAT_TOOL_OUTPUT_CHARS: int = int(os.getenv("CHAT_TOOL_OUTPUT_CHARS", "300"))
+    # Upload size caps (MB)
+    MAX_UPLOAD_MB_PER_FILE: int = int(os.getenv("MAX_UPLOAD_MB_PER_FILE", "50"))
+    MAX_UPLOAD_MB_PER_REQUEST: int = int(os.getenv("MAX_UPLOAD_MB_PER_REQUEST", "200"))
+    # Startup warm-up of the agent/openai/document stack and tiktoken: background | blocking | off
+    STARTUP_WARMUP: str = os.getenv("STARTUP_WARMUP", "background").lower()
+    # Response compression (gzip, or brotli when installed) for text payloads of at least this size
+    COMPRESS_MIN_BYTES: int = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+    COMPRESS_LEVEL: int = int(os.getenv("COMPRESS_LEVEL", "5"))
+    # Background text extraction threads for uploads
+    EXTRACT_WORKERS: int = int(os.getenv("EXTRACT_WORKERS", "2"))
+    # Page-parallel PDF extraction (process pool); PDF_WORKERS<=1 keeps it serial
+    PDF_WORKERS: int = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+    PDF_PARALLEL_MIN_PAGES: int = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "40"))
+    PDF_PAGE_TIMEOUT: float = float(os.getenv("PDF_PAGE_TIMEOUT", "30"))
+    # Background jobs: concurrent jobs, extra jobs allowed to wait (then 429), result retention
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "2"))
+    JOB_MAX_QUEUE: int = int(os.getenv("JOB_MAX_QUEUE", "8"))
+    JOB_TTL_SECONDS: int = int(os.getenv("JOB_TTL_SECONDS", "3600"))
+    # Persistent LLM response cache (SQLite)
+    LLM_CACHE_ENABLED: bool = os.getenv("LLM_CACHE_ENABLED", "1").lower() not in ("0", "false", "no")
+    LLM_CACHE_PATH: str = os.getenv("LLM_CACHE_PATH", "data/llm_cache.sqlite3")
+    LLM_CACHE_TTL_SECONDS: int = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+    LLM_CACHE_MAX_ENTRIES: int = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "50000"))
+    # Per-document summary memo for incremental merges (same SQLite cache, own file)
+    SUMMARY_MEMO_PATH: str = os.getenv("SUMMARY_MEMO_PATH", "data/summary_memo.sqlite3")
+    SUMMARY_MEMO_TTL_SECONDS: int = int(os.getenv("SUMMARY_MEMO_TTL_SECONDS", str(30 * 24 * 3600)))
+    SUMMARY_MEMO_MAX_ENTRIES: int = int(os.getenv("SUMMARY_MEMO_MAX_ENTRIES", "5000"))
 
 settings = Settings()
@@ -0,0 +1,80 @@
+"""
+HTTP caching helpers: ETag validation and fingerprinted static assets.
+
+etag_matches implements If-None-Match (weak comparison), for routes that set
+their own ETag. For the chat UI, index.html is served with its /static/... references rewritten to
+/static/<file>?v=<content hash>. A request carrying the current hash gets a
+year-long immutable Cache-Control, so browsers reuse it without revalidating; a
+deploy changes the hash and therefore the URL. Anything else (index.html itself,
+stale or missing ?v=) gets "no-cache" and is revalidated through its ETag.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import threading
+from typing import Dict, Tuple
+from urllib.parse import parse_qs
+
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+_REF = re.compile(r'(["\'])/static/([^"\'?#]+)\1')
+
+# path -> ((mtime_ns, size), short sha256)
+_HASHES: Dict[str, Tuple[Tuple[int, int], str]] = {}
+_HASHES_LOCK = threading.Lock()
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """True when an If-None-Match header value covers `etag` (so the answer is 304)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    bare = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == bare for tag in if_none_match.split(","))
+
+def fingerprint(path: str) -> str:
+    """Short content hash of a file, recomputed only when its mtime or size changes."""
+    st = os.stat(path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    with _HASHES_LOCK:
+        cached = _HASHES.get(path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(1 << 16):
+            h.update(block)
+    digest = h.hexdigest()[:12]
+    with _HASHES_LOCK:
+        _HASHES[path] = (stamp, digest)
+    return digest
+
+class FingerprintedStaticFiles(StaticFiles):
+    def file_response(self, full_path, stat_result, scope: Scope, status_code: int = 200) -> Response:
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        version = parse_qs(scope.get("query_string", b"").decode("latin-1")).get("v", [""])[0]
+        fresh = version and version == fingerprint(str(full_path))
+        response.headers["Cache-Control"] = IMMUTABLE if fresh else REVALIDATE
+        return response
+
+def render_index(directory: str, name: str = "index.html") -> Tuple[str, str]:
+    """(html, etag) of `name` with every /static/<file> reference fingerprinted."""
+    with open(os.path.join(directory, name), encoding="utf-8") as f:
+        html = f.read()
+
+    def versioned(m: re.Match) -> str:
+        path = os.path.join(directory, m.group(2))
+        if not os.path.isfile(path):
+            return m.group(0)
+        return f"{m.group(1)}/static/{m.group(2)}?v={fingerprint(path)}{m.group(1)}"
+
+    html = _REF.sub(versioned, html)
+    return html, '"' + hashlib.sha256(html.encode("utf-8")).hexdigest()[:32] + '"'
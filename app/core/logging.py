@@ -1,7 +1,17 @@
 
+import contextvars
 import logging
 import os
 
+# Correlation ID of the HTTP request being served ("-" outside a request).
+# Background jobs and extraction threads copy the context, so their logs keep it.
+request_id: contextvars.ContextVar[str] = contextvars.ContextVar("request_id", default="-")
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id.get()
+        return True
+
 def configure_logging():
     os.makedirs("logs", exist_ok=True)
     logger = logging.getLogger()
@@ -9,15 +19,17 @@ def configure_logging():
         return
     logger.setLevel(logging.INFO)
 
-    fmt = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+    fmt = logging.Formatter("%(asctime)s - %(levelname)s - [%(request_id)s] %(message)s")
 
     fh = logging.FileHandler("logs/app.log")
     fh.setFormatter(fmt)
     fh.setLevel(logging.INFO)
+    fh.addFilter(RequestIdFilter())
 
     ch = logging.StreamHandler()
     ch.setFormatter(fmt)
     ch.setLevel(logging.INFO)
+    ch.addFilter(RequestIdFilter())
 
     logger.addHandler(fh)
     logger.addHandler(ch)
@@ -0,0 +1,86 @@
+"""
+Prometheus metrics for the API and services, exposed at /metrics.
+
+prometheus_client is optional: without it every metric below is a no-op and
+/metrics answers 503, so instrumented code never needs to check.
+Metrics are per process; with several uvicorn workers scrape each one (or run
+prometheus_client in multiprocess mode).
+"""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+import logging
+import time
+from typing import Iterator, Optional, Tuple
+
+# Optional dependency
+try:
+    import prometheus_client
+except Exception:
+    prometheus_client = None
+
+class _Noop:
+    def labels(self, *args, **kwargs) -> "_Noop":
+        return self
+
+    def observe(self, value: float) -> None:
+        pass
+
+    def inc(self, amount: float = 1) -> None:
+        pass
+
+def _histogram(name: str, doc: str, labels: Tuple[str, ...] = (), buckets: Optional[Tuple[float, ...]] = None):
+    if not prometheus_client:
+        return _Noop()
+    kwargs = {"buckets": buckets} if buckets else {}
+    return prometheus_client.Histogram(name, doc, labels, **kwargs)
+
+def _counter(name: str, doc: str, labels: Tuple[str, ...] = ()):
+    if not prometheus_client:
+        return _Noop()
+    return prometheus_client.Counter(name, doc, labels)
+
+_SLOW_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+EXTRACT_SECONDS = _histogram(
+    "curie_extract_seconds", "Text extraction time per file", ("file_type",), _SLOW_BUCKETS
+)
+CHUNKS_PER_DOCUMENT = _histogram(
+    "curie_chunks_per_document", "Chunks produced per summarized document", (),
+    (1, 2, 4, 8, 16, 32, 64, 128, 256, 512),
+)
+LLM_CALL_SECONDS = _histogram(
+    "curie_llm_call_seconds", "Chat completion latency (cache misses only)", ("stage",), _SLOW_BUCKETS
+)
+STAGE_SECONDS = _histogram(
+    "curie_stage_seconds", "Wall time of pipeline stages (per-file summarize, combine, ...)", ("stage",),
+    _SLOW_BUCKETS,
+)
+DOCX_WRITE_SECONDS = _histogram("curie_docx_write_seconds", "write_text_to_docx_bytes time")
+TOOL_SECONDS = _histogram(
+    "curie_tool_duration_seconds", "End-to-end duration of tool/background job runs", ("tool", "status"),
+    _SLOW_BUCKETS,
+)
+LLM_TOKENS = _counter("curie_llm_tokens_total", "Tokens reported by the API", ("kind",))  # prompt | completion | cached
+LLM_CACHE_LOOKUPS = _counter(
+    "curie_llm_cache_lookups_total", "LLM response / summary memo lookups", ("cache", "result")  # result: hit | miss
+)
+
+@contextmanager
+def timed(metric, log_as: Optional[str] = None, **labels: str) -> Iterator[None]:
+    """Observe the block's duration on `metric`; log it too when log_as is given."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        (metric.labels(**labels) if labels else metric).observe(elapsed)
+        if log_as:
+            logging.info("%s took %.2fs", log_as, elapsed)
+
+def render() -> Optional[Tuple[bytes, str]]:
+    """(body, content type) for a scrape, or None when prometheus_client is not installed."""
+    if not prometheus_client:
+        return None
+    return prometheus_client.generate_latest(), prometheus_client.CONTENT_TYPE_LATEST
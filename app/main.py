@@ -3,41 +3,160 @@ Agentic Curie (chat-first)
 - Serves chat UI from /
 - /api/chat : agent turn with function-calling tools
 - /api/files : upload/download attachments
+- /api/pools : per-JD candidate pools built by resume_match (ranking queries)
 - Reuses summarizer service under the merge_documents tool
 """
 
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+import logging
+import sys
+import time
+import uuid
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, Response
 
 from app.api.routes.chat import router as chat_router
 from app.api.routes.files import router as files_router
+from app.api.routes.jobs import router as jobs_router
+from app.api.routes.pools import router as pools_router
 from app.api.routes.summarize import router as summarize_router  # optional: keep for testing
-from app.core.logging import configure_logging
+from app.core import metrics
+from app.core.compression import CompressionMiddleware
+from app.core.config import settings
+from app.core.http_cache import REVALIDATE, FingerprintedStaticFiles, etag_matches, render_index
+from app.core.logging import configure_logging, request_id
+from app.services.llm_cache import cache as llm_cache
+from app.services.jobs import JobQueueFull
+from app.services import filestore
+from app.services.sessions import sessions
+from app.services.token_ledger import BudgetExceeded, principal, principal_for, session, token_ledger
+
+def _warm_up() -> None:
+    """Load what the first chat/summarize request would otherwise pay for: the agent, openai, docs stack, tiktoken."""
+    start = time.perf_counter()
+    try:
+        from app.api.routes.chat import get_agent
+        from app.services import pdf_utils, resume_matcher, summarizer  # noqa: F401 (python-docx, pdfplumber, openai)
+        from app.services.tokens import get_encoder
+
+        get_agent()
+        get_encoder(settings.OPENAI_MODEL)
+    except Exception:
+        logging.exception("Startup warm-up failed; modules will load on first use")
+        return
+    logging.info("Startup warm-up took %.2fs", time.perf_counter() - start)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    filestore.reconcile()
+    # "background" serves /health right away and warms up alongside; "blocking" delays
+    # readiness until everything is loaded; "off" loads modules on first use only
+    if settings.STARTUP_WARMUP == "blocking":
+        await asyncio.to_thread(_warm_up)
+    elif settings.STARTUP_WARMUP == "background":
+        app.state.warm_up = asyncio.create_task(asyncio.to_thread(_warm_up))
+    yield
+    warm_up = getattr(app.state, "warm_up", None)
+    if warm_up is not None:
+        await warm_up  # a half-imported gateway module has no gateway to close yet
+    # close the LLM connection pools, if anything loaded the gateway (it is imported lazily)
+    gateway_module = sys.modules.get("app.services.llm_gateway")
+    if gateway_module is not None:
+        await asyncio.to_thread(gateway_module.gateway.close)
 
-app = FastAPI(title="Agentic Curie", version="0.1.2")
+app = FastAPI(title="Agentic Curie", version="0.1.2", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"], allow_credentials=True,
     allow_methods=["*"], allow_headers=["*"],
+    expose_headers=["X-Request-ID", "X-Token-Stats", "ETag", "Content-Range"],
 )
+# gzip/brotli for text payloads (UI, JSON, CSV reports); binary downloads pass through
+app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESS_MIN_BYTES, level=settings.COMPRESS_LEVEL)
 
-# Static chat UI
-app.mount("/static", StaticFiles(directory="static"), name="static")
+@app.middleware("http")
+async def correlate(request: Request, call_next):
+    # Tag every log line of this request (and the jobs it starts) with one ID
+    rid = request.headers.get("x-request-id") or uuid.uuid4().hex[:16]
+    token = request_id.set(rid)
+    try:
+        response = await call_next(request)
+    finally:
+        request_id.reset(token)
+    response.headers["X-Request-ID"] = rid
+    return response
+
+@app.middleware("http")
+async def attribute_usage(request: Request, call_next):
+    # Who the LLM usage of this request (and the jobs it starts) is charged to
+    token = principal.set(principal_for(request.headers, request.client.host if request.client else None))
+    session_token = session.set(request.headers.get("x-session-id", ""))  # reported, not budgeted
+    try:
+        return await call_next(request)
+    finally:
+        session.reset(session_token)
+        principal.reset(token)
+
+# Static chat UI: assets are referenced with a content hash and cached as immutable
+app.mount("/static", FingerprintedStaticFiles(directory="static"), name="static")
 
 @app.get("/")
-def index():
-    return FileResponse("static/index.html")
+def index(request: Request):
+    html, etag = render_index("static")
+    headers = {"ETag": etag, "Cache-Control": REVALIDATE}
+    if etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=headers)
+    return HTMLResponse(html, headers=headers)
 
 configure_logging()
 
 # APIs
 app.include_router(files_router, prefix="/api/files", tags=["files"])
 app.include_router(chat_router, prefix="/api", tags=["chat"])
+app.include_router(jobs_router, prefix="/api/jobs", tags=["jobs"])
+app.include_router(pools_router, prefix="/api/pools", tags=["pools"])
 app.include_router(summarize_router, prefix="/api", tags=["summarize"])  # optional
 
+@app.exception_handler(JobQueueFull)
+async def job_queue_full(request: Request, exc: JobQueueFull):
+    return JSONResponse(status_code=429, content={"detail": str(exc)}, headers={"Retry-After": "10"})
+
+@app.exception_handler(BudgetExceeded)
+async def budget_exceeded(request: Request, exc: BudgetExceeded):
+    headers = {"Retry-After": str(exc.retry_after)} if exc.retry_after else None
+    return JSONResponse(status_code=429, content={"detail": str(exc)}, headers=headers)
+
 @app.get("/health")
 def health():
     return {"status": "ok"}
+
+@app.get("/metrics")
+def prometheus_metrics():
+    scraped = metrics.render()
+    if scraped is None:
+        return PlainTextResponse("prometheus_client is not installed", status_code=503)
+    body, content_type = scraped
+    return Response(body, media_type=content_type)
+
+@app.get("/api/llm-cache/stats")
+def llm_cache_stats():
+    return llm_cache.stats()
+
+@app.get("/api/llm-gateway/stats")
+def llm_gateway_stats():
+    from app.services.llm_gateway import gateway
+
+    return gateway.stats()
+
+@app.get("/api/usage")
+def usage():
+    """The caller's own token usage and remaining budgets, with the day's usage per chat session."""
+    return {**token_ledger.usage(principal.get()), "ledger": token_ledger.stats()}
+
+@app.get("/api/sessions/stats")
+def session_stats():
+    return sessions.stats()
@@ -0,0 +1,220 @@
+# app/services/candidate_pool.py
+"""
+Persistent candidate pools for resume matching, one per job description.
+
+A pool is keyed by the JD's content hash and the scoring model, so pasting the same
+JD again (or uploading it as a file) lands in the same pool. Each scored resume is
+stored under its content hash (the SHA-256 of the uploaded file) with its score,
+strengths, gaps and summary; resume_match only sends resumes the pool has not seen
+to the model. Rows that were not really scored (unreadable, filtered out by the
+lexical prefilter, failed) are not stored, so they are tried again next time.
+
+Ranking queries (top-K, score range, text filter, pagination) run on indexed SQLite
+columns and stay cheap as a requisition grows over weeks. The API has no
+authentication, so a pool is only reachable by its id (unguessable without the JD
+text), pools are never listed or deleted over HTTP, and rows do not expose the
+resumes' file_ids.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pools (
+    pool_id TEXT PRIMARY KEY,
+    jd_sha256 TEXT NOT NULL,
+    model TEXT NOT NULL,
+    jd_excerpt TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS candidates (
+    pool_id TEXT NOT NULL,
+    resume_sha256 TEXT NOT NULL,
+    file_id TEXT,
+    name TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    lexical_score REAL,
+    strengths TEXT NOT NULL,
+    gaps TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    scored_at REAL NOT NULL,
+    PRIMARY KEY (pool_id, resume_sha256)
+);
+CREATE INDEX IF NOT EXISTS idx_candidates_score ON candidates(pool_id, score DESC, name);
+CREATE INDEX IF NOT EXISTS idx_candidates_recent ON candidates(pool_id, scored_at DESC);
+"""
+
+_EXCERPT_CHARS = 200
+MAX_PAGE = 500
+
+# sort name -> ORDER BY clause (a fixed list, never interpolated from user input)
+SORTS = {
+    "score": "score DESC, name ASC",
+    "recent": "scored_at DESC, name ASC",
+    "name": "name ASC, score DESC",
+}
+
+def pool_key(jd_text: str, model: str) -> Tuple[str, str]:
+    """(pool_id, jd_sha256) for a JD; whitespace at either end does not change the pool."""
+    jd_sha = hashlib.sha256(jd_text.strip().encode("utf-8")).hexdigest()
+    pool_id = hashlib.sha256(json.dumps({"jd": jd_sha, "model": model}, sort_keys=True).encode("utf-8")).hexdigest()
+    return pool_id, jd_sha
+
+def _like(text: str) -> str:
+    return "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+def _row_to_result(row: sqlite3.Row) -> Dict[str, Any]:
+    return {
+        "name": row["name"],
+        "score": row["score"],
+        "strengths": json.loads(row["strengths"]),
+        "gaps": json.loads(row["gaps"]),
+        "summary": row["summary"],
+        "lexical_score": row["lexical_score"],
+        "resume_sha256": row["resume_sha256"],
+        "scored_at": row["scored_at"],
+    }
+
+class CandidatePool:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def open(self, jd_text: str, model: str) -> str:
+        """Pool ID for this JD and model, creating the pool on first use."""
+        pool_id, jd_sha = pool_key(jd_text, model)
+        now = time.time()
+        with self._lock:
+            self._db().execute(
+                "INSERT OR IGNORE INTO pools(pool_id, jd_sha256, model, jd_excerpt, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (pool_id, jd_sha, model, jd_text.strip()[:_EXCERPT_CHARS], now, now),
+            )
+        return pool_id
+
+    def known(self, pool_id: str, resume_hashes: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Stored results for the given resume content hashes that are already in the pool."""
+        out: Dict[str, Dict[str, Any]] = {}
+        unique = list(dict.fromkeys(resume_hashes))
+        with self._lock:
+            db = self._db()
+            for i in range(0, len(unique), 500):  # stay under SQLite's bound-parameter limit
+                part = unique[i:i + 500]
+                rows = db.execute(
+                    f"SELECT * FROM candidates WHERE pool_id = ? AND resume_sha256 IN ({','.join('?' * len(part))})",
+                    (pool_id, *part),
+                ).fetchall()
+                out.update((r["resume_sha256"], _row_to_result(r)) for r in rows)
+        return out
+
+    def add(self, pool_id: str, scored: List[Tuple[str, Optional[str], Dict[str, Any]]]) -> int:
+        """
+        Store (resume_sha256, file_id, result) rows; a resume scored again replaces its row.
+        Only results with status "scored" are kept. Returns how many were stored.
+        """
+        now = time.time()
+        rows = [
+            (pool_id, sha, fid, info.get("name", ""), int(info.get("score") or 0), info.get("lexical_score"),
+             json.dumps(info.get("strengths") or []), json.dumps(info.get("gaps") or []),
+             str(info.get("summary") or ""), now)
+            for sha, fid, info in scored
+            if info.get("status") == "scored"
+        ]
+        if not rows:
+            return 0
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN")
+            try:
+                db.executemany(
+                    "INSERT OR REPLACE INTO candidates(pool_id, resume_sha256, file_id, name, score, lexical_score, "
+                    "strengths, gaps, summary, scored_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                db.execute("UPDATE pools SET updated_at = ? WHERE pool_id = ?", (now, pool_id))
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+        return len(rows)
+
+    def query(
+        self,
+        pool_id: str,
+        limit: int = 20,
+        offset: int = 0,
+        min_score: Optional[int] = None,
+        max_score: Optional[int] = None,
+        text: Optional[str] = None,
+        sort: str = "score",
+    ) -> Dict[str, Any]:
+        """
+        One page of a pool's candidates: {"total", "items"}.
+        `text` matches name, summary, strengths or gaps (case-insensitive substring).
+        """
+        where = ["pool_id = ?"]
+        params: List[Any] = [pool_id]
+        if min_score is not None:
+            where.append("score >= ?")
+            params.append(min_score)
+        if max_score is not None:
+            where.append("score <= ?")
+            params.append(max_score)
+        if text:
+            where.append(
+                "(name LIKE ? ESCAPE '\\' OR summary LIKE ? ESCAPE '\\' "
+                "OR strengths LIKE ? ESCAPE '\\' OR gaps LIKE ? ESCAPE '\\')"
+            )
+            params.extend([_like(text)] * 4)
+        clause = " AND ".join(where)
+        order = SORTS.get(sort, SORTS["score"])
+        limit = max(1, min(limit, MAX_PAGE))
+        with self._lock:
+            db = self._db()
+            (total,) = db.execute(f"SELECT COUNT(*) FROM candidates WHERE {clause}", params).fetchone()
+            rows = db.execute(
+                f"SELECT * FROM candidates WHERE {clause} ORDER BY {order} LIMIT ? OFFSET ?",
+                (*params, limit, max(0, offset)),
+            ).fetchall()
+        return {"total": total, "items": [_row_to_result(r) for r in rows]}
+
+    def get(self, pool_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            db = self._db()
+            pool = db.execute("SELECT * FROM pools WHERE pool_id = ?", (pool_id,)).fetchone()
+            if pool is None:
+                return None
+            agg = db.execute(
+                "SELECT COUNT(*) AS n, AVG(score) AS mean, MAX(score) AS best FROM candidates WHERE pool_id = ?",
+                (pool_id,),
+            ).fetchone()
+        return {
+            **dict(pool),
+            "candidates": agg["n"],
+            "mean_score": round(agg["mean"], 2) if agg["mean"] is not None else None,
+            "best_score": agg["best"],
+        }
+
+candidate_pool = CandidatePool(settings.CANDIDATE_POOL_DB)
@@ -0,0 +1,145 @@
+# app/services/chunking.py
+"""
+Token-based chunking that cuts on paragraph, then sentence boundaries.
+
+Chunks are sized from the model's context window (or CHUNK_TOKENS when set) and
+carry their token count, so callers never need to re-encode chunk text.
+Overlap between consecutive chunks is expressed in tokens and taken from whole
+trailing units (paragraphs/sentences) of the previous chunk.
+
+iter_chunks does the same over a stream of text pieces (e.g. PDF pages) and yields
+each chunk as soon as it is full, holding at most one chunk plus one unfinished
+paragraph in memory. chunk_text is iter_chunks over a single piece.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+import re
+from typing import Iterable, Iterator, List, Tuple
+
+from app.core.config import settings
+from app.services.tokens import context_window, count_tokens, get_encoder
+
+# Space left for the completion and prompt scaffolding around a chunk
+_OUTPUT_RESERVE_TOKENS = 4096
+
+_PARA_SPLIT = re.compile(r"(?<=\n\n)")
+_SENT_SPLIT = re.compile(r"(?<=[.!?])(?=\s)")
+
+@dataclass
+class Chunk:
+    text: str
+    n_tokens: int
+
+def chunk_budget(model: str) -> int:
+    """Target tokens per chunk for `model`."""
+    if settings.CHUNK_TOKENS > 0:
+        return settings.CHUNK_TOKENS
+    usable = max(1024, context_window(model) - _OUTPUT_RESERVE_TOKENS)
+    return max(512, int(usable * settings.CHUNK_CONTEXT_FRACTION))
+
+def _hard_split(text: str, limit: int, model: str) -> List[Tuple[str, int]]:
+    """Last resort for a single sentence longer than the budget: slice on token ids."""
+    enc = get_encoder(model)
+    if not enc:
+        step = limit * 4
+        return [(text[i:i + step], count_tokens(text[i:i + step], model)) for i in range(0, len(text), step)]
+    ids = enc.encode(text, disallowed_special=())
+    return [(enc.decode(ids[i:i + limit]), len(ids[i:i + limit])) for i in range(0, len(ids), limit)]
+
+def _sentence_units(para: str, limit: int, model: str) -> List[Tuple[str, int]]:
+    out: List[Tuple[str, int]] = []
+    for sent in _SENT_SPLIT.split(para):
+        if not sent:
+            continue
+        n = count_tokens(sent, model)
+        if n <= limit:
+            out.append((sent, n))
+        else:
+            out.extend(_hard_split(sent, limit, model))
+    return out
+
+def _units(text: str, limit: int, model: str) -> List[Tuple[str, int]]:
+    """(piece, tokens) pieces that concatenate back to `text`, each within `limit` tokens."""
+    out: List[Tuple[str, int]] = []
+    for para in _PARA_SPLIT.split(text):
+        if not para:
+            continue
+        n = count_tokens(para, model)
+        if n <= limit:
+            out.append((para, n))
+        else:
+            out.extend(_sentence_units(para, limit, model))
+    return out
+
+def _paragraph_units(stream: Iterable[str], limit: int, model: str) -> Iterator[Tuple[str, int]]:
+    """
+    _units over concatenated pieces without joining them: complete paragraphs are
+    emitted as they close. A paragraph far larger than the budget (so it would be
+    sentence-split anyway) releases its complete sentences early to bound memory.
+    """
+    spill_chars = limit * 16  # well past `limit` tokens at any realistic chars/token ratio
+    pending = ""
+    spilled = False  # pending is the tail of an oversized paragraph: sentence-split it when it closes
+    for piece in stream:
+        if not piece:
+            continue
+        pending += piece
+        paras = _PARA_SPLIT.split(pending)
+        pending = paras.pop()
+        for para in paras:
+            if spilled:
+                yield from _sentence_units(para, limit, model)
+                spilled = False
+            else:
+                yield from _units(para, limit, model)
+        if len(pending) > spill_chars:
+            spilled = True
+            sents = _SENT_SPLIT.split(pending)
+            pending = sents.pop()
+            yield from _sentence_units("".join(sents), limit, model)
+            if len(pending) > spill_chars:  # one endless sentence: hard-split, keep the tail open
+                pieces = _hard_split(pending, limit, model)
+                pending = pieces.pop()[0]
+                yield from pieces
+    if pending:
+        yield from (_sentence_units if spilled else _units)(pending, limit, model)
+
+def iter_chunks(
+    stream: Iterable[str], model: str, max_tokens: int = 0, overlap_tokens: int = -1
+) -> Iterator[Chunk]:
+    """
+    Chunk the concatenation of `stream` incrementally; same cuts as chunk_text on the
+    joined text. Yields nothing for empty input.
+    """
+    limit = max_tokens or chunk_budget(model)
+    overlap = settings.CHUNK_OVERLAP_TOKENS if overlap_tokens < 0 else overlap_tokens
+    overlap = min(overlap, limit // 2)
+
+    cur: List[Tuple[str, int]] = []
+    cur_tokens = 0
+    for piece, n in _paragraph_units(stream, limit, model):
+        if cur and cur_tokens + n > limit:
+            yield Chunk("".join(p for p, _ in cur), cur_tokens)
+            # seed the next chunk with trailing units that fit in the overlap
+            tail: List[Tuple[str, int]] = []
+            tail_tokens = 0
+            for p, k in reversed(cur):
+                if tail_tokens + k > overlap or tail_tokens + k + n > limit:
+                    break
+                tail.insert(0, (p, k))
+                tail_tokens += k
+            cur, cur_tokens = tail, tail_tokens
+        cur.append((piece, n))
+        cur_tokens += n
+    if cur:
+        yield Chunk("".join(p for p, _ in cur), cur_tokens)
+
+def chunk_text(text: str, model: str, max_tokens: int = 0, overlap_tokens: int = -1) -> List[Chunk]:
+    """
+    Split `text` into chunks of at most `max_tokens` (default: chunk_budget(model)),
+    overlapping by up to `overlap_tokens` (default: CHUNK_OVERLAP_TOKENS).
+    """
+    chunks = list(iter_chunks([text], model, max_tokens, overlap_tokens))
+    return chunks or [Chunk(text, count_tokens(text, model))]
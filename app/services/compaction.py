@@ -0,0 +1,144 @@
+# app/services/compaction.py
+"""
+Token-budgeted compaction of chat histories before they are sent back to the model.
+
+Passes, all deterministic (same history in, same history out):
+1. Duplicate system notes (e.g. the same "Uploaded files available this turn" list
+   repeated every turn) are dropped; the first copy stays where it was.
+2. Tool outputs older than the last CHAT_KEEP_TURNS turns are shrunk to a short
+   reference that keeps their first CHAT_TOOL_OUTPUT_CHARS characters (job IDs, links).
+3. If the history is still over CHAT_HISTORY_TOKENS, whole turns are dropped from
+   the front until it fits in half the budget, and replaced by one system note that
+   lists the dropped user requests and carries their file-list notes.
+
+Each pass only rewrites items once, and dropping to half the budget (not just under
+it) means the compacted prefix stays identical for several turns, which keeps
+provider-side prompt caching effective.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import List, Optional
+
+from app.core.config import settings
+from app.services.tokens import count_tokens
+
+_ELIDED_PREFIX = "[Earlier tool output elided"
+_DROPPED_PREFIX = "Earlier conversation (compacted)"
+_MAX_NOTE_REQUESTS = 20  # most recent dropped user requests listed in the note
+
+def _item_tokens(item: dict, model: str) -> int:
+    return count_tokens(json.dumps(item, ensure_ascii=False, sort_keys=True, default=str), model)
+
+def _is_system(item: dict) -> bool:
+    return item.get("role") in ("system", "developer") and isinstance(item.get("content"), str)
+
+def _turn_starts(items: List[dict]) -> List[int]:
+    """Indices where a turn begins: each user message, pulled back over the system notes before it."""
+    starts = []
+    for i, it in enumerate(items):
+        if it.get("role") == "user":
+            j = i
+            while j > 0 and _is_system(items[j - 1]):
+                j -= 1
+            starts.append(j)
+    return starts
+
+def _dedupe_system_notes(items: List[dict]) -> List[dict]:
+    seen = set()
+    out = []
+    for it in items:
+        if _is_system(it):
+            if it["content"] in seen:
+                continue
+            seen.add(it["content"])
+        out.append(it)
+    return out
+
+def _shrink_tool_outputs(items: List[dict], keep_from: int, max_chars: int) -> List[dict]:
+    out = []
+    for i, it in enumerate(items):
+        output = it.get("output")
+        if (
+            i < keep_from
+            and it.get("type") == "function_call_output"
+            and isinstance(output, str)
+            and len(output) > max_chars
+            and not output.startswith(_ELIDED_PREFIX)
+        ):
+            it = dict(it, output=f"{_ELIDED_PREFIX}, {len(output)} chars] {output[:max_chars]}…")
+        out.append(it)
+    return out
+
+def _user_text(item: dict) -> str:
+    content = item.get("content")
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return " ".join(str(p.get("text", "")) for p in content if isinstance(p, dict))
+    return ""
+
+def _dropped_note(dropped: List[dict], previous: Optional[str]) -> dict:
+    """One system note standing in for the dropped turns; their system notes (file lists) are kept verbatim."""
+    lines = previous.split("\n") if previous else [f"{_DROPPED_PREFIX}. The user earlier asked:"]
+    for it in dropped:
+        if it.get("role") == "user":
+            text = " ".join(_user_text(it).split())
+            lines.append(f"- {text[:160]}{'…' if len(text) > 160 else ''}")
+        elif _is_system(it) and it["content"] not in "\n".join(lines):
+            lines.append(it["content"])
+    requests = [i for i, line in enumerate(lines) if line.startswith("- ")]
+    stale = set(requests[:-_MAX_NOTE_REQUESTS])
+    lines = [line for i, line in enumerate(lines) if i not in stale]
+    return {"role": "system", "content": "\n".join(lines)}
+
+def compact_history(
+    items: List[dict],
+    budget_tokens: Optional[int] = None,
+    keep_turns: Optional[int] = None,
+    tool_output_chars: Optional[int] = None,
+    model: Optional[str] = None,
+) -> List[dict]:
+    """
+    Return a compacted copy of `items` (an agent input list). budget_tokens <= 0 disables
+    the turn-dropping pass; the two cheap passes always run. The newest keep_turns turns
+    are never altered.
+    """
+    budget = settings.CHAT_HISTORY_TOKENS if budget_tokens is None else budget_tokens
+    keep = max(1, settings.CHAT_KEEP_TURNS if keep_turns is None else keep_turns)
+    max_chars = settings.CHAT_TOOL_OUTPUT_CHARS if tool_output_chars is None else tool_output_chars
+    model = model or settings.OPENAI_MODEL
+
+    items = _dedupe_system_notes(items)
+    starts = _turn_starts(items)
+    protected = starts[-keep] if len(starts) >= keep else 0
+    items = _shrink_tool_outputs(items, protected, max_chars)
+
+    if budget <= 0:
+        return items
+    sizes = [_item_tokens(it, model) for it in items]
+    if sum(sizes) <= budget:
+        return items
+
+    # A note from an earlier compaction is folded into the new one
+    previous = None
+    if items and _is_system(items[0]) and items[0]["content"].startswith(_DROPPED_PREFIX):
+        previous = items[0]["content"]
+        items, sizes = items[1:], sizes[1:]
+        starts = _turn_starts(items)
+        protected = starts[-keep] if len(starts) >= keep else 0
+
+    target = budget // 2
+    total = sum(sizes)
+    cut = 0
+    for s in starts:
+        if s > protected:
+            break
+        if total - sum(sizes[:s]) <= target:
+            cut = s
+            break
+        cut = s
+    if cut == 0 and previous is None:
+        return items
+    return [_dropped_note(items[:cut], previous)] + items[cut:]
@@ -0,0 +1,246 @@
+# app/services/extraction.py
+"""
+Text extraction for uploaded files.
+
+- read_any_text: the one pdf/docx/txt -> text implementation
+- schedule_extraction: called by /api/files/upload; extracts in a background thread
+- get_text: what tools use; returns cached text (extracting on a miss)
+- iter_any_text / iter_file_text: the same, streamed piece by piece (PDF pages, text
+  blocks) from a path or file object, for callers that chunk as they read
+
+Extracted text is cached on disk under data/text_cache, keyed by the SHA-256 of
+the file bytes, so re-uploading identical content never parses it again.
+Each file's metadata carries an "extraction" status: pending | done | failed.
+"""
+
+from __future__ import annotations
+
+import codecs
+from contextlib import contextmanager
+import contextvars
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Union
+
+from app.core.config import settings
+from app.core.metrics import EXTRACT_SECONDS, timed
+from app.services.filestore import get_meta, update_meta
+
+class ExtractionError(RuntimeError):
+    """A document's text could not be read (raised by streaming consumers around extraction failures)."""
+
+_CACHE_DIR = Path("data/text_cache").resolve()
+_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+# Characters per piece when streaming plain text (and cached text)
+_STREAM_BLOCK_CHARS = 1 << 20
+
+_POOL = ThreadPoolExecutor(max_workers=max(1, settings.EXTRACT_WORKERS), thread_name_prefix="extract")
+
+# One lock per content hash so a background job and a tool never parse the same bytes twice;
+# an entry ([lock, users]) lives only while someone holds or waits for it
+_LOCKS: Dict[str, List[Any]] = {}
+_LOCKS_GUARD = threading.Lock()
+
+# python-docx and pdfplumber (via pdf_utils) are imported on first use: the upload
+# route loads this module, and neither is needed until a document is parsed.
+
+def _read_docx_text(docx_bytes: bytes) -> str:
+    from docx import Document
+
+    doc = Document(BytesIO(docx_bytes))
+    return "\n".join(p.text for p in doc.paragraphs if p.text)
+
+def read_any_text(filename: str, data: bytes) -> str:
+    ext = filename.lower().rsplit(".", 1)[-1] if "." in filename else ""
+    with timed(EXTRACT_SECONDS, log_as=f"Extracting {filename}", file_type=ext if ext in ("pdf", "docx") else "text"):
+        if ext == "pdf":
+            from app.services.pdf_utils import extract_text_from_pdf_bytes
+
+            return extract_text_from_pdf_bytes(data)
+        if ext == "docx":
+            return _read_docx_text(data)
+        try:
+            return data.decode("utf-8", errors="ignore")
+        except Exception:
+            return ""
+
+def iter_any_text(
+    filename: str,
+    source: Union[str, BinaryIO],
+    strip_margins: bool = False,
+    on_stripped: Optional[Callable[[str], None]] = None,
+) -> Iterator[str]:
+    """
+    Streaming read_any_text over a path or binary file object: yields pieces whose
+    concatenation is the extracted text. PDFs come out a page at a time and plain
+    text in blocks; python-docx has no streaming reader, so a .docx is parsed whole
+    and then yielded in paragraphs. Extraction errors propagate to the caller.
+    strip_margins leaves a PDF's running headers/footers out (see
+    precompress.strip_page_margins), passing each to on_stripped; other formats
+    are unaffected.
+    """
+    ext = filename.lower().rsplit(".", 1)[-1] if "." in filename else ""
+    if ext == "pdf":
+        from app.services.pdf_utils import iter_pdf_page_lines, iter_pdf_pages
+
+        if strip_margins:
+            from app.services.precompress import strip_page_margins
+
+            yield from strip_page_margins(iter_pdf_page_lines(source), on_stripped)
+            return
+        yield from iter_pdf_pages(source)
+        return
+    if ext == "docx":
+        from docx import Document
+
+        first = True
+        for p in Document(source).paragraphs:
+            if p.text:
+                yield p.text if first else "\n" + p.text
+                first = False
+        return
+    f = open(source, "rb") if isinstance(source, str) else source
+    try:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+        while block := f.read(_STREAM_BLOCK_CHARS):
+            yield decoder.decode(block)
+        yield decoder.decode(b"", final=True)
+    finally:
+        if f is not source:
+            f.close()
+
+def _cache_path(sha256: str) -> Path:
+    return _CACHE_DIR / f"{sha256}.txt"
+
+def cached_text(sha256: str) -> Optional[str]:
+    p = _cache_path(sha256)
+    if not p.exists():
+        return None
+    return p.read_text(encoding="utf-8")
+
+def _store_text(sha256: str, text: str) -> None:
+    p = _cache_path(sha256)
+    tmp = p.with_suffix(f".{threading.get_ident()}.tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, p)  # atomic: readers never see a half-written file
+
+@contextmanager
+def _lock_for(sha256: str) -> Iterator[threading.Lock]:
+    """The content hash's lock (not acquired), kept registered until the block exits."""
+    with _LOCKS_GUARD:
+        entry = _LOCKS.setdefault(sha256, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        yield entry[0]
+    finally:
+        with _LOCKS_GUARD:
+            entry[1] -= 1
+            if not entry[1]:
+                del _LOCKS[sha256]
+
+def extract_file(file_id: str) -> Optional[str]:
+    """
+    Return the text of an uploaded file, from cache or by extracting it now.
+    Updates the file's extraction status. None if the file ID is unknown or extraction failed.
+    """
+    meta = get_meta(file_id)
+    if not meta:
+        return None
+    sha = meta["sha256"]
+    with _lock_for(sha) as lock, lock:
+        text = cached_text(sha)
+        if text is None:
+            update_meta(file_id, extraction="running")
+            try:
+                with open(meta["path"], "rb") as f:
+                    text = read_any_text(meta["filename"], f.read())
+            except Exception as e:
+                logging.exception("Extraction failed for %s", meta["filename"])
+                update_meta(file_id, extraction="failed", extraction_error=str(e))
+                return None
+            _store_text(sha, text)
+    update_meta(file_id, extraction="done", text_chars=len(text))
+    return text
+
+def iter_file_text(
+    file_id: str, strip_margins: bool = False, on_stripped: Optional[Callable[[str], None]] = None
+) -> Iterator[str]:
+    """
+    Text of an uploaded file as a stream of pieces, read from the text cache or
+    extracted from the stored blob (never loaded whole). A fresh extraction holds
+    the file's lock, like extract_file, and is teed into the text cache; a reader
+    that finds the lock taken waits for it and then reads the cache.
+    With strip_margins a PDF is always read from its blob, where page positions
+    are known, without its running headers/footers (see iter_any_text); that text
+    is not cached. Raises KeyError for an unknown file ID.
+    """
+    meta = get_meta(file_id)
+    if not meta:
+        raise KeyError(file_id)
+    if strip_margins and meta["filename"].lower().endswith(".pdf"):
+        yield from iter_any_text(meta["filename"], meta["path"], strip_margins=True, on_stripped=on_stripped)
+        return
+    with _lock_for(meta["sha256"]) as lock:
+        yield from _stream_text(file_id, meta, lock)
+
+def _stream_text(file_id: str, meta: Dict[str, Any], lock: threading.Lock) -> Iterator[str]:
+    p = _cache_path(meta["sha256"])
+    while not p.exists():
+        if lock.acquire(blocking=False):
+            if not p.exists():
+                break  # ours to extract; released when the stream ends or is closed
+            lock.release()
+        else:
+            with lock:  # extracted elsewhere right now (e.g. just uploaded); its cache file is about to land
+                pass
+    else:
+        with open(p, encoding="utf-8") as f:
+            while block := f.read(_STREAM_BLOCK_CHARS):
+                yield block
+        return
+
+    try:
+        update_meta(file_id, extraction="running")
+        tmp = p.with_suffix(f".{threading.get_ident()}.tmp")
+        chars = 0
+        try:
+            with open(tmp, "w", encoding="utf-8") as out:
+                for piece in iter_any_text(meta["filename"], meta["path"]):
+                    out.write(piece)
+                    chars += len(piece)
+                    yield piece
+        except GeneratorExit:  # reader stopped early: the cache would be incomplete
+            tmp.unlink(missing_ok=True)
+            raise
+        except Exception as e:
+            tmp.unlink(missing_ok=True)
+            logging.exception("Extraction failed for %s", meta["filename"])
+            update_meta(file_id, extraction="failed", extraction_error=str(e))
+            raise
+        os.replace(tmp, p)
+    finally:
+        lock.release()
+    update_meta(file_id, extraction="done", text_chars=chars)
+
+def schedule_extraction(file_id: str) -> None:
+    """Mark a freshly uploaded file and extract it off the request path (no-op on a cache hit)."""
+    meta = get_meta(file_id)
+    if not meta:
+        return
+    text = cached_text(meta["sha256"])
+    if text is not None:
+        update_meta(file_id, extraction="done", text_chars=len(text))
+        return
+    update_meta(file_id, extraction="pending")
+    _POOL.submit(contextvars.copy_context().run, extract_file, file_id)  # keep the request ID in logs
+
+def get_text(file_id: str) -> Optional[str]:
+    """Text for a file ID ("" if unreadable); None if the ID is unknown."""
+    if not get_meta(file_id):
+        return None
+    return extract_file(file_id) or ""
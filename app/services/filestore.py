@@ -1,30 +1,211 @@
 # app/services/filestore.py
+"""
+Content-addressed file storage with a persistent registry.
+
+Bytes live once per SHA-256 under data/files/<sha256>; every upload still gets its
+own file ID (and filename/content type), so identical uploads share one blob.
+Uploads are copied to disk in fixed-size blocks while hashing, so memory stays
+flat regardless of file size.
+
+The registry is a SQLite database (WAL mode, indexed by ID and content hash), so
+it survives restarts and is shared by every worker process on the host.
+reconcile() runs at startup to drop rows whose blob is gone and blobs nobody references.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
 import uuid
-from typing import Optional, Dict
+from typing import Any, BinaryIO, Optional, Dict
 from pathlib import Path
 
+from app.core.config import settings
+
 _BASE = Path("data/files").resolve()
 _BASE.mkdir(parents=True, exist_ok=True)
 
-# Simple in-memory registry (resets on restart)
-_REG: Dict[str, Dict] = {}
+BLOCK_SIZE = 1024 * 1024
 
-def save_file(content: bytes, filename: str, content_type: Optional[str] = None) -> str:
+# Leftovers younger than this may belong to an upload in flight on another worker
+_ORPHAN_GRACE_SECONDS = 3600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    path TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    content_type TEXT,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    extra TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS idx_files_sha256 ON files(sha256);
+"""
+_COLUMNS = ("id", "sha256", "path", "filename", "content_type", "size", "created_at")
+
+_local = threading.local()
+
+class UploadTooLarge(ValueError):
+    """Raised when a stream exceeds its byte limit."""
+
+def _db() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        Path(settings.FILESTORE_DB).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(settings.FILESTORE_DB, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        _local.conn = conn
+    return conn
+
+def _row_to_meta(row: sqlite3.Row) -> Dict[str, Any]:
+    meta = {k: row[k] for k in _COLUMNS if k != "created_at"}
+    meta.update(json.loads(row["extra"]))
+    return meta
+
+def _register(sha: str, size: int, filename: str, content_type: Optional[str]) -> str:
     fid = uuid.uuid4().hex
-    ext = Path(filename).suffix
-    path = _BASE / f"{fid}{ext}"
-    path.write_bytes(content)
-    _REG[fid] = {
-        "id": fid,
-        "path": str(path),
-        "filename": filename,
-        "content_type": content_type,
-    }
+    _db().execute(
+        "INSERT INTO files(id, sha256, path, filename, content_type, size, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (fid, sha, str(_BASE / sha), filename, content_type, size, time.time()),
+    )
     return fid
 
+def _commit_blob(tmp: Path, sha: str) -> None:
+    """Move a finished temp file into place, or drop it if the blob already exists."""
+    final = _BASE / sha
+    if final.exists():
+        tmp.unlink(missing_ok=True)
+    else:
+        os.replace(tmp, final)
+
+def save_file(content: bytes, filename: str, content_type: Optional[str] = None) -> str:
+    sha = hashlib.sha256(content).hexdigest()
+    tmp = _BASE / f".{uuid.uuid4().hex}.part"
+    tmp.write_bytes(content)
+    _commit_blob(tmp, sha)
+    return _register(sha, len(content), filename, content_type)
+
+class BlobWriter:
+    """
+    save_stream for data that arrives in pieces (e.g. a multipart body being parsed):
+    write() blocks as they come, then commit() for the new file ID, or abort().
+    write() raises UploadTooLarge, and keeps nothing, once more than max_bytes arrived.
+    """
+
+    def __init__(self, filename: str, content_type: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.filename = filename
+        self.content_type = content_type
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._sha = hashlib.sha256()
+        self._tmp = _BASE / f".{uuid.uuid4().hex}.part"
+        self._out: Optional[BinaryIO] = open(self._tmp, "wb")
+
+    def write(self, block: bytes) -> None:
+        self.size += len(block)
+        if self.max_bytes is not None and self.size > self.max_bytes:
+            self.abort()
+            raise UploadTooLarge(f"{self.filename} exceeds the {self.max_bytes // (1024 * 1024)} MB limit.")
+        self._sha.update(block)
+        self._out.write(block)
+
+    def commit(self) -> str:
+        self._out.close()
+        self._out = None
+        sha = self._sha.hexdigest()
+        _commit_blob(self._tmp, sha)
+        return _register(sha, self.size, self.filename, self.content_type)
+
+    def abort(self) -> None:
+        if self._out is not None:
+            self._out.close()
+            self._out = None
+        self._tmp.unlink(missing_ok=True)
+
+def save_stream(
+    src: BinaryIO,
+    filename: str,
+    content_type: Optional[str] = None,
+    max_bytes: Optional[int] = None,
+) -> str:
+    """
+    Copy a file-like object to storage in BLOCK_SIZE blocks, hashing as it goes.
+    Raises UploadTooLarge (and keeps nothing) once more than max_bytes have been read.
+    """
+    writer = BlobWriter(filename, content_type, max_bytes)
+    try:
+        while block := src.read(BLOCK_SIZE):
+            writer.write(block)
+    except BaseException:
+        writer.abort()
+        raise
+    return writer.commit()
+
+def discard(file_id: str) -> None:
+    """Forget a file ID; its blob is removed once no other ID references it."""
+    db = _db()
+    row = db.execute("SELECT sha256, path FROM files WHERE id = ?", (file_id,)).fetchone()
+    if row is None:
+        return
+    db.execute("DELETE FROM files WHERE id = ?", (file_id,))
+    if db.execute("SELECT 1 FROM files WHERE sha256 = ? LIMIT 1", (row["sha256"],)).fetchone() is None:
+        Path(row["path"]).unlink(missing_ok=True)
+
 def get_meta(file_id: str) -> Optional[Dict]:
-    return _REG.get(file_id)
+    row = _db().execute("SELECT * FROM files WHERE id = ?", (file_id,)).fetchone()
+    return _row_to_meta(row) if row else None
 
 def get_path(file_id: str) -> Optional[str]:
-    m = _REG.get(file_id)
-    return m["path"] if m else None
+    row = _db().execute("SELECT path FROM files WHERE id = ?", (file_id,)).fetchone()
+    return row["path"] if row else None
+
+def update_meta(file_id: str, **fields) -> None:
+    """Merge extra fields (e.g. extraction status) into a file's metadata."""
+    db = _db()
+    db.execute("BEGIN IMMEDIATE")  # serialize read-modify-write across workers
+    try:
+        row = db.execute("SELECT extra FROM files WHERE id = ?", (file_id,)).fetchone()
+        if row is not None:
+            extra = json.loads(row["extra"])
+            extra.update(fields)
+            db.execute("UPDATE files SET extra = ? WHERE id = ?", (json.dumps(extra), file_id))
+        db.execute("COMMIT")
+    except BaseException:
+        db.execute("ROLLBACK")
+        raise
+
+def reconcile() -> Dict[str, int]:
+    """
+    Bring the registry and data/files back in line (run at startup):
+    rows whose blob is missing are dropped; unreferenced blobs and stale .part
+    files older than the grace period are deleted.
+    """
+    db = _db()
+    dropped = 0
+    for row in db.execute("SELECT id, path FROM files").fetchall():
+        if not os.path.exists(row["path"]):
+            db.execute("DELETE FROM files WHERE id = ?", (row["id"],))
+            dropped += 1
+
+    referenced = {r["sha256"] for r in db.execute("SELECT DISTINCT sha256 FROM files")}
+    cutoff = time.time() - _ORPHAN_GRACE_SECONDS
+    removed = 0
+    for p in _BASE.iterdir():
+        if not p.is_file() or p.name in referenced:
+            continue
+        try:
+            if p.stat().st_mtime < cutoff:
+                p.unlink()
+                removed += 1
+        except FileNotFoundError:
+            pass
+    if dropped or removed:
+        logging.info(f"filestore reconcile: dropped {dropped} stale rows, removed {removed} orphan files")
+    return {"dropped_rows": dropped, "removed_files": removed}
@@ -0,0 +1,154 @@
+# app/services/jobs.py
+"""
+Background jobs for heavy work (merges, resume screens).
+
+Jobs run on a bounded thread pool (JOB_WORKERS), each on its own event loop, so a
+long merge never occupies the API event loop. At most JOB_MAX_QUEUE jobs may wait
+behind the running ones; beyond that submit() raises JobQueueFull (HTTP 429).
+Finished jobs are kept for JOB_TTL_SECONDS so clients can poll /api/jobs/{id}.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+import logging
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.core.config import settings
+from app.core.metrics import TOOL_SECONDS
+
+class JobQueueFull(RuntimeError):
+    """Raised when the job queue is saturated."""
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    status: str = "queued"  # queued | running | succeeded | failed
+    stage: str = ""
+    done: int = 0
+    total: int = 0
+    result: Any = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    def set_progress(self, stage: str, done: int = 0, total: int = 0) -> None:
+        self.stage, self.done, self.total = stage, done, total
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": {"stage": self.stage, "done": self.done, "total": self.total},
+            "result": self.result if isinstance(self.result, dict) else None,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+class JobManager:
+    def __init__(self, workers: int, max_queue: int, ttl_seconds: int):
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self.ttl_seconds = ttl_seconds
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+        self._jobs: Dict[str, Job] = {}
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def _active(self) -> int:
+        return sum(1 for j in self._jobs.values() if j.status in ("queued", "running"))
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.ttl_seconds
+        for jid in [j.id for j in self._jobs.values() if j.finished_at and j.finished_at < cutoff]:
+            self._jobs.pop(jid, None)
+            self._futures.pop(jid, None)
+
+    def submit(
+        self,
+        kind: str,
+        fn: Callable[[Job], Awaitable[Any]],
+        keep_result: bool = True,
+    ) -> Job:
+        """
+        Queue `fn(job)` (a coroutine function) and return the Job immediately.
+        keep_result=False leaves job.result empty (for large results consumed via wait()).
+        """
+        with self._lock:
+            self._prune()
+            if self._active() >= self.workers + self.max_queue:
+                raise JobQueueFull("Server is busy: too many jobs queued. Please retry shortly.")
+            job = Job(id=uuid.uuid4().hex, kind=kind)
+            self._jobs[job.id] = job
+            ctx = contextvars.copy_context()  # keep request-scoped context in the worker
+            self._futures[job.id] = self._pool.submit(ctx.run, self._run, job, fn, keep_result)
+        return job
+
+    def _run(self, job: Job, fn: Callable[[Job], Awaitable[Any]], keep_result: bool) -> Any:
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            value = asyncio.run(fn(job))
+        except Exception as e:
+            logging.exception("Job %s (%s) failed", job.id, job.kind)
+            job.error = str(e)
+            job.status = "failed"
+            raise
+        finally:
+            job.finished_at = time.time()
+            elapsed = job.finished_at - job.started_at
+            TOOL_SECONDS.labels(tool=job.kind, status="failed" if job.error else "succeeded").observe(elapsed)
+            logging.info("Job %s (%s) finished in %.2fs", job.id, job.kind, elapsed)
+        if keep_result:
+            job.result = value
+        job.status = "succeeded"
+        return value
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    async def wait(self, job: Job) -> Any:
+        """
+        Await a job's return value from async code (re-raises its exception).
+        The manager drops its handle on the value once a waiter returns (or gives up),
+        so a keep_result=False result is freed as soon as it has been consumed; a later
+        wait() only sees job.result and job.error.
+        """
+        with self._lock:
+            fut = self._futures.get(job.id)
+        if fut is None:
+            if job.error is not None:
+                raise RuntimeError(job.error)
+            return job.result
+        try:
+            return await asyncio.wrap_future(fut)
+        finally:
+            with self._lock:
+                self._futures.pop(job.id, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "queued": sum(1 for j in jobs if j.status == "queued"),
+            "running": sum(1 for j in jobs if j.status == "running"),
+        }
+
+jobs = JobManager(
+    workers=settings.JOB_WORKERS,
+    max_queue=settings.JOB_MAX_QUEUE,
+    ttl_seconds=settings.JOB_TTL_SECONDS,
+)
@@ -0,0 +1,52 @@
+# app/services/lexical_index.py
+"""
+Small in-process BM25 index used to rank resumes against a JD locally
+before any LLM call. Pure Python; no external dependencies.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+import math
+import re
+from typing import Dict, List
+
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9+#.]*[a-z0-9+#]|[a-z0-9]")
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were will with "
+    "we you your our they their he she his her i me my not but if so do does did can could should would "
+    "about into over than then there these those such any all each other more most some very also".split()
+)
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN.findall(text.lower()) if t not in _STOPWORDS]
+
+class BM25Index:
+    """Okapi BM25 over a fixed list of documents (k1=1.5, b=0.75)."""
+
+    def __init__(self, docs: List[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._tfs: List[Counter] = [Counter(tokenize(d)) for d in docs]
+        self._lens = [sum(tf.values()) for tf in self._tfs]
+        self._avg_len = (sum(self._lens) / len(self._lens)) if self._lens else 0.0
+        df: Counter = Counter()
+        for tf in self._tfs:
+            df.update(tf.keys())
+        n = len(self._tfs)
+        self._idf: Dict[str, float] = {t: math.log(1 + (n - d + 0.5) / (d + 0.5)) for t, d in df.items()}
+
+    def scores(self, query: str) -> List[float]:
+        """BM25 score of every document for `query` (each distinct query term counted once)."""
+        terms = [t for t in set(tokenize(query)) if t in self._idf]
+        out = []
+        for tf, length in zip(self._tfs, self._lens):
+            norm = self.k1 * (1 - self.b + self.b * length / self._avg_len) if self._avg_len else self.k1
+            s = 0.0
+            for t in terms:
+                f = tf.get(t)
+                if f:
+                    s += self._idf[t] * f * (self.k1 + 1) / (f + norm)
+            out.append(s)
+        return out
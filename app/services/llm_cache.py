@@ -0,0 +1,138 @@
+# app/services/llm_cache.py
+"""
+Persistent cache for chat-completion responses.
+
+Entries are keyed on (model, temperature, response_format, sha256(prompt)) and
+stored in a local SQLite file. Expired rows (LLM_CACHE_TTL_SECONDS) are treated as
+misses and purged; when the table grows past LLM_CACHE_MAX_ENTRIES the least
+recently used rows are evicted. Hit/miss counters are per process.
+
+The same class backs the per-document summary memo (`summary_memo`), which maps a
+document's content hash and summarization parameters to its finished summary.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.core.metrics import LLM_CACHE_LOOKUPS
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_llm_cache_last_access ON llm_cache(last_access);
+"""
+
+class LLMCache:
+    def __init__(self, path: str, ttl_seconds: int, max_entries: int, enabled: bool = True, name: str = "llm"):
+        self.name = name
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._puts = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def make_key(model: str, temperature: float, response_format: Optional[Dict[str, Any]], prompt: str) -> str:
+        parts = {
+            "model": model,
+            "temperature": temperature,
+            "response_format": response_format,
+            "prompt": hashlib.sha256(prompt.encode("utf-8")).hexdigest(),
+        }
+        return hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            row = db.execute("SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None or (self.ttl_seconds > 0 and now - row[1] > self.ttl_seconds):
+                if row is not None:
+                    db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self.misses += 1
+                LLM_CACHE_LOOKUPS.labels(cache=self.name, result="miss").inc()
+                return None
+            db.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            LLM_CACHE_LOOKUPS.labels(cache=self.name, result="hit").inc()
+            return row[0]
+
+    def put(self, key: str, value: str) -> None:
+        if not self.enabled:
+            return
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "INSERT OR REPLACE INTO llm_cache(key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            self._puts += 1
+            if self._puts % 100 == 0:
+                self._evict(db, now)
+
+    def _evict(self, db: sqlite3.Connection, now: float) -> None:
+        if self.ttl_seconds > 0:
+            db.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+        (count,) = db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+        if count > self.max_entries:
+            db.execute(
+                "DELETE FROM llm_cache WHERE key IN "
+                "(SELECT key FROM llm_cache ORDER BY last_access ASC LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._db().execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] if self.enabled else 0
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+cache = LLMCache(
+    path=settings.LLM_CACHE_PATH,
+    ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+    max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+    enabled=settings.LLM_CACHE_ENABLED,
+)
+
+summary_memo = LLMCache(
+    path=settings.SUMMARY_MEMO_PATH,
+    ttl_seconds=settings.SUMMARY_MEMO_TTL_SECONDS,
+    max_entries=settings.SUMMARY_MEMO_MAX_ENTRIES,
+    enabled=settings.LLM_CACHE_ENABLED,
+    name="summary",
+)
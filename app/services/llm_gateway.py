@@ -0,0 +1,284 @@
+# app/services/llm_gateway.py
+"""
+Single entry point for chat-completion calls made by the services.
+
+- Pooled HTTP: async calls from every loop (requests, jobs, run_sync) go through one
+  long-lived client on the gateway's own event loop thread, and sync calls through
+  one shared sync client; each keeps at most LLM_MAX_CONNECTIONS keep-alive
+  connections for the process. OPENAI_BASE_URL points them elsewhere. close()
+  (called at app shutdown) closes both.
+- Rate limiting: token buckets for requests/min (LLM_RPM) and tokens/min (LLM_TPM).
+  The limits are for the whole deployment: each of the WEB_CONCURRENCY worker
+  processes enforces its share (limit / WEB_CONCURRENCY). A call reserves its
+  tiktoken estimate (prompt + expected completion) before it is sent; once the
+  response arrives the bucket is corrected with the real `usage.total_tokens`.
+- Retries: 429, 5xx, timeouts and connection errors are retried up to LLM_MAX_RETRIES
+  times with full-jitter exponential backoff (honouring Retry-After when given).
+- Timeouts: each attempt is bounded by LLM_TIMEOUT_SECONDS.
+- Accounting: each response's usage is charged to the current principal in the
+  token ledger (app/services/token_ledger.py).
+
+Within a process the buckets are shared by every loop and thread (jobs run on their
+own loops), so parallel merges and resume screens draw from one budget. Retries,
+rate limiting and usage accounting run in the caller's context; only the HTTP
+request itself runs on the gateway loop.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import openai
+from openai import AsyncOpenAI, OpenAI
+from openai._constants import DEFAULT_CONNECTION_LIMITS
+
+from app.core.concurrency import LoopThread
+from app.core.config import settings
+from app.core.metrics import LLM_TOKENS
+from app.services.token_ledger import token_ledger
+from app.services.tokens import count_tokens
+
+import logging
+
+# Completion size assumed when reserving TPM budget; corrected from `usage` afterwards
+_OUTPUT_ESTIMATE_TOKENS = 512
+
+_RETRYABLE = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+class TokenBucket:
+    """Refills `per_minute` units per minute up to `per_minute`; per_minute <= 0 disables it."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.capacity / 60.0)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` units are available (0 = take them now)."""
+        if self.capacity <= 0:
+            return 0.0
+        self._refill(now)
+        amount = min(amount, self.capacity)  # an oversized call waits for a full bucket, not forever
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) * 60.0 / self.capacity
+
+    def take(self, amount: float) -> None:
+        if self.capacity > 0:
+            self.level -= min(amount, self.capacity)
+
+    def adjust(self, delta: float) -> None:
+        """Give back (delta > 0) or charge (delta < 0) units after the fact."""
+        if self.capacity > 0:
+            self.level = min(self.capacity, self.level + delta)
+
+class RateLimiter:
+    def __init__(self, rpm: int, tpm: int):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self._lock = threading.Lock()
+        self.throttled_seconds = 0.0
+
+    def _try(self, est_tokens: int) -> float:
+        with self._lock:
+            now = time.monotonic()
+            delay = max(self.requests.wait_time(1, now), self.tokens.wait_time(est_tokens, now))
+            if delay <= 0:
+                self.requests.take(1)
+                self.tokens.take(est_tokens)
+            else:
+                self.throttled_seconds += delay
+            return delay
+
+    async def acquire(self, est_tokens: int) -> None:
+        while (delay := self._try(est_tokens)) > 0:
+            await asyncio.sleep(delay)
+
+    def acquire_sync(self, est_tokens: int) -> None:
+        while (delay := self._try(est_tokens)) > 0:
+            time.sleep(delay)
+
+    def reconcile(self, est_tokens: int, actual_tokens: int) -> None:
+        with self._lock:
+            self.tokens.adjust(est_tokens - actual_tokens)
+
+class LLMGateway:
+    def __init__(self):
+        shares = max(1, settings.WEB_CONCURRENCY)
+        self.limiter = RateLimiter(settings.LLM_RPM / shares, settings.LLM_TPM / shares)
+        self.max_retries = max(0, settings.LLM_MAX_RETRIES)
+        self.timeout = settings.LLM_TIMEOUT_SECONDS
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.estimated_tokens = 0
+        self.actual_tokens = 0
+        self._lock = threading.Lock()
+        self._loop = LoopThread("llm-gateway")
+        self._aclient: Optional[AsyncOpenAI] = None  # created, used and closed on the gateway loop only
+        self._client: Optional[OpenAI] = None
+
+    @staticmethod
+    def _limits() -> Any:
+        # built with the SDK's own Limits class: depending on the openai version its
+        # default clients sit on httpx or httpx2, and only that one is installed
+        n = max(1, settings.LLM_MAX_CONNECTIONS)
+        return type(DEFAULT_CONNECTION_LIMITS)(
+            max_connections=n, max_keepalive_connections=n, keepalive_expiry=DEFAULT_CONNECTION_LIMITS.keepalive_expiry
+        )
+
+    def _async_client(self) -> AsyncOpenAI:
+        # retries are handled here, so the SDK's own retry loop is off
+        if self._aclient is None:
+            self._aclient = AsyncOpenAI(
+                api_key=settings.OPENAI_API_KEY,
+                base_url=settings.OPENAI_BASE_URL or None,
+                max_retries=0,
+                http_client=openai.DefaultAsyncHttpxClient(limits=self._limits()),
+            )
+        return self._aclient
+
+    def client(self) -> OpenAI:
+        with self._lock:
+            if self._client is None:
+                self._client = OpenAI(
+                    api_key=settings.OPENAI_API_KEY,
+                    base_url=settings.OPENAI_BASE_URL or None,
+                    max_retries=0,
+                    http_client=openai.DefaultHttpxClient(limits=self._limits()),
+                )
+            return self._client
+
+    @staticmethod
+    def estimate_tokens(messages: List[Dict[str, Any]], model: str) -> int:
+        prompt = sum(count_tokens(str(m.get("content") or ""), model) + 4 for m in messages)
+        return prompt + _OUTPUT_ESTIMATE_TOKENS
+
+    def _backoff(self, attempt: int, err: Exception) -> float:
+        retry_after = None
+        response = getattr(err, "response", None)
+        if response is not None:
+            try:
+                retry_after = float(response.headers.get("retry-after"))
+            except (TypeError, ValueError):
+                pass
+        # full jitter: uniform(0, base * 2^attempt), capped
+        delay = random.uniform(0, min(settings.LLM_BACKOFF_MAX, settings.LLM_BACKOFF_BASE * 2 ** attempt))
+        return max(delay, retry_after or 0.0)
+
+    def _record(self, resp: Any, est: int) -> None:
+        usage = getattr(resp, "usage", None)
+        actual = getattr(usage, "total_tokens", None) or est
+        self.limiter.reconcile(est, actual)
+        if usage is not None:
+            prompt = getattr(usage, "prompt_tokens", 0) or 0
+            completion = getattr(usage, "completion_tokens", 0) or 0
+            LLM_TOKENS.labels(kind="prompt").inc(prompt)
+            LLM_TOKENS.labels(kind="completion").inc(completion)
+            details = getattr(usage, "prompt_tokens_details", None)
+            LLM_TOKENS.labels(kind="cached").inc(getattr(details, "cached_tokens", 0) or 0)
+        with self._lock:
+            self.requests += 1
+            self.estimated_tokens += est
+            self.actual_tokens += actual
+
+    @staticmethod
+    def _charge(resp: Any) -> None:
+        """Charge the response's usage to the caller's API key / address (a SQLite write)."""
+        usage = getattr(resp, "usage", None)
+        if usage is not None:
+            token_ledger.charge(getattr(usage, "prompt_tokens", 0) or 0, getattr(usage, "completion_tokens", 0) or 0)
+
+    def _refund(self, est: int, err: Exception) -> None:
+        # Nothing was generated, so return the reservation - except on 429, where keeping
+        # the bucket drained is the backpressure we want.
+        if not isinstance(err, openai.RateLimitError):
+            self.limiter.reconcile(est, 0)
+
+    def _give_up(self, attempt: int, err: Exception) -> bool:
+        with self._lock:
+            if attempt >= self.max_retries:
+                self.failures += 1
+                return True
+            self.retries += 1
+        logging.warning("LLM call failed (%s); retry %d/%d", type(err).__name__, attempt + 1, self.max_retries)
+        return False
+
+    async def achat(self, messages: List[Dict[str, Any]], model: Optional[str] = None, **kwargs: Any) -> Any:
+        """Rate-limited, retried chat.completions.create; returns the SDK response."""
+        model = model or settings.OPENAI_MODEL
+        est = self.estimate_tokens(messages, model)
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.acquire(est)
+            try:
+                resp = await self._loop.run(lambda: self._async_client().chat.completions.create(
+                    model=model, messages=messages, timeout=self.timeout, **kwargs
+                ))
+            except _RETRYABLE as e:
+                self._refund(est, e)
+                if self._give_up(attempt, e):
+                    raise
+                await asyncio.sleep(self._backoff(attempt, e))
+                continue
+            self._record(resp, est)
+            await asyncio.to_thread(self._charge, resp)  # the ledger's SQLite stays off the event loop
+            return resp
+
+    def chat(self, messages: List[Dict[str, Any]], model: Optional[str] = None, **kwargs: Any) -> Any:
+        """Blocking twin of achat for sync callers."""
+        model = model or settings.OPENAI_MODEL
+        est = self.estimate_tokens(messages, model)
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire_sync(est)
+            try:
+                resp = self.client().chat.completions.create(
+                    model=model, messages=messages, timeout=self.timeout, **kwargs
+                )
+            except _RETRYABLE as e:
+                self._refund(est, e)
+                if self._give_up(attempt, e):
+                    raise
+                time.sleep(self._backoff(attempt, e))
+                continue
+            self._record(resp, est)
+            self._charge(resp)
+            return resp
+
+    def close(self) -> None:
+        """Close the pooled clients and stop the gateway loop; later calls open new ones."""
+        async def aclose() -> None:
+            if self._aclient is not None:
+                client, self._aclient = self._aclient, None
+                await client.close()
+
+        self._loop.close(aclose)
+        with self._lock:
+            client, self._client = self._client, None
+        if client is not None:
+            client.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "retries": self.retries,
+                "failures": self.failures,
+                "estimated_tokens": self.estimated_tokens,
+                "actual_tokens": self.actual_tokens,
+                "throttled_seconds": round(self.limiter.throttled_seconds, 3),
+            }
+
+gateway = LLMGateway()
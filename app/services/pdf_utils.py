@@ -1,20 +1,202 @@
 
 from io import BytesIO
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from typing import BinaryIO, Iterator, List, Optional, Tuple, Union
+import multiprocessing
+import signal
+import threading
 import pdfplumber
 import logging
 
+from app.core.config import settings
+
+_POOL: Optional[ProcessPoolExecutor] = None
+_POOL_WORKERS = 0
+_POOL_LOCK = threading.Lock()
+
+class _PageTimeout(Exception):
+    pass
+
+def _on_alarm(signum, frame):
+    raise _PageTimeout()
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """The shared pool, (re)created with `workers` processes when its size differs."""
+    global _POOL, _POOL_WORKERS
+    with _POOL_LOCK:
+        if _POOL is not None and _POOL_WORKERS != workers:
+            _POOL.shutdown(wait=False)  # work already queued on it still completes
+            _POOL = None
+        if _POOL is None:
+            # spawn: the API process runs threads, which fork does not copy safely
+            _POOL = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _POOL_WORKERS = workers
+        return _POOL
+
+def _recycle_pool(pool: ProcessPoolExecutor) -> None:
+    """
+    Kill a pool whose worker is stuck on a page (the in-worker alarm did not fire),
+    so it stops holding a slot; the next extraction starts a fresh pool. Jobs still
+    running on it fail with BrokenProcessPool, queued ones with CancelledError; their
+    callers resubmit them.
+    """
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is pool:
+            _POOL = None
+    for proc in list((getattr(pool, "_processes", None) or {}).values()):
+        proc.kill()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def _extract_page_range(pdf_bytes: bytes, start: int, end: int, page_timeout: float) -> List[str]:
+    """
+    Worker: extract pages [start, end). A page that takes longer than page_timeout
+    seconds (POSIX only) or raises is logged and returned as "".
+    """
+    use_alarm = page_timeout > 0 and hasattr(signal, "setitimer")
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _on_alarm)
+    out = []
+    with pdfplumber.open(BytesIO(pdf_bytes)) as pdf:
+        for i in range(start, end):
+            try:
+                if use_alarm:
+                    signal.setitimer(signal.ITIMER_REAL, page_timeout)
+                out.append(pdf.pages[i].extract_text() or "")
+            except _PageTimeout:
+                logging.warning(f"PDF page {i + 1} timed out after {page_timeout}s; skipped.")
+                out.append("")
+            except Exception as e:
+                logging.warning(f"PDF page {i + 1} failed: {e}")
+                out.append("")
+            finally:
+                if use_alarm:
+                    signal.setitimer(signal.ITIMER_REAL, 0)
+    return out
+
+def _page_count(pdf_bytes: bytes) -> int:
+    with pdfplumber.open(BytesIO(pdf_bytes)) as pdf:
+        return len(pdf.pages)
+
+def _pages_text(pdf) -> str:
+    text_all = []
+    for pg in pdf.pages:
+        t = pg.extract_text() or ""
+        if t:
+            text_all.append(t)
+    return "\n".join(text_all)
+
+def _extract_serial(pdf_bytes: bytes) -> str:
+    with pdfplumber.open(BytesIO(pdf_bytes)) as pdf:
+        return _pages_text(pdf)
+
+def iter_pdf_pages(source: Union[str, BinaryIO]) -> Iterator[str]:
+    """
+    Yield the text of a PDF (path or binary file object) one page at a time, with
+    the same "\n" separators as extract_text_from_pdf_bytes, releasing each page's
+    parsed objects before the next. A page that fails is logged and skipped.
+    """
+    with pdfplumber.open(source) as pdf:
+        first = True
+        for i, pg in enumerate(pdf.pages):
+            try:
+                t = pg.extract_text() or ""
+            except Exception as e:
+                logging.warning(f"PDF page {i + 1} failed: {e}")
+                t = ""
+            finally:
+                pg.close()  # drop the page's cached layout objects
+            if t:
+                yield t if first else "\n" + t
+                first = False
+
+def iter_pdf_page_lines(source: Union[str, BinaryIO]) -> Iterator[Tuple[float, List[Tuple[str, float, float]]]]:
+    """
+    Yield (page height, [(text, top, bottom), ...]) for each page of a PDF, lines in
+    reading order with their vertical position in points from the top of the page.
+    A page that fails is logged and yields no lines.
+    """
+    with pdfplumber.open(source) as pdf:
+        for i, pg in enumerate(pdf.pages):
+            height = float(pg.height)
+            try:
+                lines = [(ln["text"], ln["top"], ln["bottom"]) for ln in pg.extract_text_lines(return_chars=False)]
+            except Exception as e:
+                logging.warning(f"PDF page {i + 1} failed: {e}")
+                lines = []
+            finally:
+                pg.close()
+            yield height, lines
+
+def _submit_range(
+    workers: int, pdf_bytes: bytes, s: int, e: int, page_timeout: float
+) -> Tuple[ProcessPoolExecutor, Future]:
+    pool = _get_pool(workers)
+    return pool, pool.submit(_extract_page_range, pdf_bytes, s, e, page_timeout)
+
+def extract_text_from_pdf_bytes_parallel(
+    pdf_bytes: bytes,
+    workers: Optional[int] = None,
+    page_timeout: Optional[float] = None,
+    n_pages: Optional[int] = None,
+) -> str:
+    """
+    Extract text with pages split into contiguous ranges across a process pool.
+    Page order is preserved; pages that time out or fail contribute no text.
+    A range that outlives its time budget has its pool killed and replaced, so a
+    stuck worker never keeps a slot. Pass n_pages when the caller already knows it.
+    workers=1 extracts serially in this thread, with the same output.
+    """
+    workers = max(1, workers or settings.PDF_WORKERS)
+    if workers == 1:
+        return _extract_serial(pdf_bytes)
+    page_timeout = settings.PDF_PAGE_TIMEOUT if page_timeout is None else page_timeout
+    n = _page_count(pdf_bytes) if n_pages is None else n_pages
+    if n == 0:
+        return ""
+
+    # ~2 ranges per worker keeps workers busy when page costs are uneven
+    step = max(1, -(-n // (workers * 2)))
+    ranges = [(s, min(n, s + step)) for s in range(0, n, step)]
+    submitted = [_submit_range(workers, pdf_bytes, s, e, page_timeout) for s, e in ranges]
+
+    text_all = []
+    for (s, e), (pool, fut) in zip(ranges, submitted):
+        # backstop in case the in-worker alarm cannot fire (e.g. stuck in C code)
+        budget = page_timeout * (e - s) + 30 if page_timeout > 0 else None
+        for attempt in range(2):
+            try:
+                pages = fut.result(timeout=budget)
+            except FutureTimeout:
+                logging.error(f"PDF pages {s + 1}-{e} timed out; skipped.")
+                _recycle_pool(pool)
+                pages = []
+            except (BrokenProcessPool, CancelledError):
+                # the pool was recycled because of another stuck range; run this one again
+                if attempt:
+                    logging.error(f"PDF pages {s + 1}-{e} could not be extracted; skipped.")
+                    pages = []
+                else:
+                    pool, fut = _submit_range(workers, pdf_bytes, s, e, page_timeout)
+                    continue
+            break
+        text_all.extend(t for t in pages if t)
+    return "\n".join(text_all)
+
 def extract_text_from_pdf_bytes(pdf_bytes: bytes) -> str:
     """
     Extract text from PDF bytes using pdfplumber.
+    Documents with at least PDF_PARALLEL_MIN_PAGES pages go through the process pool
+    when PDF_WORKERS > 1; everything else is extracted serially in this thread.
     """
     try:
-        text_all = []
+        # one open serves both the page count and, for small documents, the extraction
         with pdfplumber.open(BytesIO(pdf_bytes)) as pdf:
-            for pg in pdf.pages:
-                t = pg.extract_text() or ""
-                if t:
-                    text_all.append(t)
-        return "\n".join(text_all)
+            n = len(pdf.pages)
+            if settings.PDF_WORKERS <= 1 or n < settings.PDF_PARALLEL_MIN_PAGES:
+                return _pages_text(pdf)
+        return extract_text_from_pdf_bytes_parallel(pdf_bytes, n_pages=n)
     except Exception as e:
         logging.error(f"PDF extraction failed: {e}")
         return ""
@@ -0,0 +1,233 @@
+# app/services/precompress.py
+"""
+Local, CPU-only pre-compression of document text before the summarizer's map calls
+(enabled with PRECOMPRESS_RATIO > 0).
+
+- strip_page_margins: drops running headers/footers and page numbers from PDFs:
+  lines in the top or bottom band of a page (pdfplumber positions) whose text,
+  digits ignored, recurs in that band on several pages. Body text is never
+  touched, nor are numbered headings such as "Article 3" or "Step 2", and other
+  formats (no page geometry) pass through whole.
+- prune_chunk: ranks a chunk's sentences with TextRank over TF-IDF vectors and keeps
+  the best ones, in their original order, until PRECOMPRESS_RATIO of the chunk's
+  tokens is reached. The chunk's boundaries, and so its overlap with neighbours,
+  are those of the unpruned text.
+
+The summarizer adds the tokens both remove to token_stats.
+"""
+
+from __future__ import annotations
+
+from collections import Counter, deque
+from dataclasses import dataclass
+import math
+import re
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.services.tokens import count_tokens
+
+# Top/bottom share of the page height where running headers and footers sit
+_MARGIN_BAND = 0.1
+# Lines longer than this are body text, never a header/footer
+_MAX_MARGIN_CHARS = 120
+# A margin line is boilerplate once it (digits ignored) occurs in the band of this many pages
+_MIN_REPEAT = 3
+# Pages held back before being emitted, so a header's first occurrences are caught too
+_LOOKAHEAD_PAGES = 8
+# Distinct candidate lines tracked per document
+_MAX_TRACKED = 100_000
+
+_DIGITS = re.compile(r"\d+")
+_SPACES = re.compile(r"\s+")
+_PAGE_NUMBER = re.compile(r"^[-–—(\[]?\s*(page\s*)?#(\s*(/|of)\s*#)?\s*[-–—)\]]?$")
+_LETTERS = re.compile(r"[^\W\d_]")
+# Numbered headings that repeat with only the number changing ("Article 1", "Step 2 of 5")
+_HEADING = re.compile(
+    r"^(article|section|sec\.|§|chapter|part|step|clause|schedule|appendix|annex|exhibit|item|rule|"
+    r"phase|stage|lesson|module|unit|question|task)\s*(#|[ivxlc]+\b)"
+)
+
+_PARA_SPLIT = re.compile(r"\n\s*\n")
+_SENT_SPLIT = re.compile(r"(?<=[.!?])\s+")
+_WORD = re.compile(r"[^\W_]{2,}")
+_STOPWORDS = frozenset(
+    "a an and are as at be been but by can for from has have he her his i if in into is it its may more "
+    "no not of on or our shall she should so such than that the their them then there these they this "
+    "to was we were which while who will with would you your".split()
+)
+
+_DAMPING = 0.85
+_ITERATIONS = 30
+_TOLERANCE = 1e-6
+# Sentences ranked together; larger chunks are ranked window by window (the similarity
+# graph is quadratic in its size), which also keeps every part of the chunk represented
+_GRAPH_SENTENCES = 200
+
+# (page height, [(text, top, bottom), ...]), as produced by pdf_utils.iter_pdf_page_lines
+PageLines = Tuple[float, List[Tuple[str, float, float]]]
+
+@dataclass
+class Savings:
+    """Tokens removed before the map calls."""
+    boilerplate_tokens: int = 0
+    pruned_tokens: int = 0
+
+    @property
+    def total(self) -> int:
+        return self.boilerplate_tokens + self.pruned_tokens
+
+# ---- running headers / footers (PDF) ----
+
+def _margin_key(line: str) -> str:
+    """Comparison key for a line in a page's margin band ("" = never boilerplate)."""
+    text = line.strip()
+    if not text or len(text) > _MAX_MARGIN_CHARS:
+        return ""
+    key = _SPACES.sub(" ", _DIGITS.sub("#", text.lower()))
+    if _HEADING.match(key):
+        return ""  # a numbered heading that happens to open or close a page
+    if not _LETTERS.search(key) and not _PAGE_NUMBER.match(key):
+        return ""  # number-only lines such as table rows are content; page numbers are not
+    return key
+
+def strip_page_margins(
+    pages: Iterable[PageLines], on_stripped: Optional[Callable[[str], None]] = None
+) -> Iterator[str]:
+    """
+    The text of a PDF, one piece per page with the same "\n" separators as
+    pdf_utils.iter_pdf_pages, without its running headers/footers; a header such as
+    "ACME Corp — Annual Report 2024 — Page 3 of 40" matches on every page because
+    digits are ignored. Each dropped line is passed to `on_stripped`. At most
+    _LOOKAHEAD_PAGES pages are held back.
+    """
+    counts: Counter = Counter()
+    held: Deque[List[Tuple[str, str]]] = deque()
+    first = True
+
+    def hold(height: float, lines: List[Tuple[str, float, float]]) -> None:
+        band = height * _MARGIN_BAND
+        page = []
+        for text, top, bottom in lines:
+            key = _margin_key(text) if top < band or bottom > height - band else ""
+            page.append((text, key))
+        for key in {k for _, k in page if k}:  # once per page
+            if key in counts or len(counts) < _MAX_TRACKED:
+                counts[key] += 1
+        held.append(page)
+
+    def release() -> str:
+        out = []
+        for text, key in held.popleft():
+            if key and counts[key] >= _MIN_REPEAT:
+                if on_stripped:
+                    on_stripped(text)
+            else:
+                out.append(text)
+        return "\n".join(out)
+
+    def emit(text: str) -> Iterator[str]:
+        nonlocal first
+        if text:
+            yield text if first else "\n" + text
+            first = False
+
+    for height, lines in pages:
+        hold(height, lines)
+        if len(held) > _LOOKAHEAD_PAGES:
+            yield from emit(release())
+    while held:
+        yield from emit(release())
+
+# ---- sentence ranking ----
+
+def _sentences(text: str) -> List[List[str]]:
+    """Sentences per paragraph; lines wrapped inside a paragraph are joined."""
+    out = []
+    for para in _PARA_SPLIT.split(text):
+        para = _SPACES.sub(" ", para).strip()
+        if para:
+            out.append([s for s in _SENT_SPLIT.split(para) if s])
+    return out
+
+def _tfidf(sentences: List[str]) -> List[Dict[str, float]]:
+    """L2-normalized TF-IDF vector per sentence (the sentences are the documents)."""
+    bags = [Counter(w for w in _WORD.findall(s.lower()) if w not in _STOPWORDS) for s in sentences]
+    df: Counter = Counter()
+    for bag in bags:
+        df.update(bag.keys())
+    n = len(sentences)
+    vectors = []
+    for bag in bags:
+        vec = {w: tf * (math.log((1 + n) / (1 + df[w])) + 1) for w, tf in bag.items()}
+        norm = math.sqrt(sum(v * v for v in vec.values())) or 1.0
+        vectors.append({w: v / norm for w, v in vec.items()})
+    return vectors
+
+def _textrank(vectors: List[Dict[str, float]]) -> List[float]:
+    """TextRank (weighted PageRank) on the cosine-similarity graph of the vectors."""
+    n = len(vectors)
+    postings: Dict[str, List[Tuple[int, float]]] = {}
+    for i, vec in enumerate(vectors):
+        for w, v in vec.items():
+            postings.setdefault(w, []).append((i, v))
+    edges: List[Dict[int, float]] = [{} for _ in range(n)]
+    for plist in postings.values():
+        for a, (i, vi) in enumerate(plist):
+            for j, vj in plist[a + 1:]:
+                edges[i][j] = edges[i].get(j, 0.0) + vi * vj
+                edges[j][i] = edges[j].get(i, 0.0) + vi * vj
+    out_weight = [sum(e.values()) for e in edges]
+    scores = [1.0 / n] * n
+    for _ in range(_ITERATIONS):
+        nxt = [
+            (1 - _DAMPING) / n + _DAMPING * sum(scores[j] * w / out_weight[j] for j, w in edges[i].items())
+            for i in range(n)
+        ]
+        converged = max(abs(a - b) for a, b in zip(nxt, scores)) < _TOLERANCE
+        scores = nxt
+        if converged:
+            break
+    return scores
+
+def rank_sentences(sentences: List[str]) -> List[float]:
+    """TextRank score per sentence; IDF comes from all of them, graphs from windows of _GRAPH_SENTENCES."""
+    vectors = _tfidf(sentences)
+    scores: List[float] = []
+    for start in range(0, len(vectors), _GRAPH_SENTENCES):
+        scores.extend(_textrank(vectors[start:start + _GRAPH_SENTENCES]))
+    return scores
+
+def prune_chunk(text: str, n_tokens: int, ratio: float, min_sentences: int, model: str) -> Tuple[str, int, int]:
+    """
+    (text, tokens, pruned tokens) for a chunk of `n_tokens` tokens: its highest-ranked
+    sentences, about `ratio` of its tokens per ranking window, in their original
+    order with paragraph breaks kept. Chunks with fewer than `min_sentences`
+    sentences, and ratio >= 1, leave the chunk as it is.
+    """
+    if ratio >= 1:
+        return text, n_tokens, 0
+    paras = _sentences(text)
+    flat = [(p, s) for p, sents in enumerate(paras) for s in sents]
+    if len(flat) < max(2, min_sentences):
+        return text, n_tokens, 0
+
+    sizes = [count_tokens(s, model) for _, s in flat]
+    scores = rank_sentences([s for _, s in flat])
+    keep = set()
+    for start in range(0, len(flat), _GRAPH_SENTENCES):
+        window = range(start, min(start + _GRAPH_SENTENCES, len(flat)))
+        budget = ratio * sum(sizes[i] for i in window)
+        kept = 0
+        for i in sorted(window, key=lambda i: (-scores[i], i)):
+            if kept >= budget:
+                break
+            keep.add(i)
+            kept += sizes[i]
+
+    out: List[List[str]] = [[] for _ in paras]
+    for i in sorted(keep):
+        p, s = flat[i]
+        out[p].append(s)
+    pruned = "\n\n".join(" ".join(sents) for sents in out if sents)
+    n = count_tokens(pruned, model)
+    return pruned, n, max(0, n_tokens - n)
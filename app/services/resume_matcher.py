@@ -1,75 +1,129 @@
 # app/services/resume_matcher.py
 from __future__ import annotations
 
-from io import BytesIO, StringIO
-from typing import List, Tuple, Optional, Dict
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from typing import Callable, List, Tuple, Optional, Dict
 import csv
+import json
 
-from docx import Document
-from openai import OpenAI
-
-from app.services.pdf_utils import extract_text_from_pdf_bytes
+from app.services.extraction import read_any_text
+from app.services.lexical_index import BM25Index
+from app.services.tokens import count_tokens
+from app.services.llm_cache import cache as llm_cache
+from app.services.llm_gateway import gateway
+from app.core.concurrency import run_sync
 from app.core.config import settings
+from app.core.metrics import LLM_CALL_SECONDS, timed
 
 import logging
 
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
+def _parse_json(txt: str) -> Dict:
+    try:
+        return json.loads(txt)
+    except Exception:
+        logging.warning("Resume match JSON parse fallback. Raw: %s", txt[:300])
+        # crude fallback
+        return {"raw": txt}
 
-def _read_docx_text(docx_bytes: bytes) -> str:
-    doc = Document(BytesIO(docx_bytes))
-    return "\n".join(p.text for p in doc.paragraphs if p.text)
+def _cacheable(txt: str) -> bool:
+    """Only well-formed scoring replies (one score or a batch of results) go into the LLM cache."""
+    try:
+        data = json.loads(txt)
+    except Exception:
+        return False
+    return isinstance(data, dict) and ("score" in data or isinstance(data.get("results"), list))
 
-def read_any_text(filename: str, data: bytes) -> str:
-    ext = filename.lower().rsplit(".", 1)[-1] if "." in filename else ""
-    if ext == "pdf":
-        return extract_text_from_pdf_bytes(data)
-    elif ext == "docx":
-        return _read_docx_text(data)
-    else:
-        try:
-            return data.decode("utf-8", errors="ignore")
-        except Exception:
-            return ""
+_JSON_FORMAT = {"type": "json_object"}  # JSON mode for newer models
+_TEMPERATURE = 0.2
+
+def _record_usage(resp, usage: Optional[Dict[str, int]]) -> None:
+    if usage is None:
+        return
+    u = getattr(resp, "usage", None)
+    details = getattr(u, "prompt_tokens_details", None)
+    usage["llm_calls"] = usage.get("llm_calls", 0) + 1
+    usage["prompt_tokens"] = usage.get("prompt_tokens", 0) + (getattr(u, "prompt_tokens", 0) or 0)
+    usage["completion_tokens"] = usage.get("completion_tokens", 0) + (getattr(u, "completion_tokens", 0) or 0)
+    usage["cached_tokens"] = usage.get("cached_tokens", 0) + (getattr(details, "cached_tokens", 0) or 0)
 
-def _chat_json(prompt: str, model: str = None) -> Dict:
+def _chat_json(messages: List[Dict], model: str = None, use_cache: bool = True) -> Dict:
     """
     Ask the model to return strict JSON. We parse lightly (model should comply).
+    Raw responses are served from / stored in the LLM cache unless use_cache is False;
+    malformed replies are never stored, so a failed score is really retried next time.
     """
     model = model or settings.OPENAI_MODEL
-    resp = client.chat.completions.create(
-        model=model,
-        messages=[{"role":"user","content":prompt}],
-        temperature=0.2,
-        response_format={"type":"json_object"},  # JSON mode for newer models
-    )
-    txt = resp.choices[0].message.content
-    try:
-        import json
-        return json.loads(txt)
-    except Exception:
-        logging.warning("Resume match JSON parse fallback. Raw: %s", txt[:300])
-        # crude fallback
-        return {"raw": txt}
+    key = llm_cache.make_key(model, _TEMPERATURE, _JSON_FORMAT, json.dumps(messages, sort_keys=True))
+    txt = llm_cache.get(key) if use_cache else None
+    if txt is not None and not _cacheable(txt):
+        txt = None  # stored before replies were checked
+    if txt is None:
+        with timed(LLM_CALL_SECONDS, stage="score"):
+            resp = gateway.chat(
+                messages,
+                model=model,
+                temperature=_TEMPERATURE,
+                response_format=_JSON_FORMAT,
+            )
+        txt = resp.choices[0].message.content
+        if use_cache and _cacheable(txt):
+            llm_cache.put(key, txt)
+    return _parse_json(txt)
 
-def score_single_resume(jd_text: str, resume_text: str) -> Dict:
+async def _achat_json(
+    messages: List[Dict], model: str = None, use_cache: bool = True, usage: Optional[Dict[str, int]] = None
+) -> Dict:
     """
-    Returns a dict with keys: score, strengths, gaps, summary
+    Async twin of _chat_json, used by the parallel scoring mode; adds API usage to `usage`.
+    Cache reads and writes run on a worker thread so SQLite never blocks the event loop.
+    """
+    model = model or settings.OPENAI_MODEL
+    key = llm_cache.make_key(model, _TEMPERATURE, _JSON_FORMAT, json.dumps(messages, sort_keys=True))
+    txt = await asyncio.to_thread(llm_cache.get, key) if use_cache else None
+    if txt is not None and not _cacheable(txt):
+        txt = None
+    if txt is None:
+        with timed(LLM_CALL_SECONDS, stage="score"):
+            resp = await gateway.achat(
+                messages,
+                model=model,
+                temperature=_TEMPERATURE,
+                response_format=_JSON_FORMAT,
+            )
+        _record_usage(resp, usage)
+        txt = resp.choices[0].message.content
+        if use_cache and _cacheable(txt):
+            await asyncio.to_thread(llm_cache.put, key, txt)
+    return _parse_json(txt)
+
+def _jd_prefix(jd_text: str) -> Dict:
+    """
+    System message shared by every scoring call for one JD, single or batched.
+    It is byte-identical across calls so the provider can cache it as a prompt prefix.
     """
-    prompt = f"""
-You are a recruiter. Compare the following Job Description (JD) with a single resume and produce a JSON object with fields:
+    return {"role": "system", "content": f"""You are a recruiter screening resumes against the Job Description (JD) below.
+For each resume produce:
 - score: integer 0..100 (overall match quality)
 - strengths: array of short strings (top aligned aspects)
 - gaps: array of short strings (missing or weak aspects)
 - summary: short one-paragraph rationale
+If the user message holds one resume, reply with one JSON object with exactly these fields.
+If it holds several resumes labelled [R1], [R2], ..., reply with {{"results": [{{"id": "R1", ...}}, ...]}}:
+one entry per resume, each scored independently of the others.
 
 JD:
-{jd_text}
+{jd_text}"""}
 
-Resume:
-{resume_text}
-"""
-    data = _chat_json(prompt)
-    # normalize
+def _score_messages(jd_text: str, resume_text: str) -> List[Dict]:
+    return [_jd_prefix(jd_text), {"role": "user", "content": f"Resume:\n{resume_text}"}]
+
+def _batch_messages(jd_text: str, resume_texts: List[str]) -> List[Dict]:
+    body = "\n\n".join(f"[R{i + 1}]\n{t}" for i, t in enumerate(resume_texts))
+    return [_jd_prefix(jd_text), {"role": "user", "content": f"Resumes:\n\n{body}"}]
+
+def _normalize_score(data: Dict) -> Dict:
     out = {
         "score": None,
         "strengths": [],
@@ -89,34 +143,283 @@ Resume:
         out["score"] = 0
     return out
 
+def score_single_resume(jd_text: str, resume_text: str, use_cache: bool = True) -> Dict:
+    """
+    Returns a dict with keys: score, strengths, gaps, summary
+    """
+    return _normalize_score(_chat_json(_score_messages(jd_text, resume_text), use_cache=use_cache))
+
+async def ascore_single_resume(
+    jd_text: str, resume_text: str, use_cache: bool = True, usage: Optional[Dict[str, int]] = None
+) -> Dict:
+    """Async variant of score_single_resume (same prompt, same normalization)."""
+    return _normalize_score(
+        await _achat_json(_score_messages(jd_text, resume_text), use_cache=use_cache, usage=usage)
+    )
+
+def _unreadable(fname: str) -> Dict:
+    return {
+        "name": fname, "score": 0, "strengths": [], "gaps": ["Unreadable"], "summary": "Could not extract text.",
+        "status": "unreadable",
+    }
+
+def _failed(fname: str, err: Exception) -> Dict:
+    return {
+        "name": fname, "score": 0, "strengths": [], "gaps": ["Scoring failed"], "summary": f"Error: {err}",
+        "status": "failed",
+    }
+
+async def _ascore_named(
+    jd_text: str, fname: str, rtext: str, sem: asyncio.Semaphore, use_cache: bool,
+    usage: Optional[Dict[str, int]] = None,
+) -> Dict:
+    if not rtext.strip():
+        return _unreadable(fname)
+    try:
+        async with sem:
+            info = await ascore_single_resume(jd_text, rtext, use_cache=use_cache, usage=usage)
+    except Exception as e:
+        logging.exception("Resume scoring failed: %s", fname)
+        return _failed(fname, e)
+    info["name"] = fname
+    return info
+
+def _pack_batches(items: List[Tuple[int, str]], budget: int, max_size: int) -> List[List[Tuple[int, str]]]:
+    """Greedy, order-preserving groups of at most max_size resumes and ~budget resume tokens."""
+    model = settings.OPENAI_MODEL
+    out: List[List[Tuple[int, str]]] = []
+    cur: List[Tuple[int, str]] = []
+    cur_tokens = 0
+    for i, text in items:
+        n = count_tokens(text, model)
+        if cur and (len(cur) >= max_size or cur_tokens + n > budget):
+            out.append(cur)
+            cur, cur_tokens = [], 0
+        cur.append((i, text))
+        cur_tokens += n
+    if cur:
+        out.append(cur)
+    return out
+
+async def _ascore_batch(
+    jd_text: str, batch: List[Tuple[str, str]], sem: asyncio.Semaphore, use_cache: bool,
+    usage: Optional[Dict[str, int]] = None,
+) -> List[Dict]:
+    """
+    Score several (name, text) resumes in one JSON-mode call.
+    Resumes the response leaves out or garbles are re-scored one by one.
+    """
+    if len(batch) == 1:
+        fname, rtext = batch[0]
+        return [await _ascore_named(jd_text, fname, rtext, sem, use_cache, usage)]
+    by_id: Dict[str, Dict] = {}
+    try:
+        async with sem:
+            data = await _achat_json(
+                _batch_messages(jd_text, [t for _, t in batch]), use_cache=use_cache, usage=usage
+            )
+        for entry in data.get("results") or []:
+            if isinstance(entry, dict):
+                by_id[str(entry.get("id", "")).strip("[] ")] = entry
+    except Exception:
+        logging.exception("Batched resume scoring failed; scoring %d resumes one by one", len(batch))
+
+    out: List[Optional[Dict]] = []
+    retry = []
+    for k, (fname, _) in enumerate(batch):
+        entry = by_id.get(f"R{k + 1}")
+        info = _normalize_score(entry) if entry else None
+        if info is None or info["raw"] is not None:
+            retry.append(k)
+            out.append(None)
+        else:
+            info["name"] = fname
+            out.append(info)
+    if retry:
+        logging.warning("Batch response malformed for %d of %d resumes; falling back", len(retry), len(batch))
+        singles = await asyncio.gather(*(
+            _ascore_named(jd_text, batch[k][0], batch[k][1], sem, use_cache, usage) for k in retry
+        ))
+        for k, info in zip(retry, singles):
+            out[k] = info
+    return out
+
+def _score_semaphore(concurrency: Optional[int]) -> asyncio.Semaphore:
+    return asyncio.Semaphore(max(1, concurrency or settings.RESUME_SCORE_CONCURRENCY))
+
+def _filtered(fname: str) -> Dict:
+    return {
+        "name": fname, "score": 0, "strengths": [], "gaps": ["Not shortlisted"],
+        "summary": "Skipped LLM scoring: low keyword overlap with the JD (lexical prefilter).",
+        "status": "filtered",
+    }
+
+def _prefilter(
+    jd_text: str,
+    texts: List[str],
+    top_k: Optional[int],
+    min_score: Optional[float],
+) -> Tuple[List[float], List[bool]]:
+    """
+    Rank resume texts against the JD with BM25.
+    Returns per-resume lexical scores and whether each resume goes on to LLM scoring:
+    the top_k best (0 = no cap) that also reach min_score. Unreadable texts are never shortlisted.
+    """
+    top_k = settings.RESUME_PREFILTER_TOP_K if top_k is None else top_k
+    min_score = settings.RESUME_PREFILTER_MIN_SCORE if min_score is None else min_score
+    scores = [round(x, 3) for x in BM25Index(texts).scores(jd_text)] if texts else []
+    keep = [bool(t.strip()) and sc >= min_score for t, sc in zip(texts, scores)]
+    if top_k and top_k > 0:
+        ranked = sorted((i for i, k in enumerate(keep) if k), key=lambda i: (-scores[i], i))
+        allowed = set(ranked[:top_k])
+        keep = [i in allowed for i in range(len(texts))]
+    return scores, keep
+
+async def amatch_resumes_to_jd(
+    jd_text: str,
+    resumes: List[Tuple[str, bytes]],
+    concurrency: Optional[int] = None,
+    extract_workers: Optional[int] = None,
+    use_cache: bool = True,
+    top_k: Optional[int] = None,
+    min_lexical_score: Optional[float] = None,
+    batch_size: Optional[int] = None,
+) -> List[Dict]:
+    """
+    Parallel scoring mode for match_resumes_to_jd.
+    Text extraction runs in a thread pool (extract_workers, default RESUME_EXTRACT_WORKERS),
+    then amatch_resume_texts_to_jd prefilters and scores the texts.
+    """
+    loop = asyncio.get_running_loop()
+    workers = max(1, extract_workers or settings.RESUME_EXTRACT_WORKERS)
+
+    async def extract(pool: ThreadPoolExecutor, fname: str, blob: bytes) -> str:
+        try:
+            return await loop.run_in_executor(pool, read_any_text, fname, blob)
+        except Exception:
+            logging.exception("Resume extraction failed: %s", fname)
+            return ""
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        texts = await asyncio.gather(*(extract(pool, f, b) for f, b in resumes))
+    return await amatch_resume_texts_to_jd(
+        jd_text,
+        [(f, t) for (f, _), t in zip(resumes, texts)],
+        concurrency=concurrency,
+        use_cache=use_cache,
+        top_k=top_k,
+        min_lexical_score=min_lexical_score,
+        batch_size=batch_size,
+    )
+
+async def amatch_resume_texts_to_jd(
+    jd_text: str,
+    resumes: List[Tuple[str, str]],
+    concurrency: Optional[int] = None,
+    use_cache: bool = True,
+    top_k: Optional[int] = None,
+    min_lexical_score: Optional[float] = None,
+    progress: Optional[Callable[[str, int, int], None]] = None,
+    batch_size: Optional[int] = None,
+    usage: Optional[Dict[str, int]] = None,
+) -> List[Dict]:
+    """
+    Score already-extracted (name, text) pairs concurrently.
+    Resumes are first ranked locally with BM25; only the shortlist (top_k / min_lexical_score,
+    defaults RESUME_PREFILTER_TOP_K / RESUME_PREFILTER_MIN_SCORE) is sent to the LLM, and at most
+    `concurrency` (default RESUME_SCORE_CONCURRENCY) scoring calls are in flight.
+    Shortlisted resumes are packed into batched calls of up to batch_size resumes
+    (default RESUME_BATCH_SIZE; <= 1 scores one by one) and RESUME_BATCH_TOKENS resume tokens.
+    Every call starts with the same JD system prefix, so providers can serve it from their prompt cache.
+    A failure on one resume yields a zero-score row for it instead of failing the batch.
+    Every row carries its lexical_score and a status (scored | filtered | unreadable | failed);
+    results keep the input order.
+    `progress("score", done, total)` is called as resumes finish; API usage (calls, prompt,
+    completion and cached prompt tokens) is added to `usage` when given.
+    """
+    sem = _score_semaphore(concurrency)
+    lex, keep = _prefilter(jd_text, [t for _, t in resumes], top_k, min_lexical_score)
+    results: List[Optional[Dict]] = [None] * len(resumes)
+    done = 0
+
+    def finish(i: int, info: Dict) -> None:
+        nonlocal done
+        info["lexical_score"] = lex[i]
+        info.setdefault("status", "scored" if info.get("raw") is None else "failed")
+        results[i] = info
+        done += 1
+        if progress:
+            progress("score", done, len(resumes))
+
+    to_score = []
+    for i, (fname, rtext) in enumerate(resumes):
+        if not rtext.strip():
+            finish(i, _unreadable(fname))
+        elif not keep[i]:
+            finish(i, _filtered(fname))
+        else:
+            to_score.append((i, rtext))
+
+    size = settings.RESUME_BATCH_SIZE if batch_size is None else batch_size
+    if size > 1:
+        batches = _pack_batches(to_score, settings.RESUME_BATCH_TOKENS, size)
+    else:
+        batches = [[item] for item in to_score]
+
+    async def run_batch(batch: List[Tuple[int, str]]) -> None:
+        infos = await _ascore_batch(jd_text, [(resumes[i][0], t) for i, t in batch], sem, use_cache, usage)
+        for (i, _), info in zip(batch, infos):
+            finish(i, info)
+
+    await asyncio.gather(*(run_batch(b) for b in batches))
+    if usage is not None and usage.get("llm_calls"):
+        logging.info(
+            "Resume scoring: %d LLM calls for %d resumes, %d of %d prompt tokens cached",
+            usage["llm_calls"], len(to_score), usage.get("cached_tokens", 0), usage.get("prompt_tokens", 0),
+        )
+    return results
+
 def match_resumes_to_jd(
     jd_text: str,
     resumes: List[Tuple[str, bytes]],
+    parallel: bool = False,
+    use_cache: bool = True,
+    top_k: Optional[int] = None,
+    min_lexical_score: Optional[float] = None,
 ) -> List[Dict]:
     """
     resumes: list of (filename, bytes)
-    Returns: list of result dicts per resume: {name, score, strengths, gaps, summary}
+    Returns: list of result dicts per resume: {name, score, strengths, gaps, summary, lexical_score}
+    parallel=True delegates to amatch_resumes_to_jd.
     """
+    if parallel:
+        return run_sync(amatch_resumes_to_jd(
+            jd_text, resumes, use_cache=use_cache, top_k=top_k, min_lexical_score=min_lexical_score
+        ))
+    texts = [read_any_text(fname, blob) for fname, blob in resumes]
+    lex, keep = _prefilter(jd_text, texts, top_k, min_lexical_score)
     results = []
-    for fname, blob in resumes:
-        rtext = read_any_text(fname, blob)
+    for (fname, _), rtext, lscore, shortlisted in zip(resumes, texts, lex, keep):
         if not rtext.strip():
-            results.append({"name": fname, "score": 0, "strengths": [], "gaps": ["Unreadable"], "summary": "Could not extract text."})
-            continue
-        info = score_single_resume(jd_text, rtext)
-        info["name"] = fname
+            info = _unreadable(fname)
+        elif not shortlisted:
+            info = _filtered(fname)
+        else:
+            info = score_single_resume(jd_text, rtext, use_cache=use_cache)
+            info["name"] = fname
+        info["lexical_score"] = lscore
         results.append(info)
     return results
 
 def results_to_csv_bytes(items: List[Dict]) -> bytes:
     """
-    Create a compact CSV containing name, score, strengths(g|sep), gaps(g|sep), summary
+    Create a compact CSV containing name, score, lexical score, strengths(g|sep), gaps(g|sep), summary
     """
     buf = StringIO()
     w = csv.writer(buf)
-    w.writerow(["Resume", "Score", "Strengths", "Gaps", "Summary"])
+    w.writerow(["Resume", "Score", "Lexical Score", "Strengths", "Gaps", "Summary"])
     for it in items:
         strengths = " | ".join(it.get("strengths", []))
         gaps = " | ".join(it.get("gaps", []))
-        w.writerow([it.get("name",""), it.get("score",0), strengths, gaps, it.get("summary","")])
+        w.writerow([it.get("name",""), it.get("score",0), it.get("lexical_score",""), strengths, gaps, it.get("summary","")])
     return buf.getvalue().encode("utf-8")
@@ -0,0 +1,257 @@
+# app/services/sessions.py
+"""
+Chat session store (session_id -> agent input list).
+
+Two backends behind one interface:
+- memory: an LRU OrderedDict in this process.
+- sqlite: a local SQLite file (WAL), shared by every worker on the host and kept across restarts.
+
+Both evict sessions idle for longer than SESSION_IDLE_TTL_SECONDS, cap the number of
+sessions (SESSION_MAX_SESSIONS) and the total serialized size (SESSION_MAX_TOTAL_MB),
+evicting least recently used sessions first. A single history is trimmed from its
+oldest turns once it exceeds SESSION_MAX_ITEMS items or SESSION_MAX_SESSION_KB.
+Histories are stored as JSON, so sizes are counted in serialized bytes.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+def _trim(items: List[dict], max_items: int, max_bytes: int) -> Tuple[str, int]:
+    """
+    Serialize `items`, dropping the oldest turns until both limits hold.
+    Cuts land on a user message so a tool output never loses its call.
+    Returns (json, dropped item count).
+    """
+    start = 0
+    while True:
+        kept = items[start:]
+        blob = json.dumps(kept, ensure_ascii=False, default=str)
+        over = (max_items > 0 and len(kept) > max_items) or (max_bytes > 0 and len(blob.encode("utf-8")) > max_bytes)
+        if not over or len(kept) <= 1:
+            return blob, start
+        start += 1
+        while start < len(items) - 1 and items[start].get("role") != "user":
+            start += 1
+
+class SessionStore:
+    """Common limits and counters; backends implement _load/_save/_delete/_evict/_usage."""
+
+    backend = ""
+
+    def __init__(
+        self,
+        max_sessions: int,
+        idle_ttl_seconds: int,
+        max_total_bytes: int,
+        max_items: int,
+        max_session_bytes: int,
+    ):
+        self.max_sessions = max_sessions
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.max_total_bytes = max_total_bytes
+        self.max_items = max_items
+        self.max_session_bytes = max_session_bytes
+        self.evictions = 0
+        self.trimmed_items = 0
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> Optional[List[dict]]:
+        with self._lock:
+            blob = self._load(session_id, time.time())
+        return json.loads(blob) if blob is not None else None
+
+    def put(self, session_id: str, items: List[dict]) -> None:
+        blob, dropped = _trim(items, self.max_items, self.max_session_bytes)
+        if dropped:
+            logging.info("Session %s trimmed by %d items", session_id, dropped)
+        now = time.time()
+        with self._lock:
+            self.trimmed_items += dropped
+            self._save(session_id, blob, now)
+            self.evictions += self._evict(now, keep=session_id)
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._delete(session_id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count, size = self._usage()
+        return {
+            "backend": self.backend,
+            "sessions": count,
+            "bytes": size,
+            "evictions": self.evictions,
+            "trimmed_items": self.trimmed_items,
+        }
+
+    def _load(self, session_id: str, now: float) -> Optional[str]:
+        raise NotImplementedError
+
+    def _save(self, session_id: str, blob: str, now: float) -> None:
+        raise NotImplementedError
+
+    def _delete(self, session_id: str) -> None:
+        raise NotImplementedError
+
+    def _evict(self, now: float, keep: str) -> int:
+        raise NotImplementedError
+
+    def _usage(self) -> Tuple[int, int]:
+        raise NotImplementedError
+
+class MemorySessionStore(SessionStore):
+    backend = "memory"
+
+    def __init__(self, **limits: int):
+        super().__init__(**limits)
+        self._data: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()  # id -> (json, last_access)
+        self._bytes = 0
+
+    def _load(self, session_id: str, now: float) -> Optional[str]:
+        entry = self._data.get(session_id)
+        if entry is None:
+            return None
+        if self.idle_ttl_seconds > 0 and now - entry[1] > self.idle_ttl_seconds:
+            self._delete(session_id)
+            self.evictions += 1
+            return None
+        self._data[session_id] = (entry[0], now)
+        self._data.move_to_end(session_id)
+        return entry[0]
+
+    def _save(self, session_id: str, blob: str, now: float) -> None:
+        self._delete(session_id)
+        self._data[session_id] = (blob, now)
+        self._bytes += len(blob.encode("utf-8"))
+
+    def _delete(self, session_id: str) -> None:
+        entry = self._data.pop(session_id, None)
+        if entry is not None:
+            self._bytes -= len(entry[0].encode("utf-8"))
+
+    def _evict(self, now: float, keep: str) -> int:
+        evicted = 0
+        if self.idle_ttl_seconds > 0:
+            # LRU order == idle order, so expired sessions sit at the front
+            while self._data:
+                sid, (_, last) = next(iter(self._data.items()))
+                if now - last <= self.idle_ttl_seconds:
+                    break
+                self._delete(sid)
+                evicted += 1
+        while self._data and (
+            (self.max_sessions > 0 and len(self._data) > self.max_sessions)
+            or (self.max_total_bytes > 0 and self._bytes > self.max_total_bytes)
+        ):
+            sid = next(iter(self._data))
+            if sid == keep:
+                break
+            self._delete(sid)
+            evicted += 1
+        return evicted
+
+    def _usage(self) -> Tuple[int, int]:
+        return len(self._data), self._bytes
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    items TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_last_access ON sessions(last_access);
+"""
+
+class SqliteSessionStore(SessionStore):
+    backend = "sqlite"
+
+    def __init__(self, path: str, **limits: int):
+        super().__init__(**limits)
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _load(self, session_id: str, now: float) -> Optional[str]:
+        db = self._db()
+        row = db.execute("SELECT items, last_access FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        if row is None:
+            return None
+        if self.idle_ttl_seconds > 0 and now - row[1] > self.idle_ttl_seconds:
+            db.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+            self.evictions += 1
+            return None
+        db.execute("UPDATE sessions SET last_access = ? WHERE id = ?", (now, session_id))
+        return row[0]
+
+    def _save(self, session_id: str, blob: str, now: float) -> None:
+        self._db().execute(
+            "INSERT OR REPLACE INTO sessions(id, items, size, last_access) VALUES (?, ?, ?, ?)",
+            (session_id, blob, len(blob.encode("utf-8")), now),
+        )
+
+    def _delete(self, session_id: str) -> None:
+        self._db().execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def _evict(self, now: float, keep: str) -> int:
+        db = self._db()
+        evicted = 0
+        if self.idle_ttl_seconds > 0:
+            evicted += db.execute(
+                "DELETE FROM sessions WHERE last_access < ?", (now - self.idle_ttl_seconds,)
+            ).rowcount
+        count, size = self._usage()
+        if (self.max_sessions > 0 and count > self.max_sessions) or (
+            self.max_total_bytes > 0 and size > self.max_total_bytes
+        ):
+            rows = db.execute("SELECT id, size FROM sessions WHERE id != ? ORDER BY last_access ASC", (keep,))
+            victims = []
+            for sid, sz in rows:
+                if not ((self.max_sessions > 0 and count > self.max_sessions)
+                        or (self.max_total_bytes > 0 and size > self.max_total_bytes)):
+                    break
+                victims.append((sid,))
+                count, size = count - 1, size - sz
+            db.executemany("DELETE FROM sessions WHERE id = ?", victims)
+            evicted += len(victims)
+        return evicted
+
+    def _usage(self) -> Tuple[int, int]:
+        count, size = self._db().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM sessions").fetchone()
+        return count, size
+
+def _make_store() -> SessionStore:
+    limits = dict(
+        max_sessions=settings.SESSION_MAX_SESSIONS,
+        idle_ttl_seconds=settings.SESSION_IDLE_TTL_SECONDS,
+        max_total_bytes=settings.SESSION_MAX_TOTAL_MB * 1024 * 1024,
+        max_items=settings.SESSION_MAX_ITEMS,
+        max_session_bytes=settings.SESSION_MAX_SESSION_KB * 1024,
+    )
+    if settings.SESSION_BACKEND == "sqlite":
+        return SqliteSessionStore(settings.SESSION_DB, **limits)
+    if settings.SESSION_BACKEND != "memory":
+        logging.warning("Unknown SESSION_BACKEND %r; using memory", settings.SESSION_BACKEND)
+    return MemorySessionStore(**limits)
+
+sessions = _make_store()
@@ -1,147 +1,518 @@
-
 from __future__ import annotations
 
+import asyncio
+from dataclasses import dataclass, field
+from functools import partial
+import hashlib
 from io import BytesIO
-from typing import List, Tuple, Optional
+import json
+import threading
+from typing import AsyncIterator, Callable, Iterable, List, Tuple, Optional
 
 from docx import Document
-from openai import OpenAI
 
-from app.services.pdf_utils import extract_text_from_pdf_bytes
+from app.services.extraction import ExtractionError, iter_any_text, read_any_text
 from app.services.docx_writer import write_text_to_docx_bytes
+from app.services.llm_cache import cache as llm_cache, summary_memo
+from app.services.llm_gateway import gateway
+from app.services.chunking import Chunk, chunk_budget, chunk_text, iter_chunks
+from app.services.precompress import Savings, prune_chunk
+from app.services.tokens import count_tokens as _count_tokens
+from app.core.concurrency import run_sync
 from app.core.config import settings
+from app.core.metrics import CHUNKS_PER_DOCUMENT, DOCX_WRITE_SECONDS, LLM_CALL_SECONDS, STAGE_SECONDS, timed
 
 import logging
 
-# Optional token counting
-try:
-    import tiktoken
-except Exception:
-    tiktoken = None
+def extract_template_instructions(docx_stream: BytesIO) -> str:
+    doc = Document(docx_stream)
+    return "\n".join(p.text for p in doc.paragraphs)
 
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
+_MAP_PREFIX = "Please summarize the following text.\n\n"
+_MAP_SUFFIX = "\n\nSummary:"
+# Bump when the per-document map/reduce prompts change, so memoized summaries are not reused
+_PROMPT_VERSION = 1
 
-def _count_tokens(text: str, model: str) -> int:
-    if not tiktoken:
-        return max(1, len(text) // 4)  # crude fallback
-    try:
-        enc = tiktoken.encoding_for_model(model)
-    except Exception:
-        enc = tiktoken.get_encoding("cl100k_base")
-    return len(enc.encode(text))
+# Chunks a streamed document may have extracted but not yet handed to a map call
+_STREAM_QUEUE_CHUNKS = 4
 
-def _read_docx_text(docx_bytes: bytes) -> str:
-    doc = Document(BytesIO(docx_bytes))
-    return "\n".join(p.text for p in doc.paragraphs if p.text)
+# progress(stage, done, total), e.g. ("map", 12, 40)
+ProgressFn = Callable[[str, int, int], None]
 
-def extract_template_instructions(docx_stream: BytesIO) -> str:
-    doc = Document(docx_stream)
-    return "\n".join(p.text for p in doc.paragraphs)
+# (name, digest, open_text) for documents read as a stream: `digest` identifies the
+# content for the summary memo (e.g. the SHA-256 of the file bytes) and open_text()
+# returns an iterator of text pieces, such as partial(extraction.iter_file_text, file_id).
+# With pre-compression on it is called as open_text(strip_margins=True, on_stripped=fn)
+TextStream = Tuple[str, str, Callable[..., Iterable[str]]]
+
+@dataclass
+class _Run:
+    """State shared by every task of one summarize/merge request."""
+    sem: asyncio.Semaphore
+    use_cache: bool = True
+    incremental: bool = True
+    window: int = 0  # per streamed document: chunks waiting on or in a map call
+    progress: Optional[ProgressFn] = None
+    chunks_planned: int = 0
+    chunks_done: int = 0
+    reused_documents: int = 0
+    reused_tokens: int = 0
+    precompress: float = 0.0  # PRECOMPRESS_RATIO for this run (0 = off)
+    savings: Savings = field(default_factory=Savings)
+
+    def report(self, stage: str) -> None:
+        if self.progress:
+            self.progress(stage, self.chunks_done, self.chunks_planned)
 
-def _chunk_text(text: str, size: int, overlap: int) -> List[str]:
-    if len(text) <= size:
-        return [text]
-    out, i = [], 0
-    step = max(1, size - overlap)
-    while i < len(text):
-        out.append(text[i:i+size])
-        i += step
+async def _chat_once(prompt: str, model: str, run: _Run, stage: str) -> str:
+    temperature = 0.3
+    key = llm_cache.make_key(model, temperature, None, prompt)
+    if run.use_cache:
+        hit = await asyncio.to_thread(llm_cache.get, key)  # SQLite stays off the event loop
+        if hit is not None:
+            return hit
+    async with run.sem:
+        with timed(LLM_CALL_SECONDS, stage=stage):
+            resp = await gateway.achat(
+                [{"role": "user", "content": prompt}], model=model, temperature=temperature
+            )
+    out = resp.choices[0].message.content.strip()
+    if run.use_cache and out:
+        await asyncio.to_thread(llm_cache.put, key, out)
     return out
 
-def _chat_once(prompt: str, model: str) -> str:
-    resp = client.chat.completions.create(
-        model=model,
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.3,
-    )
-    return resp.choices[0].message.content.strip()
+async def _aiter(items: Iterable[Chunk]) -> AsyncIterator[Chunk]:
+    for item in items:
+        yield item
 
-def _summarize_chunks(text: str, instructions: Optional[str]) -> Tuple[str, int, int]:
+async def _map_chunks(
+    chunks: AsyncIterator[Chunk], run: _Run, window: int = 0
+) -> Tuple[List[Tuple[str, int]], int, int]:
+    """
+    Start one map call per chunk as soon as it arrives. With window > 0 at most that
+    many chunks are waiting on or in a call, which bounds how far a stream is read
+    ahead. Returns the (summary, tokens) partials in chunk order plus token totals.
+    """
     model = settings.OPENAI_MODEL
-    chunks = _chunk_text(text, size=settings.CHUNK_SIZE, overlap=settings.CHUNK_OVERLAP)
+    slots = asyncio.Semaphore(window) if window > 0 else None
+
+    async def map_one(ch: Chunk) -> Tuple[str, int]:
+        try:
+            text, n_in = ch.text, ch.n_tokens
+            if run.precompress:
+                text, n_in, pruned = await asyncio.to_thread(
+                    prune_chunk, text, n_in, run.precompress, settings.PRECOMPRESS_MIN_SENTENCES, model
+                )
+                run.savings.pruned_tokens += pruned
+            out = await _chat_once(f"{_MAP_PREFIX}{text}{_MAP_SUFFIX}", model, run, "map")
+        finally:
+            if slots:
+                slots.release()
+        run.chunks_done += 1
+        run.report("map")
+        return out, n_in
+
+    tasks: List[asyncio.Task] = []
+    try:
+        async for ch in chunks:
+            if slots:
+                await slots.acquire()
+            run.chunks_planned += 1
+            tasks.append(asyncio.create_task(map_one(ch)))
+        run.report("map")
+        partials = await asyncio.gather(*tasks)
+    except BaseException:
+        for t in tasks:
+            t.cancel()
+        raise
+    CHUNKS_PER_DOCUMENT.observe(len(tasks))
+
+    scaffold = _count_tokens(_MAP_PREFIX, model) + _count_tokens(_MAP_SUFFIX, model)
     tin = tout = 0
+    parts: List[Tuple[str, int]] = []
+    for s, n_in in partials:
+        tin += scaffold + n_in  # chunk tokens are known; no re-encode
+        n = _count_tokens(s, model)
+        tout += n
+        parts.append((s, n))
+    return parts, tin, tout
 
-    # map
-    partials = []
-    for ch in chunks:
-        prompt = f"Please summarize the following text.\n\n{ch}\n\nSummary:"
-        tin += _count_tokens(prompt, model)
-        s = _chat_once(prompt, model)
-        tout += _count_tokens(s, model)
-        partials.append(s)
-
-    # reduce
-    combined = "\n\n".join(partials)
-    if instructions:
-        reduce_prompt = (
-            "Using the following instructions, create a concise, structured summary of the material.\n\n"
-            f"Instructions:\n{instructions}\n\n"
-            f"Material:\n{combined}\n\n"
-            "Final summary:"
-        )
-    else:
-        reduce_prompt = f"Create a concise, structured summary of the following material.\n\n{combined}\n\nFinal summary:"
-    tin += _count_tokens(reduce_prompt, model)
-    final = _chat_once(reduce_prompt, model)
+async def _reduce_partials(
+    parts: List[Tuple[str, int]], instructions: Optional[str], run: _Run
+) -> Tuple[str, int, int]:
+    def final_prompt(combined: str) -> str:
+        if instructions:
+            return (
+                "Using the following instructions, create a concise, structured summary of the material.\n\n"
+                f"Instructions:\n{instructions}\n\n"
+                f"Material:\n{combined}\n\n"
+                "Final summary:"
+            )
+        return _reduce_prompt(combined)
+
+    return await _tree_reduce(parts, "\n\n", _reduce_prompt, final_prompt, settings.OPENAI_MODEL, run, "reduce")
+
+def _count_stripped(savings: Savings) -> Callable[[str], None]:
+    """on_stripped callback adding each dropped header/footer line to `savings`."""
+    def count(line: str) -> None:
+        savings.boilerplate_tokens += _count_tokens(line, settings.OPENAI_MODEL)
+    return count
+
+async def _summarize_chunks(
+    text: str, instructions: Optional[str], run: _Run
+) -> Tuple[str, int, int]:
+    # map (all chunks in flight at once; the semaphore bounds real concurrency)
+    parts, tin, tout = await _map_chunks(_aiter(chunk_text(text, settings.OPENAI_MODEL)), run)
+    final, rin, rout = await _reduce_partials(parts, instructions, run)
+    return final, tin + rin, tout + rout
+
+async def _stream_chunks(open_text: Callable[[], Iterable[str]]) -> AsyncIterator[Chunk]:
+    """
+    Chunks of a streamed document, produced by iter_chunks on a worker thread and
+    handed over through a small queue, so extraction runs ahead of (but never far
+    ahead of) the map calls. Extraction errors are re-raised here as ExtractionError.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=_STREAM_QUEUE_CHUNKS)
+    stop = threading.Event()
+    done = object()
+
+    def put(item: object) -> None:
+        asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+    def produce() -> None:
+        try:
+            for ch in iter_chunks(open_text(), settings.OPENAI_MODEL):
+                if stop.is_set():
+                    return
+                put(ch)
+        except Exception as e:
+            err = ExtractionError(str(e))
+            err.__cause__ = e
+            put(err)
+        else:
+            put(done)
+
+    producer = asyncio.ensure_future(asyncio.to_thread(produce))  # hold a reference while it runs
+    try:
+        while (item := await queue.get()) is not done:
+            if isinstance(item, Exception):
+                raise item
+            if item.text.strip():
+                yield item
+    finally:
+        # unblock a producer waiting on a full queue; it exits at its next chunk
+        stop.set()
+        while not queue.empty():
+            queue.get_nowait()
+
+def _reduce_prompt(combined: str) -> str:
+    return f"Create a concise, structured summary of the following material.\n\n{combined}\n\nFinal summary:"
+
+def _merge_summaries_prompt(combined: str) -> str:
+    return (
+        "Merge the following per-document summaries into one consolidated set of summaries. "
+        "Keep every 'Summary of <name>:' attribution and the key facts of each source; remove only repetition.\n\n"
+        f"{combined}\n\nMerged summaries:"
+    )
+
+def _batches(level: List[Tuple[str, int]], budget: int, fan_in: int) -> List[List[Tuple[str, int]]]:
+    """Greedy, order-preserving groups of at most fan_in parts and ~budget tokens."""
+    out: List[List[Tuple[str, int]]] = []
+    cur: List[Tuple[str, int]] = []
+    cur_tokens = 0
+    for part in level:
+        if cur and (len(cur) >= fan_in or cur_tokens + part[1] > budget):
+            out.append(cur)
+            cur, cur_tokens = [], 0
+        cur.append(part)
+        cur_tokens += part[1]
+    if cur:
+        out.append(cur)
+    return out
+
+async def _tree_reduce(
+    parts: List[Tuple[str, int]],
+    sep: str,
+    intermediate_prompt: Callable[[str], str],
+    final_prompt: Callable[[str], str],
+    model: str,
+    run: _Run,
+    stage: str,
+) -> Tuple[str, int, int]:
+    """
+    Multi-level reduce over (text, tokens) parts.
+    While the parts exceed REDUCE_FAN_IN items or the reduce token budget, they are
+    grouped into batches that fit, each batch is reduced in parallel with
+    intermediate_prompt, and the outputs become the next level. The last level is
+    reduced once with final_prompt. Latency grows with the tree depth, not the input count.
+    """
+    budget = settings.REDUCE_TOKENS if settings.REDUCE_TOKENS > 0 else chunk_budget(model)
+    fan_in = max(2, settings.REDUCE_FAN_IN)
+    tin = tout = 0
+    level = parts
+    while len(level) > fan_in or sum(n for _, n in level) > budget:
+        batches = _batches(level, budget, fan_in)
+        if len(batches) == len(level):
+            break  # every part alone fills the budget; nothing left to merge
+
+        async def reduce_batch(batch: List[Tuple[str, int]]) -> Tuple[Tuple[str, int], int]:
+            if len(batch) == 1:
+                return batch[0], 0
+            prompt = intermediate_prompt(sep.join(t for t, _ in batch))
+            out = await _chat_once(prompt, model, run, stage)
+            return (out, _count_tokens(out, model)), _count_tokens(prompt, model)
+
+        reduced = await asyncio.gather(*(reduce_batch(b) for b in batches))
+        level = []
+        for (part, ptokens), b in zip(reduced, batches):
+            if len(b) > 1:
+                tin += ptokens
+                tout += part[1]
+            level.append(part)
+
+    prompt = final_prompt(sep.join(t for t, _ in level))
+    tin += _count_tokens(prompt, model)
+    final = await _chat_once(prompt, model, run, stage)
     tout += _count_tokens(final, model)
     return final, tin, tout
 
-def _combine_across_files(file_summaries: List[Tuple[str, str]], instructions: Optional[str]) -> Tuple[str, int, int]:
+async def _combine_across_files(
+    file_summaries: List[Tuple[str, str]], instructions: Optional[str], run: _Run
+) -> Tuple[str, int, int]:
     model = settings.OPENAI_MODEL
-    combined_text = "".join([f"Summary of {n}:\n{s}\n\n" for n, s in file_summaries])
-    if instructions:
-        prompt = (
-            "Given the template instructions and summarized text, arrange the content per the template order.\n"
-            "Do not significantly rephrase. Bold headings using **like this**. If the template specifies sub-sections,"
-            " list them using a), b), c).\n\n"
-            f"Template instructions:\n{instructions}\n\nSummarized text:\n{combined_text}\n\nFinal arranged document:"
-        )
-    else:
-        prompt = (
+
+    def final_prompt(combined_text: str) -> str:
+        if instructions:
+            return (
+                "Given the template instructions and summarized text, arrange the content per the template order.\n"
+                "Do not significantly rephrase. Bold headings using **like this**. If the template specifies sub-sections,"
+                " list them using a), b), c).\n\n"
+                f"Template instructions:\n{instructions}\n\nSummarized text:\n{combined_text}\n\nFinal arranged document:"
+            )
+        return (
             "Combine the following summaries into one coherent document with clear section headings. "
             "Bold headings using **like this**.\n\n"
             f"{combined_text}\n\nFinal document:"
         )
-    tin = _count_tokens(prompt, model)
-    final = _chat_once(prompt, model)
-    tout = _count_tokens(final, model)
-    return final, tin, tout
 
-def _read_any_text(filename: str, data: bytes) -> str:
-    ext = filename.lower().rsplit(".", 1)[-1] if "." in filename else ""
-    if ext == "pdf":
-        return extract_text_from_pdf_bytes(data)
-    if ext == "docx":
-        return _read_docx_text(data)
-    try:
-        return data.decode("utf-8", errors="ignore")
-    except Exception:
-        return ""
+    parts = []
+    for n, s in file_summaries:
+        part = f"Summary of {n}:\n{s}"
+        parts.append((part, _count_tokens(part, model)))
+    return await _tree_reduce(parts, "\n\n", _merge_summaries_prompt, final_prompt, model, run, "combine")
 
-def summarize_many_documents_into_one(
-    files: List[Tuple[str, bytes]],
-    instructions: Optional[str] = None,
-) -> Tuple[bytes, dict]:
-    if not settings.OPENAI_API_KEY:
-        raise RuntimeError("OPENAI_API_KEY not set")
+def _memo_key(source: dict, model: str, precompress: float = 0.0) -> str:
+    """Per-document summary identity: content hash, model, chunking/reduce/pre-compression parameters, prompt version."""
+    parts = {
+        **source,  # {"text": sha of the extracted text} or {"file": sha of the file bytes}
+        "model": model,
+        "chunk_tokens": chunk_budget(model),
+        "overlap_tokens": settings.CHUNK_OVERLAP_TOKENS,
+        "reduce_fan_in": settings.REDUCE_FAN_IN,
+        "reduce_tokens": settings.REDUCE_TOKENS,
+        "prompt_version": _PROMPT_VERSION,
+    }
+    if precompress:  # left out when off, so summaries memoized before pre-compression existed still match
+        parts["precompress"] = [precompress, settings.PRECOMPRESS_MIN_SENTENCES]
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()
 
-    per_file: List[Tuple[str, str]] = []
-    total_in = total_out = 0
+def _memo_get(fname: str, key: str, run: _Run) -> Optional[Tuple[str, int, int]]:
+    if not (run.incremental and run.use_cache):
+        return None
+    hit = summary_memo.get(key)
+    if hit is None:
+        return None
+    memo = json.loads(hit)
+    run.reused_documents += 1
+    run.reused_tokens += memo["input_tokens"] + memo["output_tokens"]
+    logging.info(f"{fname}: reusing memoized summary")
+    return memo["summary"], 0, 0
 
-    for fname, data in files:
-        raw = _read_any_text(fname, data)
-        if not raw.strip():
+def _memo_put(key: str, result: Tuple[str, int, int]) -> None:
+    summary, tin, tout = result
+    summary_memo.put(key, json.dumps({"summary": summary, "input_tokens": tin, "output_tokens": tout}))
+
+async def _summarize_text(
+    fname: str, raw: str, run: _Run
+) -> Optional[Tuple[str, int, int]]:
+    """
+    One branch of the task graph: map all chunks -> reduce.
+    Each file reduces as soon as its own partials are in, independent of the others.
+    In incremental mode a document summarized before (same content and parameters)
+    is taken from the summary memo and costs no tokens in this run.
+    """
+    if not raw.strip():
+        logging.warning(f"{fname}: empty or unreadable content; skipping.")
+        return None
+    key = _memo_key(
+        {"text": hashlib.sha256(raw.encode("utf-8")).hexdigest()}, settings.OPENAI_MODEL, run.precompress
+    )
+    hit = await asyncio.to_thread(_memo_get, fname, key, run)
+    if hit is not None:
+        return hit
+    with timed(STAGE_SECONDS, log_as=f"Summarizing {fname}", stage="summarize_file"):
+        result = await _summarize_chunks(raw, instructions=None, run=run)
+    await asyncio.to_thread(_memo_put, key, result)
+    return result
+
+async def _summarize_stream(doc: TextStream, run: _Run) -> Optional[Tuple[str, int, int]]:
+    """
+    _summarize_text for a streamed document: map calls start on the first chunks
+    while later pages are still being extracted, and only a window of chunks is held
+    in memory. A memo hit skips extraction entirely.
+    """
+    fname, digest, open_text = doc
+    key = _memo_key({"file": digest}, settings.OPENAI_MODEL, run.precompress)
+    hit = await asyncio.to_thread(_memo_get, fname, key, run)
+    if hit is not None:
+        return hit
+    savings = Savings()  # filled on the extraction thread; added to the run once it has finished
+    if run.precompress:
+        open_text = partial(open_text, strip_margins=True, on_stripped=_count_stripped(savings))
+    with timed(STAGE_SECONDS, log_as=f"Summarizing {fname}", stage="summarize_file"):
+        try:
+            parts, tin, tout = await _map_chunks(_stream_chunks(open_text), run, window=run.window)
+        except ExtractionError as e:  # LLM errors from the map calls propagate
+            logging.warning(f"{fname}: extraction failed ({e}); skipping.")
+            return None
+        run.savings.boilerplate_tokens += savings.boilerplate_tokens
+        if not parts:
             logging.warning(f"{fname}: empty or unreadable content; skipping.")
+            return None
+        final, rin, rout = await _reduce_partials(parts, None, run)
+    result = (final, tin + rin, tout + rout)
+    await asyncio.to_thread(_memo_put, key, result)
+    return result
+
+async def _summarize_file(
+    fname: str, data: bytes, run: _Run
+) -> Optional[Tuple[str, int, int]]:
+    if run.precompress and fname.lower().endswith(".pdf"):
+        savings = Savings()
+        pages = partial(iter_any_text, fname, BytesIO(data), strip_margins=True, on_stripped=_count_stripped(savings))
+        raw = await asyncio.to_thread(lambda: "".join(pages()))
+        run.savings.boilerplate_tokens += savings.boilerplate_tokens
+    else:
+        raw = await asyncio.to_thread(read_any_text, fname, data)
+    return await _summarize_text(fname, raw, run)
+
+async def _combine_results(
+    names: List[str],
+    results: List[Optional[Tuple[str, int, int]]],
+    instructions: Optional[str],
+    run: _Run,
+) -> Tuple[bytes, dict]:
+    per_file: List[Tuple[str, str]] = []
+    total_in = total_out = 0
+    for fname, res in zip(names, results):
+        if res is None:
             continue
-        summ, tin, tout = _summarize_chunks(raw, instructions=None)
+        summ, tin, tout = res
         per_file.append((fname, summ))
         total_in += tin; total_out += tout
 
     if not per_file:
         raise RuntimeError("No readable inputs.")
 
-    final_text, cin, cout = _combine_across_files(per_file, instructions)
+    run.report("combine")
+    with timed(STAGE_SECONDS, log_as=f"Combining {len(per_file)} summaries", stage="combine"):
+        final_text, cin, cout = await _combine_across_files(per_file, instructions, run)
     total_in += cin; total_out += cout
 
-    docx_bytes = write_text_to_docx_bytes(final_text)
-    return docx_bytes, {"input_tokens": total_in, "output_tokens": total_out, "total_tokens": total_in + total_out}
+    run.report("write")
+    with timed(DOCX_WRITE_SECONDS, log_as="Writing docx"):
+        docx_bytes = await asyncio.to_thread(write_text_to_docx_bytes, final_text)
+    return docx_bytes, {
+        "input_tokens": total_in,
+        "output_tokens": total_out,
+        "total_tokens": total_in + total_out,
+        "reused_documents": run.reused_documents,
+        "reused_tokens": run.reused_tokens,
+        # tokens kept out of map prompts by local pre-compression (PRECOMPRESS_RATIO)
+        "precompress_ratio": run.precompress,
+        "boilerplate_tokens_removed": run.savings.boilerplate_tokens,
+        "pruned_tokens": run.savings.pruned_tokens,
+        "precompress_saved_tokens": run.savings.total,
+    }
+
+def _new_run(
+    concurrency: Optional[int], use_cache: bool, progress: Optional[ProgressFn], incremental: bool = True
+) -> _Run:
+    if not settings.OPENAI_API_KEY:
+        raise RuntimeError("OPENAI_API_KEY not set")
+    limit = max(1, concurrency or settings.LLM_CONCURRENCY)
+    return _Run(
+        sem=asyncio.Semaphore(limit),
+        window=2 * limit,
+        use_cache=use_cache,
+        incremental=incremental,
+        progress=progress,
+        precompress=max(0.0, settings.PRECOMPRESS_RATIO),
+    )
+
+async def asummarize_many_documents_into_one(
+    files: List[Tuple[str, bytes]],
+    instructions: Optional[str] = None,
+    concurrency: Optional[int] = None,
+    use_cache: bool = True,
+    progress: Optional[ProgressFn] = None,
+    incremental: bool = True,
+) -> Tuple[bytes, dict]:
+    """
+    Async map/reduce over every chunk of every file.
+    At most `concurrency` (default settings.LLM_CONCURRENCY) completions are in flight;
+    results are assembled in input order so the output is deterministic.
+    use_cache=False bypasses the persistent LLM response cache and the summary memo;
+    incremental=False re-summarizes documents already in the memo. `progress` is called
+    as stages advance.
+    """
+    run = _new_run(concurrency, use_cache, progress, incremental)
+    results = await asyncio.gather(*(_summarize_file(fname, data, run) for fname, data in files))
+    return await _combine_results([n for n, _ in files], results, instructions, run)
+
+async def asummarize_texts_into_one(
+    docs: List[Tuple[str, str]],
+    instructions: Optional[str] = None,
+    concurrency: Optional[int] = None,
+    use_cache: bool = True,
+    progress: Optional[ProgressFn] = None,
+    incremental: bool = True,
+) -> Tuple[bytes, dict]:
+    """
+    Same as asummarize_many_documents_into_one, for already-extracted (name, text) pairs.
+    With incremental=True only new or changed documents are summarized; the rest come
+    from the summary memo and only the cross-file combine runs again.
+    """
+    run = _new_run(concurrency, use_cache, progress, incremental)
+    results = await asyncio.gather(*(_summarize_text(fname, raw, run) for fname, raw in docs))
+    return await _combine_results([n for n, _ in docs], results, instructions, run)
+
+async def asummarize_streams_into_one(
+    docs: List[TextStream],
+    instructions: Optional[str] = None,
+    concurrency: Optional[int] = None,
+    use_cache: bool = True,
+    progress: Optional[ProgressFn] = None,
+    incremental: bool = True,
+) -> Tuple[bytes, dict]:
+    """
+    Same as asummarize_texts_into_one, for documents read as streams (see TextStream).
+    Each document is chunked while it is extracted and its map calls start with the
+    first full chunk; memory per document stays around a few chunks regardless of
+    its size. Documents whose extraction fails are skipped like unreadable ones.
+    """
+    run = _new_run(concurrency, use_cache, progress, incremental)
+    results = await asyncio.gather(*(_summarize_stream(doc, run) for doc in docs))
+    return await _combine_results([doc[0] for doc in docs], results, instructions, run)
+
+def summarize_many_documents_into_one(
+    files: List[Tuple[str, bytes]],
+    instructions: Optional[str] = None,
+    use_cache: bool = True,
+    incremental: bool = True,
+) -> Tuple[bytes, dict]:
+    """Blocking wrapper around asummarize_many_documents_into_one."""
+    return run_sync(asummarize_many_documents_into_one(
+        files, instructions=instructions, use_cache=use_cache, incremental=incremental
+    ))
@@ -0,0 +1,307 @@
+# app/services/token_ledger.py
+"""
+Per-principal token ledger and admission control.
+
+A principal is whoever the usage is charged to and budgeted by: the caller's API
+key (X-API-Key) if it is one of API_KEYS, otherwise the client address. Nothing a
+client can pick freely (a made-up key, a session ID) opens a new budget. The address
+is the connection's peer, so behind a reverse proxy or NAT every caller without a
+key shares one principal; the budgets are therefore off unless configured. The chat
+session (X-Session-ID or the chat body's session_id) is recorded alongside, for
+reporting only. The request middleware sets `principal` and `session`, the chat
+route sets `session`; background jobs inherit both with the rest of the request
+context.
+
+- Recording: every LLM gateway call charges its real `usage` to the current
+  principal (chat turns charge the agent run's usage), in per-minute buckets in a
+  local SQLite file shared by the workers on the host.
+- Admission: before a tool or /api/summarize starts, its cost is estimated from the
+  extracted text size and checked against the principal's budgets
+  (TOKEN_BUDGET_HOURLY, TOKEN_BUDGET_DAILY; TOKEN_MAX_PER_REQUEST per run; 0 = no
+  limit, the default). Usage already recorded plus the unspent part of the principal's running
+  reservations plus the estimate must fit, or BudgetExceeded is raised with a
+  message and a Retry-After. Reservations are per process.
+"""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+import contextvars
+from dataclasses import dataclass
+import hashlib
+import math
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Mapping, Optional
+
+from app.core.config import settings
+
+# Pre-flight estimate factors (tokens per extracted-text token), from the prompts in
+# summarizer / resume_matcher: map calls read every chunk once, and map summaries,
+# reduce levels and the cross-file combine add roughly half as much again.
+_SUMMARY_FACTOR = 1.5
+_CHARS_PER_TOKEN = 4
+# Completion tokens per scored resume (JSON score, strengths, gaps, summary)
+_SCORE_OUTPUT_TOKENS = 300
+# Before extraction, a PDF/DOCX is assumed to hold this many bytes per character of text
+# (page structure, fonts, images and zip overhead); plain text is taken as is.
+_CONTAINER_BYTES_PER_CHAR = 4
+
+_HOUR = 3600
+_DAY = 24 * _HOUR
+
+principal: contextvars.ContextVar[str] = contextvars.ContextVar("token_principal", default="anonymous")
+session: contextvars.ContextVar[str] = contextvars.ContextVar("token_session", default="")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS token_usage (
+    principal TEXT NOT NULL,
+    session TEXT NOT NULL DEFAULT '',
+    minute INTEGER NOT NULL,
+    prompt_tokens INTEGER NOT NULL,
+    completion_tokens INTEGER NOT NULL,
+    calls INTEGER NOT NULL,
+    PRIMARY KEY (principal, minute, session)
+);
+CREATE INDEX IF NOT EXISTS idx_token_usage_minute ON token_usage(minute);
+"""
+
+class BudgetExceeded(Exception):
+    """An admission was refused; str(e) is meant for the user."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+@dataclass(eq=False)
+class Ticket:
+    """
+    An admitted run: its estimate stays reserved until the run ends, minus what it has
+    already used. Tickets compare by identity, so releasing one never drops another
+    run's equal-looking reservation.
+    """
+    principal: str
+    what: str
+    estimate: int
+    charged: int = 0
+
+    @property
+    def outstanding(self) -> int:
+        return max(0, self.estimate - self.charged)
+
+_ticket: contextvars.ContextVar[Optional[Ticket]] = contextvars.ContextVar("token_ticket", default=None)
+
+def _key_hash(key: str) -> str:
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+_API_KEYS = frozenset(_key_hash(k.strip()) for k in settings.API_KEYS.split(",") if k.strip())
+
+def principal_for(headers: Mapping[str, str], client_host: Optional[str]) -> str:
+    """Principal of an HTTP request: its hashed API key if configured in API_KEYS, else the client address."""
+    key = headers.get("x-api-key")
+    if key:
+        digest = _key_hash(key)
+        if digest in _API_KEYS:
+            return "key:" + digest[:16]
+    return f"ip:{client_host or 'unknown'}"
+
+def text_chars(filename: str, size: int, extracted: Optional[int] = None) -> int:
+    """Characters of text in a file: the extracted count when known, else a guess from its size."""
+    if extracted is not None:
+        return extracted
+    if filename.lower().endswith((".pdf", ".docx")):
+        return size // _CONTAINER_BYTES_PER_CHAR
+    return size
+
+def text_tokens(chars: int) -> int:
+    return math.ceil(chars / _CHARS_PER_TOKEN)
+
+def estimate_summary(text_chars: List[int]) -> int:
+    """Tokens a merge/summarize run over documents of these extracted sizes may use."""
+    return math.ceil(sum(text_tokens(c) for c in text_chars) * _SUMMARY_FACTOR)
+
+def estimate_screen(jd_chars: int, resume_chars: List[int]) -> int:
+    """Tokens to score these resumes against a JD (assumes the JD is sent once per resume)."""
+    return sum(text_tokens(c) + text_tokens(jd_chars) + _SCORE_OUTPUT_TOKENS for c in resume_chars)
+
+def _fmt(seconds: int) -> str:
+    return f"{math.ceil(seconds / 60)} min" if seconds < _HOUR else f"{seconds / _HOUR:.1f} h"
+
+class TokenLedger:
+    def __init__(self, path: str, hourly: int, daily: int, max_per_request: int):
+        self.path = path
+        self.limits = {_HOUR: hourly, _DAY: daily}
+        self.max_per_request = max_per_request
+        self.rejections = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._tickets: Dict[str, List[Ticket]] = {}
+        self._writes = 0
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    # ---- recording ----
+
+    def record(self, who: str, prompt_tokens: int, completion_tokens: int, calls: int = 1, chat_session: str = "") -> None:
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "INSERT INTO token_usage(principal, session, minute, prompt_tokens, completion_tokens, calls) "
+                "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(principal, minute, session) DO UPDATE SET "
+                "prompt_tokens = prompt_tokens + excluded.prompt_tokens, "
+                "completion_tokens = completion_tokens + excluded.completion_tokens, "
+                "calls = calls + excluded.calls",
+                (who, chat_session, int(now // 60), prompt_tokens, completion_tokens, calls),
+            )
+            self._writes += 1
+            if self._writes % 500 == 0:
+                db.execute("DELETE FROM token_usage WHERE minute < ?", (int((now - 2 * _DAY) // 60),))
+
+    def charge(self, prompt_tokens: int, completion_tokens: int, calls: int = 1) -> None:
+        """Charge LLM usage to the current principal (and the admitted run it belongs to)."""
+        ticket = _ticket.get()
+        who = ticket.principal if ticket else principal.get()
+        if ticket:
+            with self._lock:
+                ticket.charged += prompt_tokens + completion_tokens
+        self.record(who, prompt_tokens, completion_tokens, calls, chat_session=session.get())
+
+    # ---- admission ----
+
+    def _used(self, db: sqlite3.Connection, who: str, window: int, now: float) -> int:
+        (used,) = db.execute(
+            "SELECT COALESCE(SUM(prompt_tokens + completion_tokens), 0) FROM token_usage "
+            "WHERE principal = ? AND minute >= ?",
+            (who, int((now - window) // 60)),
+        ).fetchone()
+        return used
+
+    def _retry_after(self, db: sqlite3.Connection, who: str, window: int, excess: int, now: float) -> int:
+        """Seconds until enough of the window's usage ages out to cover `excess`."""
+        freed = 0
+        rows = db.execute(
+            "SELECT minute, prompt_tokens + completion_tokens FROM token_usage "
+            "WHERE principal = ? AND minute >= ? ORDER BY minute",
+            (who, int((now - window) // 60)),
+        )
+        for minute, tokens in rows:
+            freed += tokens
+            if freed >= excess:
+                return max(1, int((minute + 1) * 60 + window - now))
+        return 60  # only running reservations are in the way; they end with their runs
+
+    def admit(self, estimate: int, what: str, who: Optional[str] = None) -> Ticket:
+        """Reserve `estimate` tokens for a run, or raise BudgetExceeded."""
+        who = who or principal.get()
+        now = time.time()
+        with self._lock:
+            if self.max_per_request > 0 and estimate > self.max_per_request:
+                self.rejections += 1
+                raise BudgetExceeded(
+                    f"{what} would use about {estimate:,} tokens, over the per-request limit of "
+                    f"{self.max_per_request:,}. Split it into smaller runs.",
+                    retry_after=0,
+                )
+            db = self._db()
+            reserved = sum(t.outstanding for t in self._tickets.get(who, []))
+            for window, limit in self.limits.items():
+                if limit <= 0:
+                    continue
+                span = "hour" if window == _HOUR else "day"
+                if estimate > limit:
+                    self.rejections += 1
+                    raise BudgetExceeded(
+                        f"{what} would use about {estimate:,} tokens, more than the whole {limit:,}-token "
+                        f"budget per {span}. Split it into smaller runs.",
+                        retry_after=0,
+                    )
+                used = self._used(db, who, window, now)
+                if used + reserved + estimate > limit:
+                    self.rejections += 1
+                    left = max(0, limit - used - reserved)
+                    retry = self._retry_after(db, who, window, used + reserved + estimate - limit, now)
+                    raise BudgetExceeded(
+                        f"{what} would use about {estimate:,} tokens, but only {left:,} of the {limit:,}-token "
+                        f"budget per {span} are left. Try again in about {_fmt(retry)} or with fewer documents.",
+                        retry_after=retry,
+                    )
+            ticket = Ticket(principal=who, what=what, estimate=estimate)
+            self._tickets.setdefault(who, []).append(ticket)
+        return ticket
+
+    def release(self, ticket: Ticket) -> None:
+        with self._lock:
+            tickets = self._tickets.get(ticket.principal, [])
+            if ticket in tickets:
+                tickets.remove(ticket)
+            if not tickets:
+                self._tickets.pop(ticket.principal, None)
+
+    @contextmanager
+    def charging(self, ticket: Ticket, release: bool = True) -> Iterator[None]:
+        """
+        Run a block as the admitted run: its LLM calls count against the ticket, which is
+        released at the end unless `release` is False (the caller then releases it, once).
+        """
+        token = _ticket.set(ticket)
+        try:
+            yield
+        finally:
+            _ticket.reset(token)
+            if release:
+                self.release(ticket)
+
+    # ---- reporting ----
+
+    def usage(self, who: str) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            used = {window: self._used(db, who, window, now) for window in self.limits}
+            sessions = dict(db.execute(
+                "SELECT session, SUM(prompt_tokens + completion_tokens) FROM token_usage "
+                "WHERE principal = ? AND minute >= ? AND session != '' GROUP BY session",
+                (who, int((now - _DAY) // 60)),
+            ).fetchall())
+            running = [
+                {"what": t.what, "estimate": t.estimate, "charged": t.charged} for t in self._tickets.get(who, [])
+            ]
+        reserved = sum(r["estimate"] - min(r["charged"], r["estimate"]) for r in running)
+        windows = {}
+        for window, limit in self.limits.items():
+            windows["hour" if window == _HOUR else "day"] = {
+                "used": used[window],
+                "limit": limit,
+                "remaining": max(0, limit - used[window] - reserved) if limit > 0 else None,
+            }
+        return {
+            "principal": who,
+            **windows,
+            "reserved": reserved,
+            "running": running,
+            "sessions_day": sessions,
+            "max_per_request": self.max_per_request,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            running = sum(len(v) for v in self._tickets.values())
+        return {"rejections": self.rejections, "running_reservations": running}
+
+token_ledger = TokenLedger(
+    path=settings.TOKEN_LEDGER_DB,
+    hourly=settings.TOKEN_BUDGET_HOURLY,
+    daily=settings.TOKEN_BUDGET_DAILY,
+    max_per_request=settings.TOKEN_MAX_PER_REQUEST,
+)
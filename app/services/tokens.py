@@ -0,0 +1,74 @@
+# app/services/tokens.py
+"""
+Token counting helpers shared by the summarizer and chunker.
+
+The tiktoken encoder is resolved once per model and cached; if tiktoken (or its
+encoding files) is unavailable we fall back to a ~4 chars/token estimate.
+tiktoken itself is imported on first use (or by the startup warm-up).
+"""
+
+from __future__ import annotations
+
+from functools import lru_cache
+import logging
+from typing import List, Optional
+
+from app.core.config import settings
+
+@lru_cache(maxsize=1)
+def _tiktoken():
+    # Optional token counting
+    try:
+        import tiktoken
+    except Exception:
+        return None
+    return tiktoken
+
+# Context windows (prompt + completion) for models we commonly run; prefix-matched
+MODEL_CONTEXT_TOKENS = {
+    "gpt-4.1": 1_047_576,
+    "gpt-4o": 128_000,
+    "gpt-4-turbo": 128_000,
+    "gpt-4": 8_192,
+    "gpt-3.5-turbo": 16_385,
+    "o1": 200_000,
+    "o3": 200_000,
+    "o4": 200_000,
+}
+_DEFAULT_CONTEXT = 8_192
+
+@lru_cache(maxsize=None)
+def get_encoder(model: str):
+    """Cached tiktoken encoding for `model`, or None when tiktoken cannot be used."""
+    tiktoken = _tiktoken()
+    if not tiktoken:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except Exception:
+        pass
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logging.warning(f"tiktoken encoding unavailable ({e}); using character estimate.")
+        return None
+
+def encode(text: str, model: str) -> Optional[List[int]]:
+    enc = get_encoder(model)
+    return enc.encode(text, disallowed_special=()) if enc else None
+
+def count_tokens(text: str, model: str) -> int:
+    enc = get_encoder(model)
+    if not enc:
+        return max(1, len(text) // 4)  # crude fallback
+    return len(enc.encode(text, disallowed_special=()))
+
+def context_window(model: str) -> int:
+    """Context size for `model` (MODEL_CONTEXT_TOKENS setting wins over the built-in table)."""
+    if settings.MODEL_CONTEXT_TOKENS > 0:
+        return settings.MODEL_CONTEXT_TOKENS
+    best = ""
+    for prefix in MODEL_CONTEXT_TOKENS:
+        if model.startswith(prefix) and len(prefix) > len(best):
+            best = prefix
+    return MODEL_CONTEXT_TOKENS[best] if best else _DEFAULT_CONTEXT
@@ -4,7 +4,12 @@ app/tools.py
 Agent tools for Agentic Curie.
 
 - merge_documents: merges/summarizes 2+ uploaded documents into one .docx
-- resume_match: matches one JD (text or file) with one or more resumes and returns a CSV report
+- resume_match: matches one JD (text or file) with one or more resumes and returns a CSV report;
+  scores are kept in the JD's candidate pool, so resumes seen before are not scored again
+- pool_candidates: ranks / filters / pages through a JD's candidate pool
+- job_status: reports progress/result of the background jobs merge_documents and resume_match start
+
+Heavy work runs on the job pool (app/services/jobs.py); tools validate inputs and return a job ID right away.
 
 Notes:
 - We import save_file lazily inside functions to avoid circular imports.
@@ -13,50 +18,103 @@ Notes:
 from __future__ import annotations
 
 from typing import List, Optional
+import asyncio
 import logging
+from functools import partial
 from io import BytesIO
 
 from agents import function_tool
 
+from app.core.config import settings
+from app.services.candidate_pool import candidate_pool
 from app.services.filestore import get_meta, get_path
+from app.services.jobs import Job, JobQueueFull, jobs
+from app.services.extraction import get_text, iter_file_text
 from app.services.summarizer import (
-    summarize_many_documents_into_one,
+    asummarize_streams_into_one,
     extract_template_instructions,
 )
 from app.services.resume_matcher import (
-    read_any_text,
-    match_resumes_to_jd,
+    amatch_resume_texts_to_jd,
     results_to_csv_bytes,
 )
+from app.services.token_ledger import (
+    BudgetExceeded,
+    Ticket,
+    estimate_screen,
+    estimate_summary,
+    text_chars,
+    token_ledger,
+)
+
+async def _load_texts(file_ids: List[str]) -> List[Optional[str]]:
+    """Extracted text per file ID (cached at upload time); None for unknown IDs."""
+    return list(await asyncio.gather(*(asyncio.to_thread(get_text, fid) for fid in file_ids)))
+
+def _started(job_id: str, what: str) -> str:
+    url = f"/api/jobs/{job_id}"
+    return (
+        f"{what} started as background job {job_id}. "
+        f"Progress: {url} — the download link will appear there when it finishes."
+    )
+
+def _file_chars(fid: str) -> int:
+    meta = get_meta(fid)
+    return text_chars(meta["filename"], meta["size"], meta.get("text_chars"))
+
+async def _admit(what: str, estimate) -> Ticket:
+    """Reserve `estimate()` tokens for a run; the file lookups and the ledger's SQLite run off the event loop."""
+    return await asyncio.to_thread(lambda: token_ledger.admit(estimate(), what))
+
+def _submit(name: str, work, ticket) -> Job:
+    """Start a job whose LLM calls count against `ticket`; the reservation ends with the job."""
+    async def run(job: Job):
+        with token_ledger.charging(ticket):
+            return await work(job)
+    try:
+        return jobs.submit(name, run)
+    except Exception:
+        token_ledger.release(ticket)
+        raise
+
+def _reused_note(token_stats: dict) -> str:
+    n = token_stats.get("reused_documents", 0)
+    return f"; {n} document summar{'y' if n == 1 else 'ies'} reused from earlier merges" if n else ""
+
+def _saved_note(token_stats: dict) -> str:
+    n = token_stats.get("precompress_saved_tokens", 0)
+    return f"; {n} tokens of boilerplate and low-ranked sentences left out" if n else ""
 
 # ------------------- MERGE DOCUMENTS -------------------
 
 @function_tool
-def merge_documents(file_ids: List[str], template_id: Optional[str] = None) -> str:
+async def merge_documents(
+    file_ids: List[str],
+    template_id: Optional[str] = None,
+    use_cache: bool = True,
+    incremental: bool = True,
+) -> str:
     """
-    Merge/summarize 2+ uploaded documents into a single .docx.
+    Merge/summarize 2+ uploaded documents into a single .docx. Runs as a background job.
 
     Args:
         file_ids: List of file IDs previously uploaded via /api/files/upload (>= 2)
         template_id: Optional file ID of a .docx template whose text acts as layout instructions
+        use_cache: Reuse cached model responses for identical prompts. Set false only if the user asks for a fresh run.
+        incremental: Reuse per-document summaries from earlier merges, so adding a document to a merge
+            only summarizes the new one. Set false to re-summarize every document.
 
     Returns:
-        Text with a direct download link to the generated .docx, or a helpful error message.
+        The job ID and its status URL (the .docx link appears there when done), or a helpful error message.
     """
     try:
         if not file_ids or len(file_ids) < 2:
             return "Please provide at least two file_ids."
-
-        inputs = []
         for fid in file_ids:
-            meta = get_meta(fid)
-            path = get_path(fid)
-            if not meta or not path:
+            if not get_meta(fid):
                 return f"File ID not found: {fid}"
-            with open(path, "rb") as f:
-                inputs.append((meta["filename"], f.read()))
 
-        instructions = None
+        tpath = None
         if template_id:
             tmeta = get_meta(template_id)
             tpath = get_path(template_id)
@@ -64,20 +122,49 @@ def merge_documents(file_ids: List[str], template_id: Optional[str] = None) -> s
                 return f"Template ID not found: {template_id}"
             if not tmeta["filename"].lower().endswith(".docx"):
                 return "Template must be a .docx file."
-            with open(tpath, "rb") as tf:
-                instructions = extract_template_instructions(BytesIO(tf.read()))
 
-        docx_bytes, _token_stats = summarize_many_documents_into_one(inputs, instructions=instructions)
+        # reserved against the caller's token budget until the job ends
+        ticket = await _admit("This merge", lambda: estimate_summary([_file_chars(fid) for fid in file_ids]))
+
+        async def work(job: Job) -> dict:
+            # each file is streamed from its blob (or text cache) straight into the chunker
+            inputs = []
+            for fid in file_ids:
+                meta = get_meta(fid)
+                inputs.append((meta["filename"], meta["sha256"], partial(iter_file_text, fid)))
+
+            instructions = None
+            if tpath:
+                with open(tpath, "rb") as tf:
+                    instructions = extract_template_instructions(BytesIO(tf.read()))
 
-        from app.services.filestore import save_file
-        out_id = save_file(
-            docx_bytes,
-            filename="Document_Generator_Output.docx",
-            content_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-        )
-        download_url = f"/api/files/{out_id}/download"
-        return f"Document generated successfully. Download: {download_url}"
+            docx_bytes, token_stats = await asummarize_streams_into_one(
+                inputs, instructions=instructions, use_cache=use_cache, progress=job.set_progress,
+                incremental=incremental,
+            )
 
+            from app.services.filestore import save_file
+            out_id = save_file(
+                docx_bytes,
+                filename="Document_Generator_Output.docx",
+                content_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+            )
+            download_url = f"/api/files/{out_id}/download"
+            return {
+                "message": (
+                    f"Document generated successfully ({token_stats['total_tokens']} tokens"
+                    f"{_reused_note(token_stats)}{_saved_note(token_stats)}). "
+                    f"Download: {download_url}"
+                ),
+                "download_url": download_url,
+                "token_stats": token_stats,
+            }
+
+        job = _submit("merge_documents", work, ticket)
+        return _started(job.id, "Merge")
+
+    except (JobQueueFull, BudgetExceeded) as e:
+        return str(e)
     except Exception as e:
         logging.exception("Unexpected error in merge_documents")
         return f"Unexpected error: {e}"
@@ -85,68 +172,179 @@ def merge_documents(file_ids: List[str], template_id: Optional[str] = None) -> s
 # ------------------- RESUME MATCH -------------------
 
 @function_tool
-def resume_match(
+async def resume_match(
     resume_file_ids: List[str],
     jd_file_id: Optional[str] = None,
-    jd_text: Optional[str] = None
+    jd_text: Optional[str] = None,
+    use_cache: bool = True,
+    top_k: Optional[int] = None,
 ) -> str:
     """
-    Compare resumes against a JD and return a CSV report with match scores and notes.
+    Compare resumes against a JD and produce a CSV report with match scores and notes. Runs as a background job.
 
     Args:
         resume_file_ids: List of file IDs (one or more resumes)
         jd_file_id: Optional file ID for the JD (pdf/docx/txt). If provided, used over jd_text.
         jd_text: Optional JD text pasted by the user.
+        use_cache: Reuse scores from this JD's candidate pool and cached responses. Set false only if the user
+            asks for a fresh run; every resume is then re-scored and its pool entry replaced.
+        top_k: Optional cap on how many of the resumes not yet in the pool (best keyword matches first)
+            get full LLM scoring.
 
     Returns:
-        Text with a direct download link to the generated CSV, plus a short preview.
+        The job ID and its status URL (preview and CSV link appear there when done), or a helpful error message.
     """
     try:
         if not resume_file_ids:
             return "Please provide at least one resume_file_id."
-
-        # Load JD text
-        jd_final_text = None
-        if jd_file_id:
-            jmeta = get_meta(jd_file_id)
-            jpath = get_path(jd_file_id)
-            if not jmeta or not jpath:
-                return f"JD file not found: {jd_file_id}"
-            with open(jpath, "rb") as jf:
-                jd_final_text = read_any_text(jmeta["filename"], jf.read())
-        if not jd_final_text:
-            jd_final_text = (jd_text or "").strip()
-        if not jd_final_text:
+        if jd_file_id and not get_meta(jd_file_id):
+            return f"JD file not found: {jd_file_id}"
+        if not jd_file_id and not (jd_text or "").strip():
             return "Please provide a JD (either jd_file_id or jd_text)."
-
-        # Load resume texts
-        resumes = []
         for fid in resume_file_ids:
-            meta = get_meta(fid)
-            path = get_path(fid)
-            if not meta or not path:
+            if not get_meta(fid):
                 return f"Resume file not found: {fid}"
-            with open(path, "rb") as f:
-                resumes.append((meta["filename"], f.read()))
 
-        results = match_resumes_to_jd(jd_final_text, resumes)
-        csv_bytes = results_to_csv_bytes(results)
+        # an upper bound: resumes already in the JD's pool are not scored again
+        def estimate() -> int:
+            jd_chars = _file_chars(jd_file_id) if jd_file_id else len(jd_text or "")
+            return estimate_screen(jd_chars, [_file_chars(fid) for fid in resume_file_ids])
+
+        ticket = await _admit("This resume match", estimate)
+
+        async def work(job: Job) -> dict:
+            job.set_progress("extract", 0, len(resume_file_ids))
+            # Load JD text
+            jd_final_text = None
+            if jd_file_id:
+                jd_final_text = await asyncio.to_thread(get_text, jd_file_id)
+            if not jd_final_text:
+                jd_final_text = (jd_text or "").strip()
+            if not jd_final_text:
+                raise ValueError("The JD file has no readable text; please paste the JD instead.")
+
+            # Resumes already scored against this JD come from its candidate pool;
+            # only the rest are extracted and sent to the model
+            pool_id = candidate_pool.open(jd_final_text, settings.OPENAI_MODEL)
+            hashes = [get_meta(fid)["sha256"] for fid in resume_file_ids]
+            known = candidate_pool.known(pool_id, hashes) if use_cache else {}
+            new = [k for k, sha in enumerate(hashes) if sha not in known]
+
+            texts = await _load_texts([resume_file_ids[k] for k in new])
+            resumes = [(get_meta(resume_file_ids[k])["filename"], text or "") for k, text in zip(new, texts)]
 
-        from app.services.filestore import save_file
-        out_id = save_file(
-            csv_bytes,
-            filename="resume_match_report.csv",
-            content_type="text/csv",
-        )
-        url = f"/api/files/{out_id}/download"
+            usage: dict = {}
+            fresh = await amatch_resume_texts_to_jd(
+                jd_final_text, resumes, use_cache=use_cache, top_k=top_k, progress=job.set_progress, usage=usage
+            )
+            candidate_pool.add(pool_id, [(hashes[k], resume_file_ids[k], info) for k, info in zip(new, fresh)])
 
-        # short textual preview (top 3 by score)
-        top = sorted(results, key=lambda r: r.get("score",0), reverse=True)[:3]
-        preview_lines = [f"{i+1}. {r['name']} — {r.get('score',0)}" for i,r in enumerate(top)]
-        preview = "\n".join(preview_lines) if preview_lines else "No readable resumes."
+            results = []
+            fresh_by_index = dict(zip(new, fresh))
+            for k, fid in enumerate(resume_file_ids):
+                if k in fresh_by_index:
+                    results.append(fresh_by_index[k])
+                else:
+                    results.append({**known[hashes[k]], "name": get_meta(fid)["filename"], "status": "pooled"})
+            csv_bytes = results_to_csv_bytes(results)
 
-        return f"Resume match complete. Top candidates:\n{preview}\n\nDownload CSV report: {url}"
+            from app.services.filestore import save_file
+            out_id = save_file(
+                csv_bytes,
+                filename="resume_match_report.csv",
+                content_type="text/csv",
+            )
+            url = f"/api/files/{out_id}/download"
 
+            # short textual preview (top 3 by score)
+            top = sorted(results, key=lambda r: r.get("score",0), reverse=True)[:3]
+            preview_lines = [f"{i+1}. {r['name']} — {r.get('score',0)}" for i,r in enumerate(top)]
+            preview = "\n".join(preview_lines) if preview_lines else "No readable resumes."
+
+            pool = candidate_pool.get(pool_id)
+            reused = len(resume_file_ids) - len(new)
+            pool_note = (
+                f"{len(new)} new resume(s) processed, {reused} taken from this JD's candidate pool "
+                f"({pool['candidates']} candidates in pool {pool_id}; browse: /api/pools/{pool_id}/candidates)."
+            )
+            return {
+                "message": (
+                    f"Resume match complete. Top candidates:\n{preview}\n\n{pool_note}\n"
+                    f"Download CSV report: {url}"
+                ),
+                "download_url": url,
+                "pool_id": pool_id,
+                "token_stats": usage,
+            }
+
+        job = _submit("resume_match", work, ticket)
+        return _started(job.id, "Resume match")
+
+    except (JobQueueFull, BudgetExceeded) as e:
+        return str(e)
     except Exception as e:
         logging.exception("Unexpected error in resume_match")
         return f"Unexpected error: {e}"
+
+# ------------------- CANDIDATE POOL -------------------
+
+@function_tool
+def pool_candidates(
+    pool_id: str,
+    top_k: int = 10,
+    min_score: Optional[int] = None,
+    max_score: Optional[int] = None,
+    contains: Optional[str] = None,
+    offset: int = 0,
+) -> str:
+    """
+    Rank the candidates scored so far against one JD (its candidate pool), best first.
+
+    Args:
+        pool_id: Pool ID reported by resume_match for that JD.
+        top_k: How many candidates to list (max 50).
+        min_score: Only candidates scoring at least this (0-100).
+        max_score: Only candidates scoring at most this (0-100).
+        contains: Only candidates whose name, summary, strengths or gaps mention this text (e.g. a skill).
+        offset: Skip this many candidates (for the next page).
+
+    Returns:
+        One line per candidate with score and summary, plus the total number of matches.
+    """
+    pool = candidate_pool.get(pool_id)
+    if not pool:
+        return f"Candidate pool not found: {pool_id}"
+    page = candidate_pool.query(
+        pool_id, limit=min(max(1, top_k), 50), offset=offset, min_score=min_score, max_score=max_score,
+        text=contains,
+    )
+    if not page["items"]:
+        return f"No candidates match ({pool['candidates']} in pool)."
+    lines = [
+        f"{offset + i + 1}. {c['name']} — {c['score']}: {c['summary']}" for i, c in enumerate(page["items"])
+    ]
+    shown = f"{offset + 1}-{offset + len(page['items'])}"
+    return f"Candidates {shown} of {page['total']} matching ({pool['candidates']} in pool):\n" + "\n".join(lines)
+
+# ------------------- JOB STATUS -------------------
+
+@function_tool
+def job_status(job_id: str) -> str:
+    """
+    Report the status of a background job started by merge_documents or resume_match.
+
+    Args:
+        job_id: The job ID returned when the job was started.
+
+    Returns:
+        Current status and progress, the result message when finished, or the error if it failed.
+    """
+    job = jobs.get(job_id)
+    if not job:
+        return f"Job not found: {job_id}"
+    if job.status == "succeeded":
+        return job.result.get("message", "Job finished.")
+    if job.status == "failed":
+        return f"Job failed: {job.error}"
+    progress = f" ({job.stage} {job.done}/{job.total})" if job.stage else ""
+    return f"Job {job_id} is {job.status}{progress}."
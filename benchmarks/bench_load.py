@@ -0,0 +1,273 @@
+"""
+benchmarks/bench_load.py
+
+End-to-end load scenarios against a local fake OpenAI server (no API key needed).
+
+    python -m benchmarks.bench_load                                  # all scenarios
+    python -m benchmarks.bench_load --scenarios summarize,resume_tool --requests 20 --concurrency 4
+    python -m benchmarks.bench_load --latency 0.5 --jitter 0.2 --rate-429 0.05 --json results.json
+
+The app runs in this process behind uvicorn on a free port and is driven over HTTP
+(upload, summarize, chat); the merge_documents / resume_match tools are invoked
+directly and awaited until their background job finishes. For every scenario we
+report throughput, p50/p95/p99 latency, errors and the process's peak RSS so far.
+
+The LLM response cache is off unless --cache is given. Settings from .env are
+overridden and everything the app writes (registries, caches, blobs, text cache)
+goes to a temporary directory, so no real API key or data/ is touched.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import resource
+import socket
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass, fields
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from benchmarks.corpus import make_document
+from benchmarks.fake_openai import FakeConfig, FakeOpenAIServer
+
+SCENARIOS = ("upload", "summarize", "chat", "merge_tool", "resume_tool")
+
+@dataclass
+class Result:
+    scenario: str
+    requests: int
+    errors: int
+    seconds: float
+    throughput: float
+    p50: float
+    p95: float
+    p99: float
+    peak_rss_mb: float
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))  # nearest rank
+    return ordered[k]
+
+def _peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024  # bytes on macOS, KB on Linux
+
+async def _drive(name: str, fn: Callable[[int], Awaitable[None]], requests: int, concurrency: int) -> Result:
+    sem = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one(i: int) -> None:
+        nonlocal errors
+        async with sem:
+            t0 = time.perf_counter()
+            try:
+                await fn(i)
+            except Exception as e:
+                errors += 1
+                print(f"  {name}[{i}] failed: {e}", file=sys.stderr)
+                return
+            latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    wall = time.perf_counter() - t0
+    return Result(
+        scenario=name,
+        requests=requests,
+        errors=errors,
+        seconds=round(wall, 3),
+        throughput=round(len(latencies) / wall, 3) if wall else 0.0,
+        p50=round(_percentile(latencies, 50), 3),
+        p95=round(_percentile(latencies, 95), 3),
+        p99=round(_percentile(latencies, 99), 3),
+        peak_rss_mb=round(_peak_rss_mb(), 1),
+    )
+
+class _App:
+    """The API served by uvicorn on a background thread."""
+
+    def __init__(self, port: int):
+        import uvicorn
+        from app.main import app
+
+        self.base_url = f"http://127.0.0.1:{port}"
+        self._server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    def __enter__(self) -> "_App":
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.02)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.should_exit = True
+        self._thread.join(timeout=10)
+
+async def _invoke_tool(tool, args: Dict) -> str:
+    from agents.tool_context import ToolContext
+
+    raw = json.dumps(args)
+    names = {f.name for f in fields(ToolContext)}
+    ctx = ToolContext(**{k: v for k, v in {
+        "context": None, "tool_name": tool.name, "tool_call_id": "bench", "tool_arguments": raw,
+    }.items() if k in names})
+    return str(await tool.on_invoke_tool(ctx, raw))
+
+async def _await_job(message: str) -> None:
+    from app.services.jobs import jobs
+
+    m = re.search(r"background job ([0-9a-f]{32})", message)
+    if not m:
+        raise RuntimeError(message)
+    await jobs.wait(jobs.get(m.group(1)))
+
+async def _upload(client, docs) -> List[str]:
+    files = [("files", (name, data, "application/octet-stream")) for name, data in docs]
+    r = await client.post("/api/files/upload", files=files)
+    r.raise_for_status()
+    return [f["id"] for f in r.json()["files"]]
+
+def _scenarios(client, args) -> Dict[str, Callable[[int], Awaitable[None]]]:
+    from app.tools import merge_documents, resume_match
+
+    fmts = ("pdf", "docx", "txt")
+    state: Dict[str, List[str]] = {}
+    setup = asyncio.Lock()  # concurrent first requests upload the shared fixture once
+
+    async def fixture(key: str, docs: Callable[[], List]) -> List[str]:
+        async with setup:
+            if key not in state:
+                state[key] = await _upload(client, docs())
+        return state[key]
+
+    async def upload(i: int) -> None:
+        await _upload(client, [make_document("resume", fmts[i % 3], args.size, seed=i)])
+
+    async def summarize(i: int) -> None:
+        docs = [make_document("report", fmts[(i + k) % 3], args.size, seed=i * 10 + k) for k in range(args.docs)]
+        files = [("files", (name, data, "application/octet-stream")) for name, data in docs]
+        r = await client.post("/api/summarize", files=files, params={"use_cache": args.cache})
+        r.raise_for_status()
+
+    async def chat(i: int) -> None:
+        r = await client.post("/api/chat", json={"message": f"Hello, question {i}", "session_id": f"bench-{i % 8}"})
+        r.raise_for_status()
+
+    async def merge_tool(i: int) -> None:
+        file_ids = await fixture("merge", lambda: [
+            make_document("report", fmts[k % 3], args.size, seed=1000 + k) for k in range(args.docs)
+        ])
+        await _await_job(await _invoke_tool(merge_documents, {"file_ids": file_ids, "use_cache": args.cache}))
+
+    async def resume_tool(i: int) -> None:
+        file_ids = await fixture("resumes", lambda: [
+            make_document("resume", fmts[k % 3], "small", seed=2000 + k) for k in range(args.resumes)
+        ])
+        jd = "Senior Python engineer with FastAPI, Postgres, Docker and Kubernetes experience."
+        await _await_job(await _invoke_tool(resume_match, {
+            "resume_file_ids": file_ids, "jd_text": jd, "use_cache": args.cache,
+        }))
+
+    return {"upload": upload, "summarize": summarize, "chat": chat, "merge_tool": merge_tool, "resume_tool": resume_tool}
+
+async def _run(args, app_url: str) -> List[Result]:
+    from openai import DefaultAsyncHttpxClient  # the SDK's async HTTP client (httpx or httpx2)
+
+    results = []
+    async with DefaultAsyncHttpxClient(base_url=app_url, timeout=600) as client:
+        scenarios = _scenarios(client, args)
+        for name in args.scenarios:
+            print(f"running {name} ...", file=sys.stderr)
+            results.append(await _drive(name, scenarios[name], args.requests, args.concurrency))
+    return results
+
+def _print_table(results: List[Result]) -> None:
+    cols = [f.name for f in fields(Result)]
+    rows = [[str(getattr(r, c)) for c in cols] for r in results]
+    widths = [max(len(c), *(len(row[i]) for row in rows)) for i, c in enumerate(cols)]
+    print("  ".join(c.ljust(w) for c, w in zip(cols, widths)))
+    for row in rows:
+        print("  ".join(v.ljust(w) for v, w in zip(row, widths)))
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"comma-separated subset of {','.join(SCENARIOS)}")
+    ap.add_argument("--requests", type=int, default=10, help="requests per scenario")
+    ap.add_argument("--concurrency", type=int, default=4)
+    ap.add_argument("--size", choices=("small", "medium", "large"), default="medium", help="synthetic document size")
+    ap.add_argument("--docs", type=int, default=3, help="documents per summarize/merge request")
+    ap.add_argument("--resumes", type=int, default=20, help="resumes per resume_match run")
+    ap.add_argument("--latency", type=float, default=0.3, help="fake API mean latency (s)")
+    ap.add_argument("--jitter", type=float, default=0.1, help="fake API latency jitter (s)")
+    ap.add_argument("--rate-429", type=float, default=0.0, help="fraction of fake API calls answered with 429")
+    ap.add_argument("--cache", action="store_true", help="keep the LLM response cache on")
+    ap.add_argument("--json", help="also write results to this file")
+    args = ap.parse_args(argv)
+    args.scenarios = [s for s in args.scenarios.split(",") if s]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        ap.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    config = FakeConfig(latency=args.latency, jitter=args.jitter, rate_429=args.rate_429)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if root not in sys.path:
+        sys.path.insert(0, root)
+    cwd = os.getcwd()
+    with FakeOpenAIServer(config, port=_free_port()) as fake, tempfile.TemporaryDirectory() as tmp:
+        # app.core.config loads .env with override=True on import, so import it first and
+        # then overwrite both the settings and the variables the agents SDK reads itself
+        from app.core.config import settings
+
+        overrides = {
+            "OPENAI_API_KEY": "sk-bench",
+            "OPENAI_BASE_URL": fake.base_url,
+            "LLM_CACHE_ENABLED": args.cache,
+            "LLM_CACHE_PATH": os.path.join(tmp, "llm_cache.sqlite3"),
+            "SUMMARY_MEMO_PATH": os.path.join(tmp, "summary_memo.sqlite3"),
+            "FILESTORE_DB": os.path.join(tmp, "filestore.sqlite3"),
+            "CANDIDATE_POOL_DB": os.path.join(tmp, "candidate_pool.sqlite3"),
+            "TOKEN_LEDGER_DB": os.path.join(tmp, "token_ledger.sqlite3"),
+            "SESSION_DB": os.path.join(tmp, "sessions.sqlite3"),
+        }
+        for name, value in overrides.items():
+            setattr(settings, name, value)  # before the service modules build their stores
+        os.environ["OPENAI_API_KEY"] = settings.OPENAI_API_KEY
+        os.environ["OPENAI_BASE_URL"] = settings.OPENAI_BASE_URL
+
+        import agents
+        agents.set_default_openai_api("chat_completions")  # the fake server has no Responses API
+        agents.set_tracing_disabled(True)
+
+        # data/ (blobs, text cache) and logs/ are created under the temp dir, not the repo
+        os.symlink(os.path.join(root, "static"), os.path.join(tmp, "static"))
+        os.chdir(tmp)
+        try:
+            with _App(_free_port()) as api:
+                results = asyncio.run(_run(args, api.base_url))
+        finally:
+            os.chdir(cwd)
+        _print_table(results)
+        print(f"fake API: {fake.stats.requests} requests, {fake.stats.throttled} answered 429")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": {k: v for k, v in vars(args).items() if k != "json"},
+                       "results": [asdict(r) for r in results]}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+benchmarks/bench_pdf_extraction.py
+
+Serial vs page-parallel PDF extraction. The speed-up depends on the CPUs available:
+on a single-CPU host expect about x1.00 (or slightly less, for the pool overhead).
+
+    python -m benchmarks.bench_pdf_extraction --pages 200 --workers 4
+    python -m benchmarks.bench_pdf_extraction --file contract.pdf
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import time
+
+from app.services.pdf_utils import extract_text_from_pdf_bytes_parallel
+from benchmarks.corpus import make_pdf_bytes
+
+def _best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--file", help="PDF to benchmark (default: synthetic)")
+    ap.add_argument("--pages", type=int, default=200, help="pages in the synthetic PDF")
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    if args.file:
+        with open(args.file, "rb") as f:
+            data = f.read()
+    else:
+        data = make_pdf_bytes(args.pages)
+
+    serial_text = extract_text_from_pdf_bytes_parallel(data, workers=1)
+    parallel_text = extract_text_from_pdf_bytes_parallel(data, workers=args.workers)  # also warms the pool
+    assert serial_text == parallel_text, "parallel output differs from serial"
+
+    t_serial = _best_of(lambda: extract_text_from_pdf_bytes_parallel(data, workers=1), args.repeat)
+    t_parallel = _best_of(lambda: extract_text_from_pdf_bytes_parallel(data, workers=args.workers), args.repeat)
+    cpus = os.cpu_count() or 1
+    print(f"bytes={len(data)} chars={len(serial_text)} workers={args.workers} cpus={cpus}")
+    if cpus < 2:
+        print("note: single CPU, so the parallel run cannot be faster than the serial one")
+    print(f"serial:   {t_serial:.3f}s")
+    print(f"parallel: {t_parallel:.3f}s  (x{t_serial / t_parallel:.2f})")
+
+if __name__ == "__main__":
+    main()
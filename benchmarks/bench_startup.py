@@ -0,0 +1,162 @@
+"""
+benchmarks/bench_startup.py
+
+Cold-start costs of the API process, each measured in a fresh interpreter.
+
+    python -m benchmarks.bench_startup                      # 5 runs per measurement
+    python -m benchmarks.bench_startup --runs 10 --modes background,off --json startup.json
+
+Reports:
+- import: wall time of `import app.main`, the heavy dependencies it loaded, and the
+  largest cumulative import costs from `python -X importtime`
+- first_use: time to load the chat/summarize stack on first use (agent, openai,
+  python-docx, pdfplumber, tiktoken) after app.main is imported
+- health[<mode>]: seconds from launching uvicorn to the first 200 from /health, for
+  each STARTUP_WARMUP mode (background | blocking | off)
+
+No API key or network access is needed; registries live in a temporary directory.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from typing import Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = ("background", "blocking", "off")
+HEAVY = ("openai", "agents", "docx", "pdfplumber", "tiktoken", "httpx", "httpx2", "prometheus_client")
+
+_IMPORT_PROBE = """
+import json, sys, time
+t = time.perf_counter()
+import app.main
+print(json.dumps({"seconds": time.perf_counter() - t, "loaded": [m for m in %r if m in sys.modules]}))
+""" % (HEAVY,)
+
+_FIRST_USE_PROBE = """
+import json, time
+import app.main
+t = time.perf_counter()
+app.main._warm_up()
+print(json.dumps({"seconds": time.perf_counter() - t}))
+"""
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _env(tmp: str, **extra: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.setdefault("OPENAI_API_KEY", "sk-bench")
+    env.update(
+        FILESTORE_DB=os.path.join(tmp, "filestore.sqlite3"),
+        SESSION_DB=os.path.join(tmp, "sessions.sqlite3"),
+        LLM_CACHE_PATH=os.path.join(tmp, "llm_cache.sqlite3"),
+        SUMMARY_MEMO_PATH=os.path.join(tmp, "summary_memo.sqlite3"),
+        PYTHONPATH=os.pathsep.join(p for p in (ROOT, env.get("PYTHONPATH")) if p),
+        **extra,
+    )
+    return env
+
+def _probe(code: str, env: Dict[str, str]) -> dict:
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def _importtime(env: Dict[str, str], top: int) -> List[Dict]:
+    """Largest cumulative import costs (ms) for `import app.main`."""
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in out.stderr.splitlines():
+        m = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)", line)
+        if m and len(m.group(3)) <= 3:  # top-level imports and their direct children only
+            rows.append({"module": m.group(4), "self_ms": int(m.group(1)) / 1000, "cumulative_ms": int(m.group(2)) / 1000})
+    rows.sort(key=lambda r: r["cumulative_ms"], reverse=True)
+    return rows[:top]
+
+def _time_to_health(env: Dict[str, str], timeout: float) -> float:
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}/health"
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - t0 < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with code {proc.returncode}")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as r:
+                    if r.status == 200:
+                        return time.perf_counter() - t0
+            except OSError:
+                time.sleep(0.01)
+        raise RuntimeError(f"/health not ready after {timeout}s")
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+def _summary(values: List[float]) -> Dict[str, float]:
+    return {
+        "min": round(min(values), 3),
+        "median": round(statistics.median(values), 3),
+        "max": round(max(values), 3),
+    }
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--runs", type=int, default=5, help="fresh processes per measurement")
+    ap.add_argument("--modes", default=",".join(MODES), help=f"STARTUP_WARMUP modes to time: {','.join(MODES)}")
+    ap.add_argument("--top", type=int, default=10, help="import-time rows to show")
+    ap.add_argument("--timeout", type=float, default=60.0, help="seconds to wait for /health")
+    ap.add_argument("--json", help="also write results to this file")
+    args = ap.parse_args(argv)
+    modes = [m for m in args.modes.split(",") if m]
+    unknown = set(modes) - set(MODES)
+    if unknown:
+        ap.error(f"unknown modes: {', '.join(sorted(unknown))}")
+
+    results: Dict[str, object] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        env = _env(tmp, STARTUP_WARMUP="off")
+        imports = [_probe(_IMPORT_PROBE, env) for _ in range(args.runs)]
+        results["import"] = {
+            **_summary([r["seconds"] for r in imports]),
+            "heavy_modules_loaded": imports[-1]["loaded"],
+            "top": _importtime(env, args.top),
+        }
+        results["first_use"] = _summary([_probe(_FIRST_USE_PROBE, env)["seconds"] for _ in range(args.runs)])
+        for mode in modes:
+            print(f"timing /health with STARTUP_WARMUP={mode} ...", file=sys.stderr)
+            mode_env = _env(tmp, STARTUP_WARMUP=mode)
+            results[f"health[{mode}]"] = _summary([_time_to_health(mode_env, args.timeout) for _ in range(args.runs)])
+
+    print(f"{'measurement':<20}{'min':>8}{'median':>8}{'max':>8}   (seconds)")
+    for name, r in results.items():
+        print(f"{name:<20}{r['min']:>8}{r['median']:>8}{r['max']:>8}")
+    imp = results["import"]
+    print(f"heavy modules loaded by `import app.main`: {', '.join(imp['heavy_modules_loaded']) or 'none'}")
+    print("largest imports (cumulative ms):")
+    for row in imp["top"]:
+        print(f"  {row['module']:<40}{row['cumulative_ms']:>10.1f}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": {k: v for k, v in vars(args).items() if k != "json"}, "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+benchmarks/corpus.py
+
+Synthetic documents for benchmarks. No third-party PDF writer is needed:
+make_pdf_bytes emits a minimal, valid text-only PDF that pdfplumber can read.
+make_document builds resumes and reports of a given size as PDF, DOCX or TXT.
+"""
+
+from __future__ import annotations
+
+from io import BytesIO
+import random
+from typing import List, Tuple
+
+from docx import Document
+
+_WORDS = (
+    "agreement party shall provide services term payment invoice delivery clause notice "
+    "liability warranty confidential information data security compliance schedule report "
+    "project milestone budget review analysis result quarter revenue growth customer market"
+).split()
+
+def lorem_lines(n: int, seed: int = 0, width: int = 12) -> List[str]:
+    rnd = random.Random(seed)
+    return [" ".join(rnd.choice(_WORDS) for _ in range(width)).capitalize() + "." for _ in range(n)]
+
+_SKILLS = (
+    "python java sql aws docker kubernetes react typescript spark airflow terraform linux "
+    "fastapi django pandas tensorflow pytorch kafka redis postgres graphql go rust"
+).split()
+
+# lines of body text per document size
+SIZES = {"small": 40, "medium": 400, "large": 4000}
+
+def resume_lines(n: int, seed: int = 0) -> List[str]:
+    """A resume-shaped text: header, skills line, then experience bullets."""
+    rnd = random.Random(seed)
+    skills = rnd.sample(_SKILLS, 8)
+    lines = [f"Candidate {seed}", "Skills: " + ", ".join(skills), "Experience"]
+    for i, line in enumerate(lorem_lines(max(1, n - 3), seed=seed, width=10)):
+        lines.append(f"- {line[:-1]} using {skills[i % len(skills)]}.")
+    return lines
+
+def report_lines(n: int, seed: int = 0) -> List[str]:
+    """A report-shaped text: numbered section headings every 20 lines."""
+    lines = []
+    for i, line in enumerate(lorem_lines(n, seed=seed)):
+        if i % 20 == 0:
+            lines.append(f"Section {i // 20 + 1}")
+        lines.append(line)
+    return lines
+
+def make_docx_bytes(lines: List[str]) -> bytes:
+    doc = Document()
+    for line in lines:
+        doc.add_paragraph(line)
+    buf = BytesIO()
+    doc.save(buf)
+    return buf.getvalue()
+
+def make_document(kind: str = "report", fmt: str = "txt", size: str = "small", seed: int = 0) -> Tuple[str, bytes]:
+    """(filename, bytes) for a synthetic `kind` ("resume" | "report") of `size` in `fmt` ("pdf" | "docx" | "txt")."""
+    n = SIZES[size]
+    lines = resume_lines(n, seed) if kind == "resume" else report_lines(n, seed)
+    name = f"{kind}_{size}_{seed}.{fmt}"
+    if fmt == "pdf":
+        per_page = 40
+        pages = [lines[i:i + per_page] for i in range(0, len(lines), per_page)]
+        return name, _pdf_from_pages(pages)
+    if fmt == "docx":
+        return name, make_docx_bytes(lines)
+    return name, ("\n".join(lines) + "\n").encode("utf-8")
+
+def _pdf_escape(s: str) -> str:
+    return s.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def make_pdf_bytes(pages: int, lines_per_page: int = 40, seed: int = 0) -> bytes:
+    """A `pages`-page PDF with `lines_per_page` lines of Helvetica text per page."""
+    return _pdf_from_pages(
+        [[f"Page {i + 1}"] + lorem_lines(lines_per_page, seed=seed * 100003 + i) for i in range(pages)]
+    )
+
+def _pdf_from_pages(page_lines: List[List[str]]) -> bytes:
+    pages = len(page_lines)
+    objs: List[bytes] = []
+    # 1: catalog, 2: pages tree, 3: font, then (page, content) pairs
+    page_ids = [4 + 2 * i for i in range(pages)]
+    objs.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    kids = " ".join(f"{pid} 0 R" for pid in page_ids)
+    objs.append(f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>".encode())
+    objs.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    for i, lines in enumerate(page_lines):
+        ops = ["BT", "/F1 10 Tf", "12 TL", "50 800 Td"]
+        ops += [f"({_pdf_escape(line)}) Tj T*" for line in lines]
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1")
+        objs.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_ids[i] + 1} 0 R >>".encode()
+        )
+        objs.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for n, body in enumerate(objs, start=1):
+        offsets.append(len(out))
+        out += f"{n} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objs) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{o:010d} 00000 n \n" for o in offsets).encode()
+    out += f"trailer\n<< /Size {len(objs) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
@@ -0,0 +1,160 @@
+"""
+benchmarks/fake_openai.py
+
+Local stand-in for the OpenAI chat-completions API, so benchmarks run without a key.
+
+    python -m benchmarks.fake_openai --port 8900 --latency 0.3 --jitter 0.2 --rate-429 0.05
+
+Point the app at it with OPENAI_BASE_URL=http://127.0.0.1:8900/v1. Every request
+sleeps `latency` +/- `jitter` seconds; a `rate_429` fraction is answered with HTTP 429
+and a Retry-After header instead. JSON-mode requests get a resume-score object (or,
+for a batch of resumes labelled [R1], [R2], ..., {"results": [...]} with one entry
+per label), all others a short summary; `usage` is estimated at ~4 characters per token.
+Only non-streaming /v1/chat/completions is implemented (set the agents SDK to the
+chat-completions API when driving /api/chat).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from dataclasses import dataclass
+import json
+import random
+import re
+import threading
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+import uvicorn
+
+@dataclass
+class FakeConfig:
+    latency: float = 0.3
+    jitter: float = 0.1
+    rate_429: float = 0.0
+    retry_after: float = 1.0
+    output_tokens: int = 120
+    seed: int = 0
+
+@dataclass
+class FakeStats:
+    requests: int = 0
+    throttled: int = 0
+
+def _text(messages) -> str:
+    parts = []
+    for m in messages:
+        content = m.get("content")
+        if isinstance(content, list):
+            content = " ".join(str(p.get("text", "")) for p in content if isinstance(p, dict))
+        parts.append(str(content or ""))
+    return "\n".join(parts)
+
+# Resume labels of a batched scoring prompt, each on a line of its own
+_BATCH_LABEL = re.compile(r"^\[(R\d+)\]$", re.M)
+
+def _score(text: str) -> dict:
+    return {
+        "score": len(text) % 101,
+        "strengths": ["Relevant experience"],
+        "gaps": ["Missing certification"],
+        "summary": "Synthetic score from the fake server.",
+    }
+
+def _json_reply(messages, prompt: str) -> dict:
+    user = next((_text([m]) for m in reversed(messages) if m.get("role") == "user"), "")
+    parts = _BATCH_LABEL.split(user)  # [preamble, id, text, id, text, ...]
+    if len(parts) < 3:
+        return _score(prompt)
+    return {"results": [dict(_score(text), id=rid) for rid, text in zip(parts[1::2], parts[2::2])]}
+
+def create_app(config: FakeConfig) -> FastAPI:
+    app = FastAPI(title="fake-openai")
+    app.state.stats = stats = FakeStats()
+    rnd = random.Random(config.seed)
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats.requests += 1
+        await asyncio.sleep(max(0.0, config.latency + rnd.uniform(-config.jitter, config.jitter)))
+        if rnd.random() < config.rate_429:
+            stats.throttled += 1
+            return JSONResponse(
+                status_code=429,
+                headers={"retry-after": str(config.retry_after)},
+                content={"error": {"message": "Rate limit reached (fake)", "type": "requests", "code": "rate_limit_exceeded"}},
+            )
+
+        prompt = _text(body.get("messages", []))
+        if (body.get("response_format") or {}).get("type") == "json_object":
+            content = json.dumps(_json_reply(body.get("messages", []), prompt))
+        else:
+            words = prompt.split()
+            content = " ".join(words[: config.output_tokens]) or "OK."
+        prompt_tokens = max(1, len(prompt) // 4)
+        completion_tokens = max(1, len(content) // 4)
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "prompt_tokens_details": {"cached_tokens": 0},
+            },
+        }
+
+    @app.get("/stats")
+    def get_stats():
+        return {"requests": stats.requests, "throttled": stats.throttled}
+
+    return app
+
+class FakeOpenAIServer:
+    """Runs the fake API on a background thread: `with FakeOpenAIServer(config, port) as srv: ... srv.base_url`."""
+
+    def __init__(self, config: FakeConfig, host: str = "127.0.0.1", port: int = 8900):
+        self.app = create_app(config)
+        self.base_url = f"http://{host}:{port}/v1"
+        self._server = uvicorn.Server(uvicorn.Config(self.app, host=host, port=port, log_level="warning"))
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    @property
+    def stats(self) -> FakeStats:
+        return self.app.state.stats
+
+    def __enter__(self) -> "FakeOpenAIServer":
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.02)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8900)
+    ap.add_argument("--latency", type=float, default=0.3, help="mean seconds per completion")
+    ap.add_argument("--jitter", type=float, default=0.1, help="+/- seconds around the mean")
+    ap.add_argument("--rate-429", type=float, default=0.0, help="fraction of requests answered with 429")
+    ap.add_argument("--retry-after", type=float, default=1.0)
+    args = ap.parse_args()
+    config = FakeConfig(args.latency, args.jitter, args.rate_429, args.retry_after)
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -64,47 +64,173 @@ function closePanels(){
 /* ---------- message renderers ---------- */
 let firstAssistantShown = false;
 
+function renderBubble(div, role, text) {
+  div.innerHTML = `<div class="bubble"><strong>${role}:</strong> ${escapeHtml(text)}</div>`;
+}
+
 function appendMessage(role, text) {
   const div = document.createElement("div");
   div.className = `msg ${role}`;
-  div.innerHTML = `<div class="bubble"><strong>${role}:</strong> ${escapeHtml(text)}</div>`;
+  renderBubble(div, role, text);
   elMessages.appendChild(div);
   elMessages.scrollTop = elMessages.scrollHeight;
 
-  if (role === "assistant") {
-    if (!firstAssistantShown) { firstAssistantShown = true; return; }
-    if (shouldShowMergeFromAssistant(text)) { closePanels(); showMergePanel(); }
-    if (shouldShowResumeFromAssistant(text)) { closePanels(); showResumePanel(); }
-  }
+  if (role === "assistant") assistantPanelsFor(text);
 }
 
-function appendToolTrace(toolCalls) {
-  if (!toolCalls || toolCalls.length === 0) return;
+function assistantPanelsFor(text) {
+  if (!firstAssistantShown) { firstAssistantShown = true; return; }
+  if (shouldShowMergeFromAssistant(text)) { closePanels(); showMergePanel(); }
+  if (shouldShowResumeFromAssistant(text)) { closePanels(); showResumePanel(); }
+}
+
+function newToolTrace() {
   const div = document.createElement("div");
   div.className = "tool-trace panel";
   div.innerHTML = `<div class="trace-title">Tool calls</div>`;
-  toolCalls.forEach((tc) => {
-    if (tc.type === "call") {
-      const row = document.createElement("div");
-      row.className = "trace-row";
-      row.textContent = `-> ${tc.tool}(${tc.arguments})`;
-      div.appendChild(row);
-    } else if (tc.type === "output") {
-      const row = document.createElement("div");
-      row.className = "trace-row out";
-      row.innerHTML = linkify(`<- ${tc.output}`);
-      div.appendChild(row);
-    }
-  });
   elMessages.appendChild(div);
+  return div;
+}
+
+function appendTraceRow(div, tc) {
+  if (tc.type === "call") {
+    const row = document.createElement("div");
+    row.className = "trace-row";
+    row.textContent = `-> ${tc.tool}(${tc.arguments})`;
+    div.appendChild(row);
+  } else if (tc.type === "output") {
+    const row = document.createElement("div");
+    row.className = "trace-row out";
+    row.innerHTML = linkify(`<- ${tc.output}`);
+    div.appendChild(row);
+  }
   elMessages.scrollTop = elMessages.scrollHeight;
+}
 
+function tracePanelsFor(toolCalls) {
   const needMerge = toolCalls.some(t => t.type === "output" && /at least two file_ids/i.test(t.output));
   const needResume = toolCalls.some(t => t.type === "output" && /resume/i.test(t.output) && /jd/i.test(t.output) && /provide/i.test(t.output));
   if (needMerge) { closePanels(); showMergePanel(); }
   if (needResume) { closePanels(); showResumePanel(); }
 }
 
+/* ---------- streaming chat (SSE over fetch) ---------- */
+function parseSse(block) {
+  let event = "message";
+  const data = [];
+  for (const line of block.split("\n")) {
+    if (line.startsWith("event:")) event = line.slice(6).trim();
+    else if (line.startsWith("data:")) data.push(line.slice(5).trimStart());
+  }
+  if (data.length === 0) return null;
+  return { event, data: JSON.parse(data.join("\n")) };
+}
+
+/* Sends one chat turn to /api/chat/stream and renders deltas and tool events as they arrive. */
+async function streamChat(payload) {
+  const res = await fetch("/api/chat/stream", {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(payload),
+  });
+  if (!res.ok) throw new Error(`HTTP ${res.status}`);
+
+  let bubble = null, text = "", trace = null, final = null;
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buf = "";
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buf += decoder.decode(value, { stream: true });
+    let idx;
+    while ((idx = buf.indexOf("\n\n")) >= 0) {
+      const ev = parseSse(buf.slice(0, idx));
+      buf = buf.slice(idx + 2);
+      if (!ev) continue;
+      showSpinner(false);
+      if (ev.event === "delta") {
+        if (!bubble) {
+          bubble = document.createElement("div");
+          bubble.className = "msg assistant";
+          elMessages.appendChild(bubble);
+        }
+        text += ev.data.text;
+        renderBubble(bubble, "assistant", text);
+        elMessages.scrollTop = elMessages.scrollHeight;
+      } else if (ev.event === "tool_call" || ev.event === "tool_output") {
+        if (!trace) trace = newToolTrace();
+        appendTraceRow(trace, ev.data);
+        bubble = null; text = "";  // text after a tool call starts a new bubble
+      } else if (ev.event === "done") {
+        final = ev.data;
+        if (final.session_id && final.session_id !== sessionId) {
+          sessionId = final.session_id;
+          localStorage.setItem(sessionKey, sessionId);
+        }
+      } else if (ev.event === "error") {
+        throw new Error(ev.data.detail);
+      }
+    }
+  }
+  if (!final) throw new Error("stream ended unexpectedly");
+
+  if (bubble) {
+    renderBubble(bubble, "assistant", final.final);
+    assistantPanelsFor(final.final);
+  } else {
+    appendMessage("assistant", final.final);
+  }
+  tracePanelsFor(final.tool_calls);
+  watchJobsIn(final.tool_calls);
+  return final;
+}
+
+/* ---------- background jobs (merge / resume match) ---------- */
+const JOB_PAT = /\/api\/jobs\/([a-f0-9]+)/;
+const watchedJobs = new Set();
+
+function watchJobsIn(toolCalls) {
+  (toolCalls || []).forEach((tc) => {
+    if (tc.type !== "output") return;
+    const m = JOB_PAT.exec(tc.output);
+    if (m) watchJob(m[1]);
+  });
+}
+
+function watchJob(jobId) {
+  if (watchedJobs.has(jobId)) return;
+  watchedJobs.add(jobId);
+  const div = document.createElement("div");
+  div.className = "tool-trace panel";
+  div.innerHTML = `<div class="trace-title">Job ${jobId}</div><div class="trace-row">queued…</div>`;
+  elMessages.appendChild(div);
+  elMessages.scrollTop = elMessages.scrollHeight;
+  const row = div.querySelector(".trace-row");
+
+  const tick = async () => {
+    try {
+      const res = await fetch(`/api/jobs/${jobId}`);
+      if (res.status === 404) { row.textContent = "Job not found (it may have expired)."; return; }
+      if (!res.ok) throw new Error(`HTTP ${res.status}`);
+      const job = await res.json();
+      if (job.status === "succeeded") {
+        row.className = "trace-row out";
+        row.innerHTML = linkify((job.result && job.result.message) || "Done.");
+        elMessages.scrollTop = elMessages.scrollHeight;
+        return;
+      }
+      if (job.status === "failed") { row.textContent = `Failed: ${job.error}`; return; }
+      const p = job.progress;
+      row.textContent = p.stage ? `${job.status} — ${p.stage} ${p.done}/${p.total}` : `${job.status}…`;
+    } catch (e) {
+      row.textContent = `Status unavailable: ${e.message}`;
+    }
+    setTimeout(tick, 2000);
+  };
+  tick();
+}
+
 /* ---------- contextual panels ---------- */
 function showMergePanel() {
   const id = "panel-merge";
@@ -171,15 +297,7 @@ function showMergePanel() {
       const userMsg = templateId
         ? `Please merge the documents I just uploaded using this template (template_id: ${templateId}).`
         : `Please merge the documents I just uploaded.`;
-      const res = await fetch("/api/chat", {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ message: userMsg, session_id: sessionId, attachment_ids: fileIds }),
-      });
-      if (!res.ok) throw new Error(`HTTP ${res.status}`);
-      const out = await res.json();
-      appendToolTrace(out.tool_calls);
-      appendMessage("assistant", out.final);
+      await streamChat({ message: userMsg, session_id: sessionId, attachment_ids: fileIds });
     } catch (e) {
       appendMessage("assistant", `Upload/Merge error: ${e.message}`);
     } finally {
@@ -264,15 +382,7 @@ function showResumePanel() {
       if (jdText) msg += ` JD Text:\n${jdText}`;
       if (jdFileId) msg += ` Also use the uploaded JD file (template_id: ${jdFileId}).`;
 
-      const res = await fetch("/api/chat", {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ message: msg, session_id: sessionId, attachment_ids: fileIds }),
-      });
-      if (!res.ok) throw new Error(`HTTP ${res.status}`);
-      const out = await res.json();
-      appendToolTrace(out.tool_calls);
-      appendMessage("assistant", out.final);
+      await streamChat({ message: msg, session_id: sessionId, attachment_ids: fileIds });
     } catch (e) {
       appendMessage("assistant", `Upload/Match error: ${e.message}`);
     } finally {
@@ -295,15 +405,7 @@ elForm.addEventListener("submit", async (e) => {
 
   showSpinner(true);
   try {
-    const res = await fetch("/api/chat", {
-      method: "POST",
-      headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({ message: text, session_id: sessionId }),
-    });
-    if (!res.ok) throw new Error(`HTTP ${res.status}`);
-    const data = await res.json();
-    appendToolTrace(data.tool_calls);
-    appendMessage("assistant", data.final);
+    await streamChat({ message: text, session_id: sessionId });
   } catch (err) {
     appendMessage("assistant", `Oops: ${err.message}`);
   } finally {
@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+# The stores keep their SQLite files, blobs and text cache under ./data: run in a scratch directory
+os.chdir(tempfile.mkdtemp(prefix="curie-tests-"))
+os.environ.setdefault("OPENAI_API_KEY", "test")
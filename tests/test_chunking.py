@@ -0,0 +1,56 @@
+from app.services.chunking import chunk_text, iter_chunks
+
+MODEL = "gpt-4o-mini"
+
+def _document(paragraphs: int = 40) -> str:
+    return "\n\n".join(
+        " ".join(f"Paragraph {p} sentence {s} talks about topic {p * s}." for s in range(6))
+        for p in range(paragraphs)
+    )
+
+def test_chunks_stay_within_budget():
+    chunks = chunk_text(_document(), MODEL, max_tokens=120, overlap_tokens=0)
+    assert len(chunks) > 1
+    for ch in chunks:
+        assert 0 < ch.n_tokens <= 120
+
+def test_chunks_without_overlap_rebuild_the_text():
+    text = _document()
+    chunks = chunk_text(text, MODEL, max_tokens=120, overlap_tokens=0)
+    assert "".join(ch.text for ch in chunks) == text
+
+def test_cuts_fall_on_paragraph_boundaries():
+    chunks = chunk_text(_document(), MODEL, max_tokens=120, overlap_tokens=0)
+    for ch in chunks[:-1]:
+        assert ch.text.endswith("\n\n")
+
+def test_overlap_repeats_whole_trailing_paragraphs():
+    chunks = chunk_text(_document(), MODEL, max_tokens=200, overlap_tokens=80)
+    assert len(chunks) > 2
+    for prev, nxt in zip(chunks, chunks[1:]):
+        last = prev.text.split("\n\n")[-2] + "\n\n"  # one paragraph fits in the overlap
+        assert nxt.text.startswith(last)
+
+def test_overlap_never_splits_a_unit():
+    # paragraphs are larger than the overlap, so nothing is repeated
+    text = _document()
+    chunks = chunk_text(text, MODEL, max_tokens=200, overlap_tokens=20)
+    assert "".join(ch.text for ch in chunks) == text
+
+def test_streamed_pieces_match_whole_text():
+    text = _document()
+    pieces = [text[i:i + 97] for i in range(0, len(text), 97)]  # cuts inside words and paragraph breaks
+    streamed = list(iter_chunks(pieces, MODEL, max_tokens=120, overlap_tokens=30))
+    whole = chunk_text(text, MODEL, max_tokens=120, overlap_tokens=30)
+    assert [(c.text, c.n_tokens) for c in streamed] == [(c.text, c.n_tokens) for c in whole]
+
+def test_oversized_sentence_is_hard_split():
+    text = "word " * 2000
+    chunks = chunk_text(text, MODEL, max_tokens=100, overlap_tokens=0)
+    assert len(chunks) > 1
+    assert all(ch.n_tokens <= 100 for ch in chunks)
+    assert "".join(ch.text for ch in chunks) == text
+
+def test_empty_input():
+    assert list(iter_chunks([], MODEL, max_tokens=100)) == []
+    assert [c.text for c in chunk_text("", MODEL, max_tokens=100)] == [""]
@@ -0,0 +1,69 @@
+import gzip
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import FileResponse, Response
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.core.compression import CompressionMiddleware, choose_encoding
+
+BODY = b"candidate summary line\n" * 200
+
+@pytest.fixture
+def client(tmp_path):
+    report = tmp_path / "report.csv"
+    report.write_bytes(BODY)
+
+    def text(request):
+        return Response(BODY, media_type="text/plain", headers={"ETag": '"abc"', "Accept-Ranges": "bytes"})
+
+    def download(request):
+        return FileResponse(report, media_type="text/csv", headers={"ETag": '"def"'})
+
+    def small(request):
+        return Response(b"ok", media_type="text/plain")
+
+    def image(request):
+        return Response(BODY, media_type="image/png")
+
+    routes = {"/text": text, "/download": download, "/small": small, "/image": image}
+    app = Starlette(routes=[Route(path, endpoint) for path, endpoint in routes.items()])
+    app.add_middleware(CompressionMiddleware, minimum_size=100)
+    return TestClient(app)
+
+def _raw(client, path, **headers):
+    """Response with its body left encoded."""
+    with client.stream("GET", path, headers=headers) as r:
+        return r, b"".join(r.iter_raw())
+
+def test_gzip_drops_accept_ranges_and_weakens_the_etag(client):
+    r, raw = _raw(client, "/text", **{"Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(raw) == BODY
+    assert "accept-ranges" not in r.headers
+    assert r.headers["etag"] == 'W/"abc"'
+    assert "Accept-Encoding" in r.headers["vary"]
+
+def test_range_requests_pass_through(client):
+    r, raw = _raw(client, "/download", **{"Accept-Encoding": "gzip", "Range": "bytes=0-9"})
+    assert r.status_code == 206
+    assert "content-encoding" not in r.headers
+    assert raw == BODY[:10]
+    assert r.headers["etag"] == '"def"'
+
+def test_file_downloads_are_compressed_whole(client):
+    r, raw = _raw(client, "/download", **{"Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(raw) == BODY
+    assert "content-length" not in r.headers
+
+def test_identity_when_not_accepted_small_or_binary(client):
+    for path, enc in (("/text", "identity"), ("/text", "gzip;q=0"), ("/small", "gzip"), ("/image", "gzip")):
+        r, _ = _raw(client, path, **{"Accept-Encoding": enc})
+        assert "content-encoding" not in r.headers, (path, enc)
+
+def test_choose_encoding():
+    assert choose_encoding("gzip, deflate") == "gzip"
+    assert choose_encoding("gzip;q=0, deflate") is None
+    assert choose_encoding("") is None
@@ -0,0 +1,52 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.services import extraction
+from app.services.extraction import cached_text, iter_file_text, read_any_text
+from app.services.filestore import get_meta, save_file
+from benchmarks.corpus import make_document
+
+@pytest.fixture
+def pdf_file():
+    def make(seed):
+        name, data = make_document("report", "pdf", "small", seed=seed)
+        return save_file(data, name), read_any_text(name, data)
+    return make
+
+def test_stream_fills_the_cache_and_drops_its_lock(pdf_file):
+    fid, expected = pdf_file(101)
+    assert "".join(iter_file_text(fid)) == expected
+    meta = get_meta(fid)
+    assert cached_text(meta["sha256"]) == expected
+    assert meta["extraction"] == "done" and meta["text_chars"] == len(expected)
+    assert meta["sha256"] not in extraction._LOCKS
+    assert "".join(iter_file_text(fid)) == expected  # now from the cache
+
+def test_concurrent_readers_share_one_extraction(pdf_file):
+    fid, expected = pdf_file(102)
+    with ThreadPoolExecutor(4) as pool:
+        texts = list(pool.map(lambda _: "".join(iter_file_text(fid)), range(4)))
+    assert texts == [expected] * 4
+    assert not extraction._LOCKS
+
+def test_reader_stopping_early_leaves_no_partial_cache(pdf_file):
+    fid, expected = pdf_file(103)
+    stream = iter_file_text(fid)
+    next(stream)
+    stream.close()
+    sha = get_meta(fid)["sha256"]
+    assert cached_text(sha) is None
+    assert sha not in extraction._LOCKS
+    assert "".join(iter_file_text(fid)) == expected
+
+def test_margin_stripping_reads_the_blob_without_locking(pdf_file):
+    fid, _ = pdf_file(104)
+    text = "".join(iter_file_text(fid, strip_margins=True))
+    assert text
+    assert cached_text(get_meta(fid)["sha256"]) is None
+    assert not extraction._LOCKS
+
+def test_unknown_file_id():
+    with pytest.raises(KeyError):
+        list(iter_file_text("nope"))
@@ -0,0 +1,61 @@
+import asyncio
+import gc
+import threading
+import weakref
+
+import pytest
+
+from app.services.jobs import JobManager, JobQueueFull
+
+class _Result:
+    pass
+
+def test_wait_returns_the_value_and_frees_it():
+    manager = JobManager(workers=1, max_queue=0, ttl_seconds=60)
+    ref = None
+
+    async def work(job):
+        nonlocal ref
+        value = _Result()
+        ref = weakref.ref(value)
+        return value
+
+    async def main():
+        job = manager.submit("test", work, keep_result=False)
+        assert isinstance(await manager.wait(job), _Result)
+        return job
+
+    job = asyncio.run(main())
+    gc.collect()
+    assert ref() is None
+    assert job.status == "succeeded" and job.result is None
+    assert job.id not in manager._futures
+
+def test_wait_reraises_and_later_waits_see_the_error():
+    manager = JobManager(workers=1, max_queue=0, ttl_seconds=60)
+
+    async def work(job):
+        raise ValueError("boom")
+
+    async def main():
+        job = manager.submit("test", work)
+        with pytest.raises(ValueError):
+            await manager.wait(job)
+        with pytest.raises(RuntimeError, match="boom"):
+            await manager.wait(job)
+
+    asyncio.run(main())
+
+def test_submit_refuses_when_the_queue_is_full():
+    manager = JobManager(workers=1, max_queue=0, ttl_seconds=60)
+    release = threading.Event()
+
+    async def block(job):
+        while not release.is_set():
+            await asyncio.sleep(0.01)
+
+    job = manager.submit("test", block)
+    with pytest.raises(JobQueueFull):
+        manager.submit("test", block)
+    release.set()
+    asyncio.run(manager.wait(job))
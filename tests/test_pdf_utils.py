@@ -0,0 +1,87 @@
+from concurrent.futures import CancelledError, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from app.services import pdf_utils
+
+class _Outcome:
+    """Stands in for a pool future: result() returns the pages or raises."""
+
+    def __init__(self, value):
+        self.value = value
+
+    def result(self, timeout=None):
+        if isinstance(self.value, list):
+            return self.value
+        raise self.value
+
+@pytest.fixture
+def scripted(monkeypatch):
+    """Script each page range's submissions: {start: [outcome, outcome on resubmit, ...]}."""
+    script, submitted, recycled = {}, [], []
+
+    def submit(workers, pdf_bytes, s, e, page_timeout):
+        submitted.append(s)
+        return f"pool{len(recycled)}", _Outcome(script[s].pop(0))
+
+    monkeypatch.setattr(pdf_utils, "_submit_range", submit)
+    monkeypatch.setattr(pdf_utils, "_recycle_pool", recycled.append)
+    return script, submitted, recycled
+
+def _extract(n_pages=4):
+    return pdf_utils.extract_text_from_pdf_bytes_parallel(b"%PDF", workers=2, page_timeout=1, n_pages=n_pages)
+
+def test_ranges_keep_page_order(scripted):
+    script, _, _ = scripted
+    script.update({0: [["p1"]], 1: [["p2"]], 2: [[""]], 3: [["p4"]]})
+    assert _extract() == "p1\np2\np4"
+
+@pytest.mark.parametrize("lost", [CancelledError, BrokenProcessPool])
+def test_range_lost_to_a_recycled_pool_is_resubmitted(scripted, lost):
+    script, submitted, _ = scripted
+    script.update({0: [["p1"]], 1: [lost, ["p2"]], 2: [["p3"]], 3: [["p4"]]})
+    assert _extract() == "p1\np2\np3\np4"
+    assert submitted.count(1) == 2
+
+def test_range_lost_twice_is_skipped(scripted):
+    script, submitted, _ = scripted
+    script.update({0: [["p1"]], 1: [CancelledError, BrokenProcessPool], 2: [["p3"]], 3: [["p4"]]})
+    assert _extract() == "p1\np3\np4"
+    assert submitted.count(1) == 2
+
+def test_stuck_range_recycles_its_pool_and_others_survive(scripted):
+    script, _, recycled = scripted
+    script.update({0: [FutureTimeout], 1: [CancelledError, ["p2"]], 2: [["p3"]], 3: [["p4"]]})
+    assert _extract() == "p2\np3\np4"
+    assert recycled == ["pool0"]
+
+def test_process_pool_matches_serial_extraction():
+    from benchmarks.corpus import make_document
+
+    _, data = make_document("report", "pdf", "small", seed=1)
+    parallel = pdf_utils.extract_text_from_pdf_bytes_parallel(data, workers=2)
+    assert parallel and parallel == pdf_utils._extract_serial(data)
+
+def test_single_worker_extracts_serially(monkeypatch):
+    monkeypatch.setattr(pdf_utils, "_extract_serial", lambda data: "serial")
+    monkeypatch.setattr(pdf_utils, "_submit_range", lambda *a: pytest.fail("no pool for workers=1"))
+    assert pdf_utils.extract_text_from_pdf_bytes_parallel(b"%PDF", workers=1) == "serial"
+
+def test_pool_is_recreated_when_its_size_changes(monkeypatch):
+    class FakePool:
+        def __init__(self, max_workers, mp_context):
+            self.max_workers = max_workers
+            self.shut = False
+
+        def shutdown(self, wait=True, cancel_futures=False):
+            self.shut = True
+
+    monkeypatch.setattr(pdf_utils, "ProcessPoolExecutor", FakePool)
+    monkeypatch.setattr(pdf_utils, "_POOL", None)
+    monkeypatch.setattr(pdf_utils, "_POOL_WORKERS", 0)
+    two = pdf_utils._get_pool(2)
+    assert pdf_utils._get_pool(2) is two
+    four = pdf_utils._get_pool(4)
+    assert four is not two and four.max_workers == 4
+    assert two.shut and not four.shut
@@ -0,0 +1,28 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.routes.pools import router
+from app.services.candidate_pool import candidate_pool
+
+def _client():
+    app = FastAPI()
+    app.include_router(router, prefix="/api/pools")
+    return TestClient(app)
+
+def _scored(name, score):
+    return {"status": "scored", "name": name, "score": score, "strengths": ["python"], "gaps": [], "summary": name}
+
+def test_candidates_are_ranked_without_file_ids():
+    pool_id = candidate_pool.open("Backend engineer, Python and SQL", "test-model")
+    candidate_pool.add(pool_id, [("sha-a", "file-a", _scored("a.pdf", 70)), ("sha-b", "file-b", _scored("b.pdf", 90))])
+    page = _client().get(f"/api/pools/{pool_id}/candidates", params={"min_score": 50}).json()
+    assert page["total"] == 2
+    assert [c["name"] for c in page["items"]] == ["b.pdf", "a.pdf"]
+    assert all("file_id" not in c for c in page["items"])
+
+def test_pools_are_not_listed_or_deleted_over_http():
+    pool_id = candidate_pool.open("Data engineer", "test-model")
+    client = _client()
+    assert client.get("/api/pools").status_code in (404, 405)
+    assert client.delete(f"/api/pools/{pool_id}").status_code == 405
+    assert client.get(f"/api/pools/{pool_id}").status_code == 200
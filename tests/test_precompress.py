@@ -0,0 +1,56 @@
+from app.services.precompress import prune_chunk, strip_page_margins
+
+HEIGHT = 800.0
+
+def _page(n: int, total: int, body: list, first_line: str = ""):
+    lines = [(f"ACME Corp — Annual Report 2024 — Page {n} of {total}", 20.0, 30.0)]
+    if first_line:
+        lines.append((first_line, 50.0, 60.0))  # inside the top band too
+    lines += [(text, 200.0 + 20 * i, 210.0 + 20 * i) for i, text in enumerate(body)]
+    lines.append((str(n), 780.0, 790.0))  # page number footer
+    return HEIGHT, lines
+
+def _strip(pages):
+    stripped = []
+    return "".join(strip_page_margins(pages, on_stripped=stripped.append)), stripped
+
+def test_running_headers_and_page_numbers_are_dropped():
+    pages = [_page(n, 5, [f"Body text of page {n}."]) for n in range(1, 6)]
+    text, stripped = _strip(pages)
+    assert text == "\n".join(f"Body text of page {n}." for n in range(1, 6))
+    assert len(stripped) == 10
+
+def test_numbered_headings_in_the_margin_band_are_kept():
+    pages = [_page(n, 5, ["Terms."], first_line=f"Article {n}") for n in range(1, 6)]
+    text, _ = _strip(pages)
+    for n in range(1, 6):
+        assert f"Article {n}" in text
+
+def test_repeated_body_lines_are_kept():
+    pages = [_page(n, 5, ["Confidential — do not distribute.", f"Page {n} content."]) for n in range(1, 6)]
+    text, _ = _strip(pages)
+    assert text.count("Confidential — do not distribute.") == 5
+
+def test_short_documents_keep_their_margins():
+    pages = [_page(n, 2, ["Body."]) for n in range(1, 3)]  # a header on two pages is not yet boilerplate
+    text, stripped = _strip(pages)
+    assert "ACME Corp" in text and not stripped
+
+def test_headers_before_the_lookahead_fills_are_caught():
+    pages = [_page(n, 30, [f"Body {n}."]) for n in range(1, 31)]
+    text, _ = _strip(pages)
+    assert "ACME" not in text
+    assert text.splitlines() == [f"Body {n}." for n in range(1, 31)]
+
+def test_prune_keeps_sentence_order_and_ratio():
+    sentences = [f"Revenue grew in region {i} because of strong demand for product line {i % 3}." for i in range(20)]
+    text = " ".join(sentences)
+    pruned, n, saved = prune_chunk(text, 400, ratio=0.5, min_sentences=4, model="gpt-4o-mini")
+    kept = [s for s in sentences if s in pruned]
+    assert 0 < len(kept) < len(sentences)
+    assert pruned == " ".join(kept)
+    assert saved == 400 - n > 0
+
+def test_prune_leaves_short_chunks_alone():
+    text = "One sentence. Two sentences."
+    assert prune_chunk(text, 8, ratio=0.5, min_sentences=4, model="gpt-4o-mini") == (text, 8, 0)
@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+
+from app.services import summarizer
+
+TEXT = "\n\n".join(f"Paragraph {i} of the quarterly report with its findings." for i in range(30))
+
+@pytest.fixture
+def llm(monkeypatch):
+    """Fake map/reduce calls; set `fail` to make them raise."""
+    state = {"calls": 0, "fail": None}
+
+    async def chat_once(prompt, model, run, stage):
+        state["calls"] += 1
+        if state["fail"]:
+            raise state["fail"]
+        return f"summary {state['calls']}"
+
+    monkeypatch.setattr(summarizer, "_chat_once", chat_once)
+    return state
+
+def _summarize(open_text, name="doc.txt"):
+    async def main():
+        run = summarizer._Run(sem=asyncio.Semaphore(2), use_cache=False, incremental=False, window=4)
+        return await summarizer._summarize_stream((name, name, open_text), run)
+    return asyncio.run(main())
+
+def test_streamed_document_is_summarized(llm):
+    summary, tokens_in, tokens_out = _summarize(lambda: iter([TEXT[:500], TEXT[500:]]))
+    assert summary.startswith("summary") and tokens_in > 0 and tokens_out > 0
+    assert llm["calls"] >= 2  # map, then reduce
+
+def test_extraction_failure_skips_the_document(llm):
+    def broken():
+        yield "Readable first page.\n\n"
+        raise ValueError("corrupt xref table")
+
+    assert _summarize(broken, name="broken.pdf") is None
+
+def test_llm_errors_propagate(llm):
+    llm["fail"] = RuntimeError("429 Too Many Requests")
+    with pytest.raises(RuntimeError, match="429"):
+        _summarize(lambda: iter([TEXT]))
+
+def test_empty_document_is_skipped(llm):
+    assert _summarize(lambda: iter(["  \n\n  "])) is None
+    assert llm["calls"] == 0
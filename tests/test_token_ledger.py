@@ -0,0 +1,65 @@
+import pytest
+
+from app.services.token_ledger import BudgetExceeded, TokenLedger, principal_for
+
+@pytest.fixture
+def ledger(tmp_path):
+    return TokenLedger(str(tmp_path / "ledger.sqlite3"), hourly=1000, daily=0, max_per_request=800)
+
+def test_release_drops_only_the_given_ticket(ledger):
+    a = ledger.admit(300, "A", who="p")
+    b = ledger.admit(300, "A", who="p")  # same fields as `a`
+    ledger.release(b)
+    assert ledger.usage("p")["running"] == [{"what": "A", "estimate": 300, "charged": 0}]
+    assert ledger.usage("p")["reserved"] == 300
+    ledger.release(a)
+    assert ledger.stats()["running_reservations"] == 0
+
+def test_release_twice_is_harmless(ledger):
+    a = ledger.admit(300, "A", who="p")
+    b = ledger.admit(300, "A", who="p")
+    ledger.release(a)
+    ledger.release(a)
+    assert ledger.usage("p")["reserved"] == 300  # b is still running
+    ledger.release(b)
+
+def test_reservations_count_against_the_budget(ledger):
+    a = ledger.admit(600, "A", who="p")
+    with pytest.raises(BudgetExceeded) as exc:
+        ledger.admit(600, "B", who="p")
+    assert exc.value.retry_after > 0
+    ledger.admit(600, "B", who="other")  # budgets are per principal
+    ledger.release(a)
+    ledger.admit(600, "B", who="p")
+
+def test_per_request_limit(ledger):
+    with pytest.raises(BudgetExceeded) as exc:
+        ledger.admit(900, "Huge", who="p")
+    assert exc.value.retry_after == 0
+    assert ledger.stats()["rejections"] == 1
+
+def test_charging_records_usage_and_releases(ledger):
+    ticket = ledger.admit(500, "A", who="p")
+    with ledger.charging(ticket):
+        ledger.charge(100, 50)
+        assert ledger.usage("p")["reserved"] == 350
+    assert ticket.charged == 150
+    usage = ledger.usage("p")
+    assert usage["hour"]["used"] == 150 and usage["reserved"] == 0
+
+def test_charging_without_release_leaves_the_ticket_to_the_caller(ledger):
+    ticket = ledger.admit(500, "A", who="p")
+    with ledger.charging(ticket, release=False):
+        ledger.charge(100, 0)
+    assert ledger.usage("p")["reserved"] == 400
+    ledger.release(ticket)
+    assert ledger.usage("p")["reserved"] == 0
+
+def test_no_budget_means_no_limit(tmp_path):
+    ledger = TokenLedger(str(tmp_path / "ledger.sqlite3"), hourly=0, daily=0, max_per_request=0)
+    ledger.admit(10**9, "Huge", who="p")
+    assert ledger.usage("p")["hour"]["remaining"] is None
+
+def test_unknown_api_keys_fall_back_to_the_address():
+    assert principal_for({"x-api-key": "made-up"}, "10.0.0.1") == "ip:10.0.0.1"
+    assert principal_for({}, None) == "ip:unknown"